@@ -0,0 +1,124 @@
+#! /usr/bin/env python
+"""compare the number of nodes expanded by dijkstra and the goal-directed
+search (see relay.network_graph.alg.PathfindingEngine) on synthetic networks
+
+run from the root of the repository with:
+
+    python -m benchmarks.goal_directed
+"""
+import random
+import time
+
+import click
+
+from relay.network_graph import alg
+from relay.network_graph.graph import (
+    CurrencyNetworkGraph,
+    ReceiverPaysCostAccumulatorSnapshot,
+    SenderPaysCapacityAccumulator,
+    SenderPaysCostAccumulatorSnapshot,
+)
+
+from .networks import random_network, scale_free_network
+
+
+class ExpansionCounter(alg.CostAccumulator):
+    """wraps a cost accumulator and records the nodes whose edges are relaxed"""
+
+    def __init__(self, cost_accumulator):
+        self.cost_accumulator = cost_accumulator
+        self.expanded_nodes = set()
+
+    def zero(self):
+        return self.cost_accumulator.zero()
+
+    def lower_bound(self, cost_from_start_to_node, min_hops_to_target):
+        return self.cost_accumulator.lower_bound(
+            cost_from_start_to_node, min_hops_to_target
+        )
+
+    def total_cost_from_start_to_dst(
+        self, cost_from_start_to_node, node, dst, edge_data
+    ):
+        self.expanded_nodes.add(node)
+        return self.cost_accumulator.total_cost_from_start_to_dst(
+            cost_from_start_to_node, node, dst, edge_data
+        )
+
+
+def make_accumulators(snapshot, max_hops):
+    common = dict(timestamp=0, capacity_imbalance_fee_divisor=1000, max_hops=max_hops)
+    return {
+        "sender pays": SenderPaysCostAccumulatorSnapshot(
+            value=1000, trustline_data=snapshot, **common
+        ),
+        "receiver pays": ReceiverPaysCostAccumulatorSnapshot(
+            value=1000, trustline_data=snapshot, **common
+        ),
+        "max capacity": SenderPaysCapacityAccumulator(
+            trustline_data=snapshot, **common
+        ),
+    }
+
+
+def run(graph, queries, seed, max_hops):
+    snapshot = graph.snapshot
+    rng = random.Random(seed)
+    pairs = [tuple(rng.sample(snapshot.nodes, 2)) for _ in range(queries)]
+
+    start = time.perf_counter()
+    landmarks = snapshot.landmarks
+    click.echo(f"  computing the landmarks: {time.perf_counter() - start:.3f}s")
+
+    for mode in make_accumulators(snapshot, max_hops):
+        for engine in alg.PathfindingEngine:
+            expanded = 0
+            start = time.perf_counter()
+            for source, target in pairs:
+                counter = ExpansionCounter(make_accumulators(snapshot, max_hops)[mode])
+                try:
+                    alg.least_cost_path(
+                        graph=snapshot,
+                        starting_nodes={source},
+                        target_nodes={target},
+                        cost_accumulator=counter,
+                        landmarks=landmarks
+                        if engine == alg.PathfindingEngine.ALT
+                        else None,
+                    )
+                except alg.nx.NetworkXNoPath:
+                    pass
+                expanded += len(counter.expanded_nodes)
+            elapsed = time.perf_counter() - start
+            click.echo(
+                f"  {mode:>13} {engine.value:>8}: "
+                f"{expanded / queries:10.1f} expanded nodes, "
+                f"{elapsed / queries * 1000:7.1f}ms per query"
+            )
+
+
+@click.command()
+@click.option("--users", default=10_000, show_default=True)
+@click.option("--trustlines-per-user", default=3, show_default=True)
+@click.option("--queries", default=50, show_default=True)
+@click.option("--max-hops", default=None, type=int)
+@click.option("--seed", default=0, show_default=True)
+def main(users, trustlines_per_user, queries, max_hops, seed):
+    for name, trustlines in [
+        (
+            "random network",
+            random_network(users, users * trustlines_per_user, seed=seed),
+        ),
+        (
+            "scale-free network",
+            scale_free_network(users, trustlines_per_user, seed=seed),
+        ),
+    ]:
+        graph = CurrencyNetworkGraph(capacity_imbalance_fee_divisor=1000)
+        graph.gen_network(trustlines)
+        click.echo(f"{name} ({len(graph.users)} users, {len(trustlines)} trustlines)")
+        run(graph, queries, seed, max_hops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#! /usr/bin/env python
+"""benchmark pathfinding on a synthetic network with interests
+
+Compares computing the balances with interests for every relaxed edge, as done
+when searching on the networkx graph, with the balances memoized on the
+snapshot, for the first query at a timestamp and for further queries at the
+same timestamp.
+
+run from the root of the repository with:
+
+    python -m benchmarks.interests
+"""
+import random
+import time
+
+import click
+
+from relay.network_graph import alg, trustline_data
+from relay.network_graph.graph import (
+    CurrencyNetworkGraph,
+    SenderPaysCapacityAccumulator,
+)
+from relay.network_graph.interests import SECONDS_PER_YEAR, calculate_interests
+
+from .networks import random_network
+
+
+def time_calculate_interests(interest_rate, repetitions=100_000):
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        calculate_interests(10_000, interest_rate, SECONDS_PER_YEAR)
+    return (time.perf_counter() - start) / repetitions
+
+
+@click.command()
+@click.option("--users", default=20_000, show_default=True)
+@click.option("--trustlines", default=100_000, show_default=True)
+@click.option("--queries", default=20, show_default=True)
+@click.option("--interest-rate", default=200, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+def main(users, trustlines, queries, interest_rate, seed):
+    for rate in [0, interest_rate]:
+        click.echo(
+            f"calculate_interests with rate {rate}: "
+            f"{time_calculate_interests(rate) * 1e6:.2f}us"
+        )
+
+    graph = CurrencyNetworkGraph(capacity_imbalance_fee_divisor=1000)
+    graph.gen_network(
+        random_network(users, trustlines, seed=seed, interest_rate=interest_rate)
+    )
+    snapshot = graph.snapshot
+    rng = random.Random(seed)
+    pairs = [tuple(rng.sample(snapshot.nodes, 2)) for _ in range(queries)]
+    timestamp = SECONDS_PER_YEAR
+
+    def search(on_snapshot, source, target, timestamp):
+        capacity_accumulator = SenderPaysCapacityAccumulator(
+            timestamp=timestamp,
+            capacity_imbalance_fee_divisor=1000,
+            trustline_data=snapshot if on_snapshot else trustline_data,
+        )
+        if not on_snapshot:
+            source, target = snapshot.addresses[source], snapshot.addresses[target]
+        try:
+            alg.least_cost_path(
+                graph=snapshot if on_snapshot else graph.graph,
+                starting_nodes={source},
+                target_nodes={target},
+                cost_accumulator=capacity_accumulator,
+            )
+        except alg.nx.NetworkXNoPath:
+            pass
+
+    for name, on_snapshot, timestamps in [
+        ("networkx graph", False, [timestamp] * queries),
+        ("snapshot, new timestamp", True, range(timestamp, timestamp + queries)),
+        ("snapshot, same timestamp", True, [timestamp] * queries),
+    ]:
+        start = time.perf_counter()
+        for (source, target), query_timestamp in zip(pairs, timestamps):
+            search(on_snapshot, source, target, query_timestamp)
+        elapsed = time.perf_counter() - start
+        click.echo(f"{name}: {elapsed / queries * 1000:.1f}ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""deterministic generators for synthetic trustlines networks"""
+import random
+from typing import List
+
+import networkx as nx
+
+from relay.blockchain.currency_network_proxy import Trustline
+
+
+def random_addresses(rng: random.Random, number_of_users: int) -> List[str]:
+    return [
+        "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+        for _ in range(number_of_users)
+    ]
+
+
+def random_trustline(
+    rng: random.Random, a: str, b: str, *, interest_rate: int = 0, frozen: float = 0
+) -> Trustline:
+    if b < a:
+        a, b = b, a
+    creditline_given = rng.randint(0, 10_000)
+    creditline_received = rng.randint(0, 10_000)
+    return Trustline(
+        user=a,
+        counter_party=b,
+        creditline_given=creditline_given,
+        creditline_received=creditline_received,
+        interest_rate_given=interest_rate,
+        interest_rate_received=interest_rate,
+        is_frozen=rng.random() < frozen,
+        m_time=0,
+        balance=rng.randint(-creditline_received, creditline_given),
+    )
+
+
+def random_network(
+    number_of_users: int,
+    number_of_trustlines: int,
+    *,
+    seed: int = 0,
+    interest_rate: int = 0,
+    frozen: float = 0,
+) -> List[Trustline]:
+    """Returns the trustlines of a random network, with the counterparties of
+    every trustline chosen uniformly"""
+    rng = random.Random(seed)
+    users = random_addresses(rng, number_of_users)
+    pairs = set()
+    while len(pairs) < number_of_trustlines:
+        a, b = rng.sample(users, 2)
+        pairs.add((min(a, b), max(a, b)))
+    return [
+        random_trustline(rng, a, b, interest_rate=interest_rate, frozen=frozen)
+        for a, b in sorted(pairs)
+    ]
+
+
+def scale_free_network(
+    number_of_users: int,
+    trustlines_per_user: int,
+    *,
+    seed: int = 0,
+    interest_rate: int = 0,
+    frozen: float = 0,
+) -> List[Trustline]:
+    """Returns the trustlines of a scale-free network grown by preferential
+    attachment, where every new user opens trustlines_per_user trustlines"""
+    rng = random.Random(seed)
+    users = random_addresses(rng, number_of_users)
+    graph = nx.barabasi_albert_graph(number_of_users, trustlines_per_user, seed=seed)
+    pairs = {
+        (min(users[a], users[b]), max(users[a], users[b])) for a, b in graph.edges()
+    }
+    return [
+        random_trustline(rng, a, b, interest_rate=interest_rate, frozen=frozen)
+        for a, b in sorted(pairs)
+    ]
+
+
+def hub_heavy_network(
+    number_of_users: int,
+    number_of_trustlines: int,
+    *,
+    number_of_hubs: int = 10,
+    hub_share: float = 0.5,
+    seed: int = 0,
+    interest_rate: int = 0,
+    frozen: float = 0,
+) -> List[Trustline]:
+    """Returns the trustlines of a network with a few hubs, e.g. exchanges or
+    shops, which are the counterparty of hub_share of all trustlines"""
+    rng = random.Random(seed)
+    users = random_addresses(rng, number_of_users)
+    hubs = users[:number_of_hubs]
+    pairs = set()
+    while len(pairs) < number_of_trustlines:
+        if rng.random() < hub_share:
+            a, b = rng.choice(hubs), rng.choice(users)
+            if a == b:
+                continue
+        else:
+            a, b = rng.sample(users, 2)
+        pairs.add((min(a, b), max(a, b)))
+    return [
+        random_trustline(rng, a, b, interest_rate=interest_rate, frozen=frozen)
+        for a, b in sorted(pairs)
+    ]
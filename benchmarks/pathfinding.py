@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+"""benchmark pathfinding on a synthetic network
+
+run from the root of the repository with:
+
+    python -m benchmarks.pathfinding
+"""
+import random
+import time
+
+import click
+
+from relay.network_graph import alg
+from relay.network_graph.graph import (
+    CurrencyNetworkGraph,
+    SenderPaysCostAccumulatorSnapshot,
+)
+
+from .networks import random_network
+
+
+def time_queries(function, queries):
+    start = time.perf_counter()
+    for source, target in queries:
+        function(source, target)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--users", default=20_000, show_default=True)
+@click.option("--trustlines", default=100_000, show_default=True)
+@click.option("--queries", default=50, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+def main(users, trustlines, queries, seed):
+    graph = CurrencyNetworkGraph(capacity_imbalance_fee_divisor=1000)
+    graph.gen_network(random_network(users, trustlines, seed=seed))
+    rng = random.Random(seed)
+    pairs = [tuple(rng.sample(graph.users, 2)) for _ in range(queries)]
+
+    start = time.perf_counter()
+    snapshot = graph.snapshot
+    click.echo(f"building the snapshot: {time.perf_counter() - start:.3f}s")
+
+    def on_networkx_graph(source, target):
+        cost_accumulator = SenderPaysCostAccumulatorSnapshot(
+            timestamp=0, value=1000, capacity_imbalance_fee_divisor=1000
+        )
+        try:
+            alg.least_cost_path(
+                graph=graph.graph,
+                starting_nodes={target},
+                target_nodes={source},
+                cost_accumulator=cost_accumulator,
+            )
+        except alg.nx.NetworkXNoPath:
+            pass
+
+    def on_snapshot(source, target):
+        cost_accumulator = SenderPaysCostAccumulatorSnapshot(
+            timestamp=0,
+            value=1000,
+            capacity_imbalance_fee_divisor=1000,
+            trustline_data=snapshot,
+        )
+        try:
+            alg.least_cost_path(
+                graph=snapshot,
+                starting_nodes={snapshot.ids[target]},
+                target_nodes={snapshot.ids[source]},
+                cost_accumulator=cost_accumulator,
+            )
+        except alg.nx.NetworkXNoPath:
+            pass
+
+    for name, function in [
+        ("networkx graph", on_networkx_graph),
+        ("snapshot", on_snapshot),
+    ]:
+        elapsed = time_queries(function, pairs)
+        click.echo(f"{name}: {elapsed / queries * 1000:.1f}ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#! /usr/bin/env python
+"""benchmark suite for the pathfinding and the updates of network graphs
+
+Runs every benchmark on deterministic synthetic networks of different shapes
+and sizes, with and without interests and frozen trustlines, and writes the
+results as json, so that the results of different commits can be compared.
+
+run from the root of the repository with:
+
+    python -m benchmarks.suite run --output results.json
+    python -m benchmarks.suite compare old-results.json results.json
+
+The default sizes finish in a few minutes, use e.g. `--edges 1000000` for a
+network with a million trustlines.
+"""
+import datetime
+import json
+import math
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import click
+
+from relay.ethindex_db.sync_updates import (
+    BalanceUpdateFeedUpdate,
+    TrustlineUpdateFeedUpdate,
+)
+from relay.network_graph.graph import CurrencyNetworkGraph
+from relay.network_graph.interests import SECONDS_PER_YEAR
+
+from .networks import hub_heavy_network, random_network, scale_free_network
+
+FORMAT_VERSION = 1
+
+TRUSTLINES_PER_USER = 5
+INTEREST_RATE = 200
+FROZEN_SHARE = 0.05
+CAPACITY_IMBALANCE_FEE_DIVISOR = 1000
+VALUE = 1000
+
+NETWORKS: Dict[str, Callable] = {
+    "random": lambda edges, **kwargs: random_network(
+        max(edges // TRUSTLINES_PER_USER, 10), edges, **kwargs
+    ),
+    "scale-free": lambda edges, **kwargs: scale_free_network(
+        max(edges // TRUSTLINES_PER_USER, 10), TRUSTLINES_PER_USER, **kwargs
+    ),
+    "hub-heavy": lambda edges, **kwargs: hub_heavy_network(
+        max(edges // TRUSTLINES_PER_USER, 10), edges, **kwargs
+    ),
+}
+
+VARIANTS = {
+    "plain": dict(interest_rate=0, frozen=0),
+    "interests": dict(interest_rate=INTEREST_RATE, frozen=0),
+    "frozen": dict(interest_rate=0, frozen=FROZEN_SHARE),
+}
+
+
+def git_commit() -> str:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(durations: List[float]) -> Dict:
+    """Returns statistics of the durations in milliseconds"""
+    milliseconds = sorted(duration * 1000 for duration in durations)
+    return {
+        "unit": "ms",
+        "count": len(milliseconds),
+        "mean": statistics.mean(milliseconds),
+        "median": statistics.median(milliseconds),
+        "p95": milliseconds[min(len(milliseconds) - 1, int(len(milliseconds) * 0.95))],
+        "min": milliseconds[0],
+        "max": milliseconds[-1],
+    }
+
+
+def time_calls(function: Callable, arguments: List) -> List[float]:
+    durations = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def feed_updates(graph: CurrencyNetworkGraph, rng: random.Random, number, timestamp):
+    """Returns feed updates changing the balances and creditlines of random
+    existing trustlines"""
+    edges = list(graph.graph.edges(data=True))
+    updates = []
+    for _ in range(number):
+        a, b, data = rng.choice(edges)
+        if rng.random() < 0.8:
+            updates.append(
+                BalanceUpdateFeedUpdate(
+                    address="",
+                    timestamp=timestamp,
+                    args={"_from": a, "_to": b, "_value": data.balance_ab + 1},
+                )
+            )
+        else:
+            updates.append(
+                TrustlineUpdateFeedUpdate(
+                    address="",
+                    timestamp=timestamp,
+                    args={
+                        "_creditor": a,
+                        "_debtor": b,
+                        "_creditlineGiven": data.creditline_ab + 1,
+                        "_creditlineReceived": data.creditline_ba,
+                        "_interestRateGiven": data.interest_ab,
+                        "_interestRateReceived": data.interest_ba,
+                        "_isFrozen": data.is_frozen,
+                    },
+                )
+            )
+    return updates
+
+
+def run_scenario(network, edges, variant, *, queries, updates, seed) -> List[Dict]:
+    variant_options = VARIANTS[variant]
+    trustlines = NETWORKS[network](edges, seed=seed, **variant_options)
+    timestamp = SECONDS_PER_YEAR if variant_options["interest_rate"] else 0
+    scenario = {
+        "network": network,
+        "edges": len(trustlines),
+        "variant": variant,
+        "seed": seed,
+    }
+    results = []
+
+    def add_result(benchmark, durations, **extra):
+        results.append(
+            {"benchmark": benchmark, **scenario, **summarize(durations), **extra}
+        )
+
+    graph = CurrencyNetworkGraph(
+        capacity_imbalance_fee_divisor=CAPACITY_IMBALANCE_FEE_DIVISOR,
+        default_interest_rate=variant_options["interest_rate"],
+        custom_interests=variant_options["interest_rate"] > 0,
+    )
+    start = time.perf_counter()
+    graph.gen_network(trustlines)
+    duration = time.perf_counter() - start
+    scenario["users"] = graph.number_of_users
+    add_result("gen_network", [duration])
+    start = time.perf_counter()
+    graph.snapshot
+    add_result("snapshot", [time.perf_counter() - start])
+
+    rng = random.Random(seed)
+    users = graph.users
+    pairs = [tuple(rng.sample(users, 2)) for _ in range(queries)]
+    for method_name in [
+        "find_transfer_path_sender_pays_fees",
+        "find_transfer_path_receiver_pays_fees",
+    ]:
+        method = getattr(graph, method_name)
+        found = []
+
+        def find_path(source, target):
+            fee, path = method(source, target, VALUE, timestamp=timestamp)
+            found.append(bool(path))
+
+        add_result(
+            method_name, time_calls(find_path, pairs), found=sum(found) / len(pairs)
+        )
+
+    def find_maximum_capacity_path(source, target):
+        graph.find_maximum_capacity_path(source, target, timestamp=timestamp)
+
+    add_result(
+        "find_maximum_capacity_path", time_calls(find_maximum_capacity_path, pairs)
+    )
+
+    trustline_pairs = [
+        (a, b)
+        for a, b, _ in rng.sample(
+            list(graph.graph.edges(data=True)), min(queries, len(trustlines))
+        )
+    ]
+
+    def close_trustline_path_triangulation(source, target):
+        graph.close_trustline_path_triangulation(timestamp, source, target)
+
+    add_result(
+        "close_trustline_path_triangulation",
+        time_calls(close_trustline_path_triangulation, trustline_pairs),
+    )
+
+    updates_to_apply = feed_updates(graph, rng, updates, timestamp)
+    durations = time_calls(graph.update_from_feed, [(u,) for u in updates_to_apply])
+    add_result(
+        "update_from_feed",
+        durations,
+        throughput=len(durations) / sum(durations),
+        throughput_unit="updates/s",
+    )
+
+    start = time.perf_counter()
+    graph.apply_feed_updates(updates_to_apply)
+    duration = time.perf_counter() - start
+    add_result(
+        "apply_feed_updates",
+        [duration],
+        throughput=len(updates_to_apply) / duration,
+        throughput_unit="updates/s",
+    )
+    return results
+
+
+def parse_list(_ctx, _param, value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@click.option(
+    "--edges",
+    default="1000,10000,100000",
+    show_default=True,
+    callback=parse_list,
+    help="comma separated numbers of trustlines, e.g. 1000,1000000",
+)
+@click.option(
+    "--networks", default=",".join(NETWORKS), show_default=True, callback=parse_list,
+)
+@click.option(
+    "--variants", default=",".join(VARIANTS), show_default=True, callback=parse_list,
+)
+@click.option("--queries", default=50, show_default=True)
+@click.option("--updates", default=1000, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), default=None)
+def run(edges, networks, variants, queries, updates, seed, output):
+    """run the benchmarks and write the results as json"""
+    for network in networks:
+        if network not in NETWORKS:
+            raise click.BadParameter(f"Unknown network: {network}")
+    for variant in variants:
+        if variant not in VARIANTS:
+            raise click.BadParameter(f"Unknown variant: {variant}")
+
+    results = []
+    for number_of_edges in edges:
+        for network in networks:
+            for variant in variants:
+                click.echo(f"{network} network, {number_of_edges} edges, {variant}")
+                scenario_results = run_scenario(
+                    network,
+                    int(number_of_edges),
+                    variant,
+                    queries=queries,
+                    updates=updates,
+                    seed=seed,
+                )
+                for result in scenario_results:
+                    click.echo(
+                        f"  {result['benchmark']:>38}: "
+                        f"{result['mean']:10.3f}ms mean, "
+                        f"{result['median']:10.3f}ms median"
+                    )
+                results.extend(scenario_results)
+
+    report = {
+        "format_version": FORMAT_VERSION,
+        "commit": git_commit(),
+        "date": datetime.datetime.utcnow().isoformat(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if output is None:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def result_key(result):
+    return (
+        result["benchmark"],
+        result["network"],
+        result["edges"],
+        result["variant"],
+        result["seed"],
+    )
+
+
+@cli.command()
+@click.argument("baseline", type=click.File())
+@click.argument("current", type=click.File())
+@click.option(
+    "--threshold",
+    default=1.2,
+    show_default=True,
+    help="ratio of the mean durations above which a result counts as regression",
+)
+def compare(baseline, current, threshold):
+    """compare the results of two runs, exits with 1 if there are regressions"""
+    baseline_results = {
+        result_key(result): result for result in json.load(baseline)["results"]
+    }
+    regressions = 0
+    for result in json.load(current)["results"]:
+        old_result = baseline_results.get(result_key(result))
+        if old_result is None:
+            continue
+        ratio = result["mean"] / old_result["mean"] if old_result["mean"] else math.inf
+        is_regression = ratio > threshold
+        regressions += is_regression
+        click.echo(
+            f"{' '.join(str(part) for part in result_key(result)[:4]):>70}: "
+            f"{old_result['mean']:10.3f}ms -> {result['mean']:10.3f}ms "
+            f"({ratio:5.2f}x){' REGRESSION' if is_regression else ''}"
+        )
+    if regressions:
+        click.echo(f"{regressions} regressions")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli()
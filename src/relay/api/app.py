@@ -42,11 +42,15 @@ from .resources import (
     GraphImage,
     IdentityInfos,
     MaxCapacityPath,
+    MaxCapacityPaths,
     MetaTransactionFees,
     Network,
     NetworkList,
     NetworkTrustlinesList,
     Path,
+    PathBatch,
+    PathCacheStatistics,
+    PathfindingMetrics,
     Relay,
     RelayMetaTransaction,
     RequestEther,
@@ -186,11 +190,23 @@ def ApiApp(trustlines, *, enabled_apis):
             MaxCapacityPath,
             "/networks/<address:network_address>/max-capacity-path-info",
         )
+        add_resource(
+            MaxCapacityPaths,
+            "/networks/<address:network_address>/max-capacity-paths-info",
+        )
         add_resource(Path, "/networks/<address:network_address>/path-info")
+        add_resource(PathBatch, "/networks/<address:network_address>/path-info/batch")
         add_resource(
             CloseTrustline,
             "/networks/<address:network_address>/close-trustline-path-info",
         )
+        add_resource(
+            PathCacheStatistics, "/networks/<address:network_address>/path-cache"
+        )
+        add_resource(
+            PathfindingMetrics,
+            "/networks/<address:network_address>/pathfinding-metrics",
+        )
 
     if ApiType.RELAY in enabled_apis:
         add_resource(Relay, "/relay")
@@ -263,15 +279,25 @@ def ApiApp(trustlines, *, enabled_apis):
     return app
 
 
+def _validation_error_messages(messages, prefix=""):
+    """flattens the possibly nested messages of a validation error, e.g. for
+    a list of nested fields"""
+    for field, field_messages in messages.items():
+        if isinstance(field_messages, dict):
+            yield from _validation_error_messages(
+                field_messages, prefix=f"{prefix}{field}."
+            )
+        else:
+            yield f"{prefix}{field}: {', '.join(field_messages)}"
+
+
 # This error handler is necessary for usage with Flask-RESTful
 @parser.error_handler
 def handle_request_parsing_error(err, req, schema, status_code, headers):
     """webargs error handler that uses Flask-RESTful's abort function to return
     a JSON error response to the client.
     """
-    message = ", ".join(
-        f"{field}: {', '.join(messages)}" for field, messages in err.messages.items()
-    )
+    message = ", ".join(_validation_error_messages(err.messages))
     abort(
         422, message=f"Validation errors in your request: {message}", error=err.messages
     )
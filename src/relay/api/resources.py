@@ -1,3 +1,4 @@
+import functools
 import logging
 import tempfile
 import time
@@ -34,7 +35,8 @@ from relay.ethindex_db.events_informations import (
     IdentifiedNotPartOfTransferException,
     TransferNotFoundException,
 )
-from relay.network_graph.payment_path import FeePayer, PaymentPath
+from relay.network_graph.alg import SearchBudgetExceeded
+from relay.network_graph.payment_path import FeePayer, PathRequest, PaymentPath
 from relay.relay import TrustlinesRelay, all_event_contract_types
 from relay.utils import get_version, sha3
 
@@ -64,8 +66,13 @@ from .schemas import (
 
 logger = logging.getLogger("api.resources")
 
+# maximum number of searches requested at once from the batch path endpoints
+MAX_BATCH_SIZE = 100
+
 
 def abort_if_unknown_network(trustlines, network_address):
+    if trustlines.is_currency_network_syncing(network_address):
+        abort(503, "Network is being synced: {}".format(network_address))
     if not trustlines.is_currency_network(network_address):
         abort(404, "Unknown network: {}".format(network_address))
 
@@ -80,6 +87,15 @@ def abort_if_unknown_or_frozen_network(trustlines, network_address):
     abort_if_frozen_network(trustlines, network_address)
 
 
+def get_or_compute_path(trustlines, network_address, key, compute):
+    """Returns the cached result of the path query or computes it, aborts if
+    the search exceeded its search budget"""
+    try:
+        return trustlines.path_caches[network_address].get_or_compute(key, compute)
+    except SearchBudgetExceeded as e:
+        abort(422, f"Search budget exceeded: {e}")
+
+
 def dump_result_with_schema(schema):
     """returns a decorator that calls schema.dump on the functions or methods
     return value"""
@@ -195,6 +211,7 @@ class ContactList(Resource):
         )
 
 
+@functools.lru_cache(maxsize=2 ** 18)
 def _id(network_address, a_address, b_address):
     if a_address < b_address:
         return sha3(network_address + a_address + b_address)
@@ -213,6 +230,45 @@ def _get_extended_account_summary(
     return account_summary
 
 
+def _dump_account_summaries(network_address, account_summaries):
+    """Dumps columnar account summaries in the format of TrustlineSchema"""
+    return [
+        {
+            "leftGiven": str(creditline_given - balance),
+            "leftReceived": str(balance + creditline_received),
+            "interestRateGiven": str(interest_rate_given),
+            "interestRateReceived": str(interest_rate_received),
+            "isFrozen": is_frozen,
+            "given": str(creditline_given),
+            "received": str(creditline_received),
+            "balance": str(balance),
+            "user": user,
+            "counterParty": counter_party,
+            "id": _id(network_address, user, counter_party),
+            "currencyNetwork": network_address,
+        }
+        for (
+            user,
+            counter_party,
+            balance,
+            creditline_given,
+            creditline_received,
+            interest_rate_given,
+            interest_rate_received,
+            is_frozen,
+        ) in zip(
+            account_summaries.user,
+            account_summaries.counter_party,
+            account_summaries.balance,
+            account_summaries.creditline_given,
+            account_summaries.creditline_received,
+            account_summaries.interest_rate_given,
+            account_summaries.interest_rate_received,
+            account_summaries.is_frozen,
+        )
+    ]
+
+
 class Trustline(Resource):
     def __init__(self, trustlines: TrustlinesRelay) -> None:
         self.trustlines = trustlines
@@ -231,43 +287,37 @@ class TrustlineList(Resource):
     def __init__(self, trustlines: TrustlinesRelay) -> None:
         self.trustlines = trustlines
 
-    @dump_result_with_schema(TrustlineSchema(many=True))
     def get(self, network_address: str, user_address: str):
         abort_if_unknown_network(self.trustlines, network_address)
         timestamp = int(time.time())
-        graph = self.trustlines.currency_network_graphs[network_address]
+        graph = self.trustlines.currency_network_graphs[network_address].pinned()
         friends = graph.get_friends(user_address)
-        return [
-            _get_extended_account_summary(
-                graph,
-                network_address,
-                user_address,
-                friend_address,
-                timestamp=timestamp,
-            )
-            for friend_address in friends
-        ]
+        return _dump_account_summaries(
+            network_address,
+            graph.get_account_summaries(
+                timestamp, [(user_address, friend) for friend in friends]
+            ),
+        )
 
 
 class UserTrustlines(Resource):
     def __init__(self, trustlines: TrustlinesRelay) -> None:
         self.trustlines = trustlines
 
-    @dump_result_with_schema(TrustlineSchema(many=True))
     def get(self, user_address: str):
         timestamp = int(time.time())
         trustline_list = []
         for network_address, graph in self.trustlines.currency_network_graphs.items():
-            for friend_address in graph.get_friends(user_address):
-                trustline_list.append(
-                    _get_extended_account_summary(
-                        graph,
-                        network_address,
-                        user_address,
-                        friend_address,
-                        timestamp=timestamp,
-                    )
+            graph = graph.pinned()
+            friends = graph.get_friends(user_address)
+            trustline_list.extend(
+                _dump_account_summaries(
+                    network_address,
+                    graph.get_account_summaries(
+                        timestamp, [(user_address, friend) for friend in friends]
+                    ),
                 )
+            )
         return trustline_list
 
 
@@ -275,18 +325,13 @@ class NetworkTrustlinesList(Resource):
     def __init__(self, trustlines: TrustlinesRelay) -> None:
         self.trustlines = trustlines
 
-    @dump_result_with_schema(TrustlineSchema(many=True))
     def get(self, network_address: str):
         abort_if_unknown_network(self.trustlines, network_address)
         timestamp = int(time.time())
-        graph = self.trustlines.currency_network_graphs[network_address]
-        all_trustlines = graph.get_trustlines_list()
-        return [
-            _get_extended_account_summary(
-                graph, network_address, a, b, timestamp=timestamp
-            )
-            for (a, b) in all_trustlines
-        ]
+        graph = self.trustlines.currency_network_graphs[network_address].pinned()
+        return _dump_account_summaries(
+            network_address, graph.get_account_summaries(timestamp)
+        )
 
 
 class MaxCapacityPath(Resource):
@@ -307,17 +352,71 @@ class MaxCapacityPath(Resource):
         target = args["to"]
         max_hops = args["maxHops"]
 
-        timestamp = int(time.time())
-
-        capacity, path = self.trustlines.currency_network_graphs[
-            network_address
-        ].find_maximum_capacity_path(
-            source=source, target=target, max_hops=max_hops, timestamp=timestamp
+        capacity, path = get_or_compute_path(
+            self.trustlines,
+            network_address,
+            ("max-capacity-path", source, target, max_hops),
+            lambda: self.trustlines.find_path(
+                network_address,
+                "find_maximum_capacity_path",
+                endpoint="max-capacity-path-info",
+                source=source,
+                target=target,
+                max_hops=max_hops,
+                timestamp=int(time.time()),
+            ),
         )
 
         return {"capacity": str(capacity), "path": path}
 
 
+class MaxCapacityPaths(Resource):
+    def __init__(self, trustlines: TrustlinesRelay) -> None:
+        self.trustlines = trustlines
+
+    args = {
+        "maxHops": fields.Int(required=False, missing=None),
+        "from": custom_fields.Address(required=True),
+        "to": fields.List(
+            custom_fields.Address(),
+            required=True,
+            validate=validate.Length(max=MAX_BATCH_SIZE),
+        ),
+    }
+
+    @use_args(args)
+    def post(self, args, network_address: str):
+        abort_if_unknown_or_frozen_network(self.trustlines, network_address)
+
+        source = args["from"]
+        targets = args["to"]
+        max_hops = args["maxHops"]
+
+        capacity_paths = get_or_compute_path(
+            self.trustlines,
+            network_address,
+            ("max-capacity-paths", source, tuple(targets), max_hops),
+            lambda: self.trustlines.find_path(
+                network_address,
+                "find_maximum_capacity_paths",
+                endpoint="max-capacity-paths-info",
+                source=source,
+                targets=targets,
+                max_hops=max_hops,
+                timestamp=int(time.time()),
+            ),
+        )
+
+        return [
+            {
+                "to": target,
+                "capacity": str(capacity_paths[target].capacity),
+                "path": capacity_paths[target].path,
+            }
+            for target in targets
+        ]
+
+
 class UserEventsNetwork(Resource):
     def __init__(self, trustlines: TrustlinesRelay) -> None:
         self.trustlines = trustlines
@@ -798,7 +897,6 @@ class Path(Resource):
     @dump_result_with_schema(PaymentPathSchema())
     def post(self, args, network_address: str):
         abort_if_unknown_or_frozen_network(self.trustlines, network_address)
-        timestamp = int(time.time())
 
         source = args["from"]
         target = args["to"]
@@ -808,35 +906,74 @@ class Path(Resource):
         fee_payer = FeePayer(args["feePayer"])
 
         if fee_payer == FeePayer.SENDER:
-            cost, path = self.trustlines.currency_network_graphs[
-                network_address
-            ].find_transfer_path_sender_pays_fees(
-                source=source,
-                target=target,
-                value=value,
-                max_fees=max_fees,
-                max_hops=max_hops,
-                timestamp=timestamp,
-            )
+            method_name = "find_transfer_path_sender_pays_fees"
         elif fee_payer == FeePayer.RECEIVER:
-            cost, path = self.trustlines.currency_network_graphs[
-                network_address
-            ].find_transfer_path_receiver_pays_fees(
+            method_name = "find_transfer_path_receiver_pays_fees"
+        else:
+            raise ValueError(
+                f"feePayer has to be one of {[fee_payer.name for fee_payer in FeePayer]}: {fee_payer}"
+            )
+
+        cost, path = get_or_compute_path(
+            self.trustlines,
+            network_address,
+            ("path", source, target, value, max_fees, max_hops, fee_payer),
+            lambda: self.trustlines.find_path(
+                network_address,
+                method_name,
+                endpoint="path-info",
                 source=source,
                 target=target,
                 value=value,
                 max_fees=max_fees,
                 max_hops=max_hops,
-                timestamp=timestamp,
-            )
-        else:
-            raise ValueError(
-                f"feePayer has to be one of {[fee_payer.name for fee_payer in FeePayer]}: {fee_payer}"
-            )
+                timestamp=int(time.time()),
+            ),
+        )
 
         return PaymentPath(cost, path, value, fee_payer=fee_payer)
 
 
+class PathBatch(Resource):
+    def __init__(self, trustlines: TrustlinesRelay) -> None:
+        self.trustlines = trustlines
+
+    args = {
+        "paths": fields.List(
+            fields.Nested(Path.args),
+            required=True,
+            validate=validate.Length(max=MAX_BATCH_SIZE),
+        )
+    }
+
+    @use_args(args)
+    @dump_result_with_schema(PaymentPathSchema(many=True))
+    def post(self, args, network_address: str):
+        abort_if_unknown_or_frozen_network(self.trustlines, network_address)
+
+        path_requests = [
+            PathRequest(
+                source=path_args["from"],
+                target=path_args["to"],
+                value=path_args["value"],
+                max_hops=path_args["maxHops"],
+                max_fees=path_args["maxFees"],
+                fee_payer=FeePayer(path_args["feePayer"]),
+            )
+            for path_args in args["paths"]
+        ]
+
+        # all items are searched on the same version of the graph, an item
+        # exceeding the search budget gets an empty path
+        return self.trustlines.find_path(
+            network_address,
+            "find_payment_paths",
+            endpoint="path-info-batch",
+            path_requests=path_requests,
+            timestamp=int(time.time()),
+        )
+
+
 # CloseTrustline is similar to the above ReduceDebtPath, though it does not
 # take `via` and `value` as parameters. Instead it tries to reduce the debt to
 # zero and uses any contact to do so.
@@ -862,20 +999,51 @@ class CloseTrustline(Resource):
         max_fees = args["maxFees"]
         max_hops = args["maxHops"]
 
-        now = int(time.time())
-        graph = self.trustlines.currency_network_graphs[network_address]
-
-        payment_path = graph.close_trustline_path_triangulation(
-            timestamp=now,
-            source=source,
-            target=target,
-            max_hops=max_hops,
-            max_fees=max_fees,
+        payment_path = get_or_compute_path(
+            self.trustlines,
+            network_address,
+            ("close-trustline-path", source, target, max_hops, max_fees),
+            lambda: self.trustlines.find_path(
+                network_address,
+                "close_trustline_path_triangulation",
+                endpoint="close-trustline-path-info",
+                timestamp=int(time.time()),
+                source=source,
+                target=target,
+                max_hops=max_hops,
+                max_fees=max_fees,
+            ),
         )
 
         return payment_path
 
 
+class PathCacheStatistics(Resource):
+    def __init__(self, trustlines: TrustlinesRelay) -> None:
+        self.trustlines = trustlines
+
+    def get(self, network_address: str):
+        abort_if_unknown_network(self.trustlines, network_address)
+        path_cache = self.trustlines.path_caches[network_address]
+        return {
+            "hits": path_cache.hits,
+            "misses": path_cache.misses,
+            "size": len(path_cache),
+            "maxSize": path_cache.maxsize,
+            "maxAge": path_cache.max_age,
+            "graphVersion": path_cache.graph.version,
+        }
+
+
+class PathfindingMetrics(Resource):
+    def __init__(self, trustlines: TrustlinesRelay) -> None:
+        self.trustlines = trustlines
+
+    def get(self, network_address: str):
+        abort_if_unknown_network(self.trustlines, network_address)
+        return self.trustlines.pathfinding_metrics.network_metrics(network_address)
+
+
 class GraphImage(MethodView):
     def __init__(self, trustlines: TrustlinesRelay) -> None:
         self.trustlines = trustlines
@@ -0,0 +1,226 @@
+"""perform many read-only contract calls concurrently
+
+The calls are split into chunks which are sent concurrently by a bounded pool
+of greenlets. With an HTTP provider every chunk is sent as a single JSON-RPC
+batch request, other providers or nodes not supporting batch requests get one
+request per call. Failed chunks are retried, the progress is logged.
+"""
+import json
+import logging
+import time
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+import gevent
+import gevent.pool
+import requests
+from eth_utils import to_checksum_address
+from web3 import HTTPProvider
+
+logger = logging.getLogger("batch_calls")
+
+# seconds between two progress messages
+PROGRESS_LOG_INTERVAL = 5
+
+
+class BatchCallError(Exception):
+    pass
+
+
+class ContractCall(NamedTuple):
+    function_name: str
+    args: Tuple = ()
+
+
+def _normalize_output(output_type: str, value):
+    """checksum addresses like web3 does for the results of calls"""
+    if output_type == "address":
+        return to_checksum_address(value)
+    elif output_type == "address[]":
+        return [to_checksum_address(address) for address in value]
+    return value
+
+
+class BatchCaller:
+    def __init__(
+        self,
+        web3,
+        *,
+        batch_size: int = 100,
+        concurrency: int = 8,
+        retries: int = 3,
+        retry_interval: float = 1.0,
+    ) -> None:
+        self._web3 = web3
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self._batch_requests_supported = isinstance(web3.provider, HTTPProvider)
+        if not self._batch_requests_supported:
+            # Other providers share one connection, which may not be used
+            # concurrently
+            self.concurrency = 1
+
+    def call(
+        self,
+        contract,
+        calls: Sequence[ContractCall],
+        block_identifier="latest",
+        description: str = "calls",
+    ) -> List[Any]:
+        """Call the functions of contract and return their results in the
+        order of the calls
+
+        Raises BatchCallError if a chunk of calls still failed after all retries.
+        """
+        results: List[Any] = [None] * len(calls)
+        if not calls:
+            return results
+        progress = _Progress(description, len(calls))
+        output_types = {
+            function_name: [
+                output["type"]
+                for output in contract.get_function_by_name(function_name).abi[
+                    "outputs"
+                ]
+            ]
+            for function_name in {call.function_name for call in calls}
+        }
+
+        def run(start: int):
+            chunk = calls[start : start + self.batch_size]
+            results[start : start + len(chunk)] = self._call_chunk_with_retries(
+                contract, chunk, block_identifier, output_types
+            )
+            progress.done(len(chunk))
+
+        pool = gevent.pool.Pool(self.concurrency)
+        try:
+            greenlets = [
+                pool.spawn(run, start)
+                for start in range(0, len(calls), self.batch_size)
+            ]
+            gevent.joinall(greenlets, raise_error=True)
+        finally:
+            pool.kill()
+        progress.finish()
+        return results
+
+    def _call_chunk_with_retries(
+        self, contract, chunk: Sequence[ContractCall], block_identifier, output_types
+    ) -> List[Any]:
+        attempt = 0
+        while True:
+            try:
+                return self._call_chunk(contract, chunk, block_identifier, output_types)
+            except (BatchCallError, requests.RequestException, ValueError) as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise BatchCallError(
+                        f"Calls failed after {self.retries} retries: {e}"
+                    ) from e
+                logger.warning(f"Calls failed, retry {attempt} of {self.retries}: {e}")
+                gevent.sleep(self.retry_interval * attempt)
+
+    def _call_chunk(
+        self, contract, chunk: Sequence[ContractCall], block_identifier, output_types
+    ) -> List[Any]:
+        block = self._block_parameter(block_identifier)
+        transactions = [
+            {
+                "to": contract.address,
+                "data": contract.encodeABI(fn_name=call.function_name, args=call.args),
+            }
+            for call in chunk
+        ]
+        return_data: Optional[List[bytes]] = None
+        if self._batch_requests_supported:
+            try:
+                return_data = self._batch_request(transactions, block)
+            except _BatchRequestsNotSupported:
+                logger.info("Node does not support batch requests, disable them")
+                self._batch_requests_supported = False
+        if return_data is None:
+            return_data = [
+                self._web3.eth.call(transaction, block) for transaction in transactions
+            ]
+        return [
+            self._decode(call.function_name, output_types[call.function_name], data)
+            for call, data in zip(chunk, return_data)
+        ]
+
+    def _block_parameter(self, block_identifier):
+        if isinstance(block_identifier, int):
+            return hex(block_identifier)
+        return block_identifier
+
+    def _batch_request(self, transactions, block) -> List[bytes]:
+        provider = self._web3.provider
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": "eth_call", "params": [tx, block]}
+            for i, tx in enumerate(transactions)
+        ]
+        response = requests.post(
+            provider.endpoint_uri,
+            data=json.dumps(payload),
+            **provider.get_request_kwargs(),
+        )
+        response.raise_for_status()
+        responses = response.json()
+        if not isinstance(responses, list):
+            # a single error response is returned if batches are not supported
+            raise _BatchRequestsNotSupported()
+
+        results_by_id = {}
+        for item in responses:
+            if "error" in item:
+                raise BatchCallError(f"Call failed: {item['error']}")
+            results_by_id[item["id"]] = item["result"]
+        if len(results_by_id) != len(transactions):
+            raise BatchCallError(
+                f"Got {len(results_by_id)} results for {len(transactions)} calls"
+            )
+        return [bytes.fromhex(results_by_id[i][2:]) for i in range(len(transactions))]
+
+    def _decode(self, function_name: str, output_types: List[str], data: bytes):
+        try:
+            values = self._web3.codec.decode_abi(output_types, data)
+        except Exception as e:
+            raise BatchCallError(
+                f"Could not decode result of {function_name}: {e}"
+            ) from e
+        values = [
+            _normalize_output(output_type, value)
+            for output_type, value in zip(output_types, values)
+        ]
+        if len(values) == 1:
+            return values[0]
+        return values
+
+
+class _BatchRequestsNotSupported(Exception):
+    pass
+
+
+class _Progress:
+    def __init__(self, description: str, total: int) -> None:
+        self.description = description
+        self.total = total
+        self.completed = 0
+        self.start_time = time.monotonic()
+        self.logged_at = self.start_time
+
+    def done(self, number_of_calls: int) -> None:
+        self.completed += number_of_calls
+        now = time.monotonic()
+        if now - self.logged_at >= PROGRESS_LOG_INTERVAL:
+            self.logged_at = now
+            logger.info(
+                f"{self.description}: {self.completed} of {self.total} calls done"
+            )
+
+    def finish(self) -> None:
+        logger.info(
+            f"{self.description}: {self.total} calls done in "
+            f"{time.monotonic() - self.start_time:.2f}s",
+        )
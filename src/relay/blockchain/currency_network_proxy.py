@@ -1,8 +1,9 @@
 import logging
-from typing import List, NamedTuple
+from typing import List, NamedTuple, Optional
 
 from gevent import Greenlet
 
+from .batch_calls import BatchCaller, ContractCall
 from .currency_network_events import (
     BalanceUpdateEventType,
     TransferEventType,
@@ -64,8 +65,15 @@ class CurrencyNetworkProxy(Proxy):
     def fetch_is_frozen_status(self):
         return self._proxy.functions.isNetworkFrozen().call()
 
-    def gen_graph_representation(self) -> List[Trustline]:
-        """Returns the trustlines network as a dict address -> list of Friendships"""
+    def gen_graph_representation(
+        self, batch_caller: Optional[BatchCaller] = None
+    ) -> List[Trustline]:
+        """Returns the trustlines network as a dict address -> list of Friendships
+
+        With a batch_caller the friends and accounts are fetched concurrently
+        in batches, all at the same block."""
+        if batch_caller is not None:
+            return self._gen_graph_representation_batched(batch_caller)
         result = []
         for user in self.fetch_users():
             for friend in self.fetch_friends(user):
@@ -94,6 +102,54 @@ class CurrencyNetworkProxy(Proxy):
                     )
         return result
 
+    def _gen_graph_representation_batched(
+        self, batch_caller: BatchCaller
+    ) -> List[Trustline]:
+        block_number = self._web3.eth.blockNumber
+        users = list(
+            self._proxy.functions.getUsers().call(block_identifier=block_number)
+        )
+        friends_of_users = batch_caller.call(
+            self._proxy,
+            [ContractCall("getFriends", (user,)) for user in users],
+            block_number,
+            description=f"Fetch friends of users of {self.address}",
+        )
+        pairs = [
+            (user, friend)
+            for user, friends in zip(users, friends_of_users)
+            for friend in friends
+            if user < friend
+        ]
+        accounts = batch_caller.call(
+            self._proxy,
+            [ContractCall("getAccount", pair) for pair in pairs],
+            block_number,
+            description=f"Fetch trustlines of {self.address}",
+        )
+        return [
+            Trustline(
+                user=user,
+                counter_party=friend,
+                creditline_given=creditline_ab,
+                creditline_received=creditline_ba,
+                interest_rate_given=interest_ab,
+                interest_rate_received=interest_ba,
+                is_frozen=is_frozen,
+                m_time=mtime,
+                balance=balance_ab,
+            )
+            for (user, friend), (
+                creditline_ab,
+                creditline_ba,
+                interest_ab,
+                interest_ba,
+                is_frozen,
+                mtime,
+                balance_ab,
+            ) in zip(pairs, accounts)
+        ]
+
     def start_listen_on_balance(self, on_balance, *, start_log_filter=True) -> Greenlet:
         def log(log_entry):
             on_balance(self._build_event(log_entry))
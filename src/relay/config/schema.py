@@ -1,5 +1,12 @@
 from eth_utils import is_address, to_checksum_address
-from marshmallow import Schema, ValidationError, fields, pre_load, validates_schema
+from marshmallow import (
+    Schema,
+    ValidationError,
+    fields,
+    pre_load,
+    validate,
+    validates_schema,
+)
 
 from relay.blockchain.delegate import GasPriceMethod
 from relay.web3provider import ProviderType
@@ -57,6 +64,42 @@ class FaucetSchema(Schema):
 class TrustlineIndexSchema(Schema):
     enable = fields.Boolean(missing=True)
     sync_interval = fields.Integer(missing=1)
+    # number of rows of the graph feed read and applied at once
+    graph_feed_batch_size = fields.Integer(missing=1000)
+    # wake the graph feed sync on notifications about new rows of the graph
+    # feed, the sync interval is then the maximum time between two syncs
+    graph_feed_notifications = fields.Boolean(missing=False)
+    # seconds to wait after a notification to sync a burst of rows at once
+    graph_feed_notification_delay = fields.Float(missing=0.05)
+    # number of path query results cached per network, 0 disables the cache
+    path_cache_size = fields.Integer(missing=1000)
+    path_cache_max_age = fields.Integer(missing=10)
+    # number of worker processes for pathfinding, 0 runs it in the main process
+    pathfinding_processes = fields.Integer(missing=0)
+    # limits for the path searches of one request, 0 means no limit
+    max_search_nodes = fields.Integer(missing=100_000)
+    max_search_duration = fields.Float(missing=2)
+    # number of nodes expanded by a search before other greenlets can run
+    search_yield_interval = fields.Integer(missing=1000)
+    # number of networks bootstrapped at the same time at startup
+    network_bootstrap_concurrency = fields.Integer(
+        missing=4, validate=validate.Range(min=1)
+    )
+    # number of concurrent requests used to sync a graph from the chain, 0 makes
+    # the calls one after another
+    chain_sync_concurrency = fields.Integer(missing=8)
+    # number of calls per JSON-RPC batch request when syncing from the chain
+    chain_sync_batch_size = fields.Integer(missing=100)
+    # number of times a failed batch of calls is retried
+    chain_sync_retries = fields.Integer(missing=3)
+    # build the graphs from the latest trustline events in ethindex instead of
+    # reading every trustline from the chain
+    bootstrap_from_ethindex = fields.Boolean(missing=False)
+    # directory of the graph files used to restart without a full sync of the
+    # graphs from the chain, empty to disable them
+    graph_file_directory = fields.String(missing="")
+    # minimum number of seconds between writes of the graph files
+    graph_file_interval = fields.Integer(missing=300)
 
 
 class GasPriceMethodField(fields.Field):
@@ -19,7 +19,7 @@ from relay.blockchain.currency_network_events import (
 )
 from relay.blockchain.events import BlockchainEvent
 from relay.ethindex_db.ethindex_db import CurrencyNetworkEthindexDB
-from relay.network_graph.graph import CurrencyNetworkGraph
+from relay.network_graph.graph import CapacityPath, CurrencyNetworkGraph
 from relay.network_graph.interests import calculate_interests
 from relay.network_graph.payment_path import FeePayer
 
@@ -416,26 +416,39 @@ class EventsInformationFetcher:
         debts_list_in_all_currency_networks: Dict[str, Dict[str, int]],
     ) -> List[DebtsListInCurrencyNetwork]:
         enriched_debts_lists_in_all_currency_networks = []
+        timestamp = int(time.time())
         for currency_network in debts_list_in_all_currency_networks.keys():
             enriched_debts_list = []
+            graph = currency_network_graphs[currency_network].pinned()
+            debts_list = debts_list_in_all_currency_networks[currency_network]
+
+            # one search for the debts of the user, one for the claims
+            debtors_of_user = [
+                debtor for debtor, value in debts_list.items() if value > 0
+            ]
+            creditors_of_user = [
+                debtor for debtor, value in debts_list.items() if value < 0
+            ]
+            capacity_paths_to_user: Dict[str, CapacityPath] = {}
+            if debtors_of_user:
+                capacity_paths_to_user = graph.find_maximum_capacity_paths_to_target(
+                    user_address, timestamp=timestamp, users=debtors_of_user
+                )
+            capacity_paths_from_user: Dict[str, CapacityPath] = {}
+            if creditors_of_user:
+                capacity_paths_from_user = graph.find_maximum_capacity_paths_from_source(
+                    user_address, timestamp=timestamp, users=creditors_of_user
+                )
 
-            for debtor in debts_list_in_all_currency_networks[currency_network].keys():
-                debt_value = debts_list_in_all_currency_networks[currency_network][
-                    debtor
-                ]
-
+            for debtor, debt_value in debts_list.items():
                 if debt_value > 0:
-                    debt_claimer = user_address
-                    debt_payer = debtor
+                    capacity_paths = capacity_paths_to_user
                 elif debt_value < 0:
-                    debt_claimer = debtor
-                    debt_payer = user_address
+                    capacity_paths = capacity_paths_from_user
                 else:
                     raise RuntimeError(f"Found null debt with debtor {debtor}")
-                capacity_path = currency_network_graphs[
-                    currency_network
-                ].find_maximum_capacity_path(
-                    debt_payer, debt_claimer, timestamp=int(time.time())
+                capacity_path = capacity_paths.get(
+                    debtor, CapacityPath(capacity=0, path=[])
                 )
                 claimable_debt = min(capacity_path.capacity, abs(debt_value))
 
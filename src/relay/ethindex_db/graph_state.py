@@ -0,0 +1,152 @@
+"""read the state of the trustlines of a currency network from ethindex
+
+The state of every trustline is given by the latest TrustlineUpdate and
+BalanceUpdate event between its two users, which are selected per pair of
+users by the database. This is used to build the graph of a network without
+reading every trustline from the chain.
+
+The state is read in the same database snapshot as the latest id of the graph
+feed, so that the graph feed can be consumed from this id on.
+"""
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from relay.blockchain.currency_network_events import (
+    BalanceUpdateEventType,
+    TrustlineUpdateEventType,
+)
+from relay.blockchain.currency_network_proxy import Trustline
+
+logger = logging.getLogger("graph_state")
+
+# rows fetched from the database per round trip while streaming the trustlines
+ITERSIZE = 10_000
+
+latest_graph_feed_id_query = """
+    SELECT COALESCE(MAX(id), 0) AS id FROM graphfeed;
+"""
+
+# Events of a pair of users are grouped by the lower and higher address
+# independently of the direction of the event, with the latest one first
+latest_trustline_state_query = """
+    WITH trustline_updates AS (
+        SELECT DISTINCT ON (user_a, user_b)
+            LEAST(args->>'_creditor', args->>'_debtor') AS user_a,
+            GREATEST(args->>'_creditor', args->>'_debtor') AS user_b,
+            args
+        FROM events
+        WHERE address=%(address)s AND eventName=%(trustline_update)s
+        ORDER BY user_a, user_b, blockNumber DESC, transactionIndex DESC, logIndex DESC
+    ), balance_updates AS (
+        SELECT DISTINCT ON (user_a, user_b)
+            LEAST(args->>'_from', args->>'_to') AS user_a,
+            GREATEST(args->>'_from', args->>'_to') AS user_b,
+            args,
+            timestamp
+        FROM events
+        WHERE address=%(address)s AND eventName=%(balance_update)s
+        ORDER BY user_a, user_b, blockNumber DESC, transactionIndex DESC, logIndex DESC
+    )
+    SELECT trustline_updates.args AS trustline_args,
+           balance_updates.args AS balance_args,
+           balance_updates.timestamp AS balance_timestamp
+    FROM trustline_updates LEFT JOIN balance_updates USING (user_a, user_b);
+"""
+
+
+def trustline_from_row(row) -> Optional[Trustline]:
+    """Returns the trustline of a row of the latest trustline state query
+    or None if the trustline does not exist anymore
+
+    Closed trustlines cannot be told apart from trustlines with all values
+    set to zero from the events, both are left out as they have no capacity.
+    """
+    trustline_args = row["trustline_args"]
+    creditor = trustline_args["_creditor"]
+    debtor = trustline_args["_debtor"]
+    creditline_given = trustline_args["_creditlineGiven"]
+    creditline_received = trustline_args["_creditlineReceived"]
+    interest_rate_given = trustline_args.get("_interestRateGiven", 0)
+    interest_rate_received = trustline_args.get("_interestRateReceived", 0)
+    is_frozen = trustline_args.get("_isFrozen", False)
+
+    balance_args = row["balance_args"]
+    if balance_args is not None:
+        balance = balance_args["_value"]
+        if balance_args["_from"] != creditor:
+            balance = -balance
+        m_time = row["balance_timestamp"]
+    else:
+        balance = 0
+        m_time = 0
+
+    if (
+        creditline_given == 0
+        and creditline_received == 0
+        and interest_rate_given == 0
+        and interest_rate_received == 0
+        and not is_frozen
+        and balance == 0
+    ):
+        return None
+
+    if creditor < debtor:
+        return Trustline(
+            user=creditor,
+            counter_party=debtor,
+            creditline_given=creditline_given,
+            creditline_received=creditline_received,
+            interest_rate_given=interest_rate_given,
+            interest_rate_received=interest_rate_received,
+            is_frozen=is_frozen,
+            m_time=m_time,
+            balance=balance,
+        )
+    else:
+        return Trustline(
+            user=debtor,
+            counter_party=creditor,
+            creditline_given=creditline_received,
+            creditline_received=creditline_given,
+            interest_rate_given=interest_rate_received,
+            interest_rate_received=interest_rate_given,
+            is_frozen=is_frozen,
+            m_time=m_time,
+            balance=-balance,
+        )
+
+
+@contextmanager
+def trustlines_state(
+    conn, network_address: str, itersize: int = ITERSIZE
+) -> Iterator[Tuple[int, Iterator[Trustline]]]:
+    """Context returning the id of the latest graph feed update and an
+    iterator over the trustlines of the network at this update
+
+    The trustlines are streamed from the database with a server side cursor
+    and can only be iterated within the context.
+    """
+    with conn:
+        with conn.cursor() as cur:
+            # both queries have to see the same snapshot of the database
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+            cur.execute(latest_graph_feed_id_query)
+            sync_id = cur.fetchone()["id"]
+
+        with conn.cursor(name="trustlines_state") as cur:
+            cur.itersize = itersize
+            cur.execute(
+                latest_trustline_state_query,
+                {
+                    "address": network_address,
+                    "trustline_update": TrustlineUpdateEventType,
+                    "balance_update": BalanceUpdateEventType,
+                },
+            )
+            trustlines = (
+                trustline
+                for trustline in map(trustline_from_row, cur)
+                if trustline is not None
+            )
+            yield sync_id, trustlines
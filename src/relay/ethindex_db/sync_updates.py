@@ -1,13 +1,41 @@
 import logging
 import os.path
-from typing import Dict, List
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Sequence, Set, Tuple
 
 import attr
+import gevent
+import gevent.select
+import psycopg2
+import psycopg2.extensions
 
 logger = logging.getLogger("sync_updates")
 
 SYNC_FILE_PATH = "last_graph_feed_sync_id"
 
+GRAPH_FEED_CHANNEL = "graphfeed"
+
+# Notifies the graph feed channel once per statement inserting into the graph
+# feed, Postgres additionally folds identical notifications of a transaction.
+# It is installed once with install_graph_feed_notify_trigger.
+create_notify_trigger_query = f"""
+    CREATE OR REPLACE FUNCTION notify_graphfeed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{GRAPH_FEED_CHANNEL}', '');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS notify_graphfeed ON graphfeed;
+    CREATE TRIGGER notify_graphfeed AFTER INSERT ON graphfeed
+        FOR EACH STATEMENT EXECUTE PROCEDURE notify_graphfeed();
+"""
+
+notify_trigger_exists_query = """
+    SELECT 1 FROM pg_trigger WHERE tgname = 'notify_graphfeed';
+"""
+
 
 @attr.s()
 class FeedUpdate:
@@ -75,9 +103,13 @@ class NetworkUnfreezeFeedUpdate(FeedUpdate):
     pass
 
 
-def graph_update_getter():
-    ensure_graph_sync_id_file_exists()
-    return get_graph_updates_feed
+graph_feed_query = """
+    SELECT * FROM graphfeed WHERE id>%s ORDER BY id ASC;
+"""
+
+graph_feed_of_network_query = """
+    SELECT * FROM graphfeed WHERE id>%s AND id<=%s AND address=%s ORDER BY id ASC;
+"""
 
 
 def get_graph_updates_feed(conn,) -> List[FeedUpdate]:
@@ -85,14 +117,58 @@ def get_graph_updates_feed(conn,) -> List[FeedUpdate]:
 
     last_synced_graph_id = get_latest_graph_sync_id()
 
-    query_string = """
-        SELECT * FROM graphfeed WHERE id>%s ORDER BY id ASC;
+    with conn.cursor() as cur:
+        cur.execute(graph_feed_query, [last_synced_graph_id])
+        rows = cur.fetchall()
+
+    feed_update = _feed_updates_from_rows(rows)
+
+    if len(rows) >= 1:
+        write_graph_sync_id_file(rows[len(rows) - 1]["id"])
+
+    return feed_update
+
+
+def get_graph_updates_feed_batches(
+    conn, batch_size: int
+) -> Iterator[Tuple[List[FeedUpdate], int]]:
+    """Iterate over the updates after the last synced graph feed id in batches
+    of at most batch_size rows, together with the id of the last row of each
+    batch
+
+    The rows are read with a server side cursor, so that only one batch is held
+    in memory. The sync id is not written, the caller has to checkpoint it with
+    the id of a batch after applying the batch.
     """
+    last_synced_graph_id = get_latest_graph_sync_id()
+
+    with conn:
+        with conn.cursor(name="graph_feed") as cur:
+            cur.itersize = batch_size
+            cur.execute(graph_feed_query, [last_synced_graph_id])
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield _feed_updates_from_rows(rows), rows[-1]["id"]
 
+
+def get_graph_updates_feed_of_network(
+    conn, address: str, after_id: int, until_id: int
+) -> List[FeedUpdate]:
+    """Get the updates of the network with graph feed ids after after_id up to
+    until_id, e.g. to catch up with the graph feed after syncing a graph
+
+    The query runs in the current transaction of conn, which is not committed.
+    """
     with conn.cursor() as cur:
-        cur.execute(query_string, [last_synced_graph_id])
+        cur.execute(graph_feed_of_network_query, [after_id, until_id, address])
         rows = cur.fetchall()
 
+    return _feed_updates_from_rows(rows)
+
+
+def _feed_updates_from_rows(rows) -> List[FeedUpdate]:
     feed_update: List[FeedUpdate] = []
 
     for row in rows:
@@ -124,12 +200,59 @@ def get_graph_updates_feed(conn,) -> List[FeedUpdate]:
         else:
             logger.warning(f"Got feed update with unknown type from database: {row}")
 
-    if len(rows) >= 1:
-        write_graph_sync_id_file(rows[len(rows) - 1]["id"])
-
     return feed_update
 
 
+def coalesce_feed_updates(feed_updates: Sequence[FeedUpdate]) -> List[FeedUpdate]:
+    """Drop the updates which are overwritten by a later update of the same
+    kind for the same trustline or network, keeping the order of the others
+
+    The updates carry the absolute state, so only the latest trustline update
+    and balance update of a trustline matter. The exception are updates which
+    may close the trustline: after the trustline was removed from the graph it
+    starts over with the default values, so updates are never coalesced across
+    them. Only the latest freeze or unfreeze of a network is kept.
+    """
+    coalesced: List[FeedUpdate] = []
+    seen_kinds: Dict[Tuple, Set[type]] = defaultdict(set)
+    # iterate backwards to keep the latest update of every kind
+    for update in reversed(feed_updates):
+        if isinstance(update, (TrustlineUpdateFeedUpdate, BalanceUpdateFeedUpdate)):
+            key: Tuple = (update.address, frozenset((update.from_, update.to)))
+            kind: type = type(update)
+            if _may_close_trustline(update):
+                # this update may remove the trustline, so the earlier updates
+                # are not overwritten by the later ones
+                seen_kinds[key] = set()
+        elif isinstance(update, (NetworkFreezeFeedUpdate, NetworkUnfreezeFeedUpdate)):
+            key = (update.address,)
+            kind = FeedUpdate
+        else:
+            coalesced.append(update)
+            continue
+
+        if kind not in seen_kinds[key]:
+            seen_kinds[key].add(kind)
+            coalesced.append(update)
+
+    coalesced.reverse()
+    return coalesced
+
+
+def _may_close_trustline(update: FeedUpdate) -> bool:
+    if isinstance(update, TrustlineUpdateFeedUpdate):
+        return (
+            update.creditline_given
+            == update.creditline_received
+            == update.interest_rate_given
+            == update.interest_rate_received
+            == 0
+        )
+    elif isinstance(update, BalanceUpdateFeedUpdate):
+        return update.value == 0
+    return False
+
+
 def write_graph_sync_id_file(sync_id: int):
     with open(SYNC_FILE_PATH, "w") as f:
         f.write(str(sync_id))
@@ -148,3 +271,109 @@ def get_latest_graph_sync_id():
         contents = f.read()
 
     return contents
+
+
+def install_graph_feed_notify_trigger(dsn: str = "") -> None:
+    """Install the trigger notifying the graph feed channel about new rows of
+    the graph feed, which needs the privileges to create triggers on the graph
+    feed table. Installing it again replaces it."""
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(create_notify_trigger_query)
+    finally:
+        conn.close()
+
+
+class GraphFeedListener:
+    """Waits for notifications about new rows of the graph feed
+
+    Listens to the channel notified by the trigger installed with
+    install_graph_feed_notify_trigger on a dedicated connection. If
+    notifications are not available, e.g. because of a lost connection,
+    waiting falls back to polling and the listener tries to listen again
+    after retry_interval seconds.
+    """
+
+    def __init__(
+        self,
+        dsn: str = "",
+        *,
+        notification_delay: float = 0.0,
+        retry_interval: float = 60.0,
+    ) -> None:
+        self.dsn = dsn
+        # time to wait after a notification to fetch a burst of rows at once
+        self.notification_delay = notification_delay
+        self.retry_interval = retry_interval
+        self._conn: Any = None
+        self._listen_retry_at = 0.0
+
+    @property
+    def is_listening(self) -> bool:
+        return self._conn is not None
+
+    def listen(self) -> bool:
+        """Start listening for notifications, returns whether it succeeded"""
+        try:
+            conn = psycopg2.connect(self.dsn)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(notify_trigger_exists_query)
+                trigger_exists = cur.fetchone() is not None
+                cur.execute(f"LISTEN {GRAPH_FEED_CHANNEL};")
+        except psycopg2.Error as e:
+            self._listen_retry_at = time.monotonic() + self.retry_interval
+            logger.warning(
+                f"Could not listen for graph feed notifications, polling instead "
+                f"for {self.retry_interval} seconds: {e}"
+            )
+            return False
+        self._conn = conn
+        if not trigger_exists:
+            logger.warning(
+                "The trigger notifying about new graph feed rows is not installed, "
+                "install it with `tl-relay --install-graph-feed-trigger`"
+            )
+        logger.info("Listening for graph feed notifications")
+        return True
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def wait(self, timeout: float) -> bool:
+        """Wait until there are new rows in the graph feed or timeout seconds
+        passed, returns whether it was notified
+
+        All notifications received until it returns are consumed, so that a
+        burst of rows results in a single fetch of the graph feed.
+        """
+        if self._conn is None and (
+            time.monotonic() < self._listen_retry_at or not self.listen()
+        ):
+            gevent.sleep(timeout)
+            return False
+        try:
+            if not self._poll_notifications():
+                readable, _, _ = gevent.select.select([self._conn], [], [], timeout)
+                if not readable or not self._poll_notifications():
+                    return False
+            if self.notification_delay:
+                gevent.sleep(self.notification_delay)
+                self._poll_notifications()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Lost connection for graph feed notifications: {e}")
+            self.close()
+            self._listen_retry_at = time.monotonic() + self.retry_interval
+            return False
+
+    def _poll_notifications(self) -> bool:
+        """consume the received notifications, returns whether there were any"""
+        self._conn.poll()
+        notified = bool(self._conn.notifies)
+        self._conn.notifies.clear()
+        return notified
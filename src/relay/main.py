@@ -11,6 +11,7 @@ from geventwebsocket.handler import WebSocketHandler
 
 from relay.api.app import ApiType
 from relay.config.config import ValidationError, load_config, validation_error_string
+from relay.ethindex_db.sync_updates import install_graph_feed_notify_trigger
 from relay.relay import TrustlinesRelay
 from relay.utils import get_version
 
@@ -78,6 +79,17 @@ def _show_version(ctx, param, value):
         ctx.exit()
 
 
+def _install_graph_feed_trigger(ctx, param, value):
+    """handle --install-graph-feed-trigger argument
+
+    the trigger is installed into the database given by the PG* environment
+    variables like the database of the relay"""
+    if value:
+        install_graph_feed_notify_trigger()
+        click.echo("Installed the graph feed notification trigger")
+        ctx.exit()
+
+
 @click.command()
 @click.option("--port", default=None, help="port to listen on [default: 5000]")
 @click.option(
@@ -99,6 +111,15 @@ def _show_version(ctx, param, value):
     is_flag=True,
     callback=_show_version,
 )
+@click.option(
+    "--install-graph-feed-trigger",
+    help="Installs the trigger notifying about new graph feed rows used with "
+    "trustline_index.graph_feed_notifications and exits",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=_install_graph_feed_trigger,
+)
 @click.option(
     "--coverage",
     "report_coverage",
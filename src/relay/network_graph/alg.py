@@ -1,12 +1,174 @@
 """graph algorithms"""
 
 import abc
+import copy
 import heapq
-from typing import Callable, Dict, Iterable, List, Set
+import math
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set
 
 import networkx as nx
 
 
+class PathfindingEngine(Enum):
+    # plain dijkstra, expands nodes in order of their cost
+    DIJKSTRA = "dijkstra"
+    # goal directed A* search with lower bounds on the number of hops to the
+    # targets derived from the hop distances to a few landmarks
+    ALT = "alt"
+
+
+class PruneReason(Enum):
+    """Why an edge was not used to extend a path during a search"""
+
+    # the trustline is frozen
+    FROZEN = "frozen"
+    # the path would exceed the maximum number of hops
+    HOPS = "hops"
+    # the path would exceed the maximum fees
+    FEES = "fees"
+    # the trustline does not have enough capacity
+    CAPACITY = "capacity"
+    # the cost would exceed the max_cost of the search
+    MAX_COST = "max_cost"
+    # forbidden by a cost accumulator, which does not tell the reason
+    COST_ACCUMULATOR = "cost_accumulator"
+
+
+class SearchStatistics:
+    """Counters of path searches, which are filled in by the searches this is
+    passed to, see least_cost_path
+
+    popped_nodes counts the entries popped from the queue, relaxed_edges the
+    edges to not yet visited nodes that were evaluated, including the pruned
+    ones, and elapsed is the wall time of the searches in seconds.
+    """
+
+    def __init__(self) -> None:
+        self.searches = 0
+        self.popped_nodes = 0
+        self.relaxed_edges = 0
+        self.pruned_edges: Dict[PruneReason, int] = {}
+        self.elapsed = 0.0
+
+    def record(
+        self,
+        *,
+        popped_nodes: int,
+        relaxed_edges: int,
+        pruned_edges: Dict[PruneReason, int],
+        elapsed: float,
+    ) -> None:
+        self.searches += 1
+        self.popped_nodes += popped_nodes
+        self.relaxed_edges += relaxed_edges
+        for reason, count in pruned_edges.items():
+            if count:
+                self.pruned_edges[reason] = self.pruned_edges.get(reason, 0) + count
+        self.elapsed += elapsed
+
+    def add(self, other: "SearchStatistics") -> None:
+        """add the counters of other to these"""
+        self.searches += other.searches
+        self.popped_nodes += other.popped_nodes
+        self.relaxed_edges += other.relaxed_edges
+        for reason, count in other.pruned_edges.items():
+            self.pruned_edges[reason] = self.pruned_edges.get(reason, 0) + count
+        self.elapsed += other.elapsed
+
+    def to_dict(self) -> Dict:
+        return {
+            "searches": self.searches,
+            "poppedNodes": self.popped_nodes,
+            "relaxedEdges": self.relaxed_edges,
+            "prunedEdges": {
+                reason.value: count for reason, count in self.pruned_edges.items()
+            },
+            "elapsed": self.elapsed,
+        }
+
+
+class SearchBudgetExceeded(Exception):
+    """Raised by a search, when it exceeded the limits of its SearchBudget"""
+
+
+class SearchBudget:
+    """Limits for the path searches of one request, see least_cost_path
+
+    A search calls expand for every node it expands, which raises
+    SearchBudgetExceeded when more than max_expanded_nodes nodes have been
+    expanded by all searches using this budget or when max_duration seconds
+    have passed since the budget was created. The deadline is only checked
+    every check_interval expansions.
+
+    If yield_interval is given, yield_fn is called every yield_interval
+    expansions, e.g. gevent.sleep to let other greenlets run during a long
+    search.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_expanded_nodes: Optional[int] = None,
+        max_duration: Optional[float] = None,
+        yield_interval: Optional[int] = None,
+        yield_fn: Optional[Callable[[], None]] = None,
+        check_interval: int = 100,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_expanded_nodes = max_expanded_nodes
+        self.max_duration = max_duration
+        self.yield_interval = yield_interval
+        self.yield_fn = yield_fn
+        self.check_interval = check_interval
+        self.timer = timer
+        self.deadline = None if max_duration is None else timer() + max_duration
+        self.expanded_nodes = 0
+
+    def expand(self) -> None:
+        self.expanded_nodes += 1
+        expanded_nodes = self.expanded_nodes
+        if (
+            self.max_expanded_nodes is not None
+            and expanded_nodes > self.max_expanded_nodes
+        ):
+            raise SearchBudgetExceeded(
+                f"Expanded more than {self.max_expanded_nodes} nodes"
+            )
+        if (
+            self.yield_fn is not None
+            and self.yield_interval
+            and expanded_nodes % self.yield_interval == 0
+        ):
+            self.yield_fn()
+            self.check_deadline()
+        elif self.deadline is not None and expanded_nodes % self.check_interval == 0:
+            self.check_deadline()
+
+    def for_next_search(self) -> "SearchBudget":
+        """Returns a budget with the same limits and deadline, which counts the
+        expanded nodes of another search from zero"""
+        budget = copy.copy(self)
+        budget.expanded_nodes = 0
+        return budget
+
+    def check_deadline(self) -> None:
+        if self.deadline is not None and self.timer() > self.deadline:
+            raise SearchBudgetExceeded(
+                f"Searched for more than {self.max_duration} seconds"
+            )
+
+    def __getstate__(self) -> Dict:
+        # the yield function is only called in the process the budget was
+        # created in, e.g. not in the workers of the pathfinding pool
+        state = dict(self.__dict__)
+        state["yield_interval"] = None
+        state["yield_fn"] = None
+        return state
+
+
 class CostAccumulator(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def zero(self):
@@ -42,7 +204,27 @@ class CostAccumulator(metaclass=abc.ABCMeta):
         """
         pass
 
-    def compute_cost_for_path(self, graph: nx.graph.Graph, path: List):
+    def lower_bound(self, cost_from_start_to_node, min_hops_to_target):
+        """
+        return a lower bound for the total cost of any path from one of the
+        starting nodes via node to one of the targets, given the cost from one
+        of the starting nodes to node and that at least min_hops_to_target
+        more hops are needed to reach a target.
+
+        This is being used to order the nodes for the goal-directed search.
+        The bound must not decrease when the path is extended by one hop and
+        the min_hops_to_target decreases by at most one. It must be equal to
+        cost_from_start_to_node if min_hops_to_target is 0.
+
+        It may also return None, which means that no path via node can reach
+        a target, e.g. if it would exceed a limit on the number of hops.
+
+        The default implementation returns cost_from_start_to_node, which
+        makes the goal-directed search behave like dijkstra's algorithm.
+        """
+        return cost_from_start_to_node
+
+    def compute_cost_for_path(self, graph, path: List):
         """
         compute the cost for the given path. This may raise nx.NetworkXNoPath if
         total_cost_from_start_to_dst returns None. E.g. if the CostAccumulator
@@ -67,39 +249,196 @@ def _build_path_from_backlinks(dst: List, backlinks: Dict):
         path.append(dst)
 
 
+def _get_neighbor_items(graph) -> Callable:
+    """return a function mapping a node to an iterable of (neighbor, edge_data)
+    pairs
+
+    graph is either a networkx graph or a GraphSnapshot, which provides its
+    own neighbor_items method"""
+    try:
+        return graph.neighbor_items
+    except AttributeError:
+        graph_adj = graph.adj
+        return lambda node: graph_adj[node].items()
+
+
+def _hop_distances(neighbor_items: Callable, source) -> Dict:
+    """return the number of hops from source to all nodes reachable from it"""
+    distances = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        distance = distances[node] + 1
+        for dst, _ in neighbor_items(node):
+            if dst not in distances:
+                distances[dst] = distance
+                queue.append(dst)
+    return distances
+
+
+class Landmarks:
+    """Hop distances from a few landmark nodes to all other nodes
+
+    By the triangle inequality, |d(landmark, target) - d(landmark, node)| is a
+    lower bound for the number of hops from node to target. Since the
+    distances are computed on the whole graph, they are also lower bounds for
+    paths that may only use some of the edges, e.g. the ones that are not
+    frozen. If only one of node and target can be reached from a landmark,
+    they are in different connected components and there is no path at all.
+
+    The first landmark is the node with the most neighbors, every further
+    landmark is the reachable node that is farthest away from the landmarks
+    chosen so far.
+    """
+
+    def __init__(self, graph, number_of_landmarks: int = 4) -> None:
+        neighbor_items = _get_neighbor_items(graph)
+        nodes = list(graph.nodes)
+        self.landmarks: List = []
+        self.distances: List[Dict] = []
+        if not nodes:
+            return
+
+        landmark = max(nodes, key=lambda node: sum(1 for _ in neighbor_items(node)))
+        min_distances: Dict = {}
+        for _ in range(number_of_landmarks):
+            distances = _hop_distances(neighbor_items, landmark)
+            self.landmarks.append(landmark)
+            self.distances.append(distances)
+            for node, distance in distances.items():
+                min_distances[node] = min(distance, min_distances.get(node, math.inf))
+            landmark = max(min_distances, key=min_distances.__getitem__)
+            if min_distances[landmark] == 0:
+                break  # every reachable node is a landmark already
+
+    def min_hops_function(self, target_nodes: Iterable) -> Callable:
+        """return a function, which returns a lower bound for the number of
+        hops from the given node to the nearest of target_nodes or math.inf if
+        none of them can be reached"""
+        target_distances = [
+            [distances.get(target) for target in target_nodes]
+            for distances in self.distances
+        ]
+        cache: Dict = {}
+
+        def min_hops(node):
+            bound = cache.get(node)
+            if bound is not None:
+                return bound
+            bound = 0
+            for distances, distances_of_targets in zip(
+                self.distances, target_distances
+            ):
+                distance = distances.get(node)
+                bound_for_landmark = math.inf
+                for distance_of_target in distances_of_targets:
+                    if distance is None or distance_of_target is None:
+                        if distance is None and distance_of_target is None:
+                            # no information from this landmark
+                            bound_for_landmark = 0
+                        # otherwise the target is not reachable from node
+                    else:
+                        bound_for_landmark = min(
+                            bound_for_landmark, abs(distance - distance_of_target)
+                        )
+                bound = max(bound, bound_for_landmark)
+            cache[node] = bound
+            return bound
+
+        return min_hops
+
+
+def _make_lower_bound_fn(cost_accumulator: CostAccumulator, min_hops: Callable):
+    lower_bound = cost_accumulator.lower_bound
+
+    def lower_bound_fn(cost, node):
+        min_hops_to_target = min_hops(node)
+        if min_hops_to_target == math.inf:
+            return None
+        return lower_bound(cost, min_hops_to_target)
+
+    return lower_bound_fn
+
+
 def _least_cost_path_helper(
-    graph: nx.graph.Graph,
+    graph,
     target_nodes: Set,
     queue: List,
     least_costs: Dict,
     backlinks: Dict,
     cost_fn: Callable,
-    max_cost=None
+    max_cost=None,
+    lower_bound_fn: Optional[Callable] = None,
+    visited_nodes: Optional[Set] = None,
+    stats: Optional[SearchStatistics] = None,
+    budget: Optional[SearchBudget] = None,
     #    node_filter,
     #    edge_filter,
 ):
-    graph_adj = graph.adj
+    """run the search on the queue of (priority, cost, node) entries
+
+    Without lower_bound_fn this is dijkstra's algorithm, the priority is the
+    cost from the start to the node. Otherwise the priority is the lower bound
+    returned by lower_bound_fn(cost, node) for the cost of a path to a target
+    via node. Nodes for which it returns None are not explored further.
+
+    The search returns when the first target is reached without exploring it.
+    It can be continued by calling this function again with the same queue,
+    least_costs, backlinks and visited_nodes, see least_cost_paths.
+
+    If stats is given, the counters of the search are recorded in it. If
+    budget is given, it is charged for every expanded node, see SearchBudget.
+    """
+    start_time = time.perf_counter()
+    popped_nodes = relaxed_edges = pruned_by_cost_accumulator = pruned_by_max_cost = 0
 
-    visited_nodes = set()  # set of nodes, where we already found the minimal path
+    def record_stats():
+        if stats is not None:
+            stats.record(
+                popped_nodes=popped_nodes,
+                relaxed_edges=relaxed_edges,
+                pruned_edges={
+                    PruneReason.COST_ACCUMULATOR: pruned_by_cost_accumulator,
+                    PruneReason.MAX_COST: pruned_by_max_cost,
+                },
+                elapsed=time.perf_counter() - start_time,
+            )
+
+    neighbor_items = _get_neighbor_items(graph)
+
+    if visited_nodes is None:
+        # set of nodes, where we already found the minimal path
+        visited_nodes = set()
     while queue:
-        cost_from_start_to_node, node = heapq.heappop(queue)
+        _, cost_from_start_to_node, node = heapq.heappop(queue)
+        popped_nodes += 1
         if node in target_nodes:
+            record_stats()
             return cost_from_start_to_node, _build_path_from_backlinks(node, backlinks)
 
         if cost_from_start_to_node > least_costs[node]:
             continue  # we already found a cheaper path to node
 
         visited_nodes.add(node)
-        for dst, edge_data in graph_adj[node].items():
+        if budget is not None:
+            try:
+                budget.expand()
+            except SearchBudgetExceeded:
+                record_stats()
+                raise
+        for dst, edge_data in neighbor_items(node):
             if dst in visited_nodes:
                 continue
+            relaxed_edges += 1
             cost_from_start_to_dst = cost_fn(
                 cost_from_start_to_node, node, dst, edge_data
             )
             if cost_from_start_to_dst is None:  # cost_fn decided this path is forbidden
+                pruned_by_cost_accumulator += 1
                 continue
 
             if max_cost is not None and max_cost < cost_from_start_to_dst:
+                pruned_by_max_cost += 1
                 continue
 
             assert cost_from_start_to_dst >= cost_from_start_to_node
@@ -109,26 +448,40 @@ def _least_cost_path_helper(
                 least_cost_found_so_far_from_start_to_dst is None
                 or cost_from_start_to_dst < least_cost_found_so_far_from_start_to_dst
             ):
-                heapq.heappush(queue, (cost_from_start_to_dst, dst))
+                if lower_bound_fn is None:
+                    priority = cost_from_start_to_dst
+                else:
+                    priority = lower_bound_fn(cost_from_start_to_dst, dst)
+                    if priority is None:  # no target can be reached via dst
+                        continue
+                heapq.heappush(queue, (priority, cost_from_start_to_dst, dst))
                 least_costs[dst] = cost_from_start_to_dst
                 backlinks[dst] = node
 
+    record_stats()
     raise nx.NetworkXNoPath("no path found")
 
 
 def least_cost_path(
     *,
-    graph: nx.graph.Graph,
+    graph,
     starting_nodes: Iterable,
     target_nodes: Set,
     cost_accumulator: CostAccumulator,
     max_cost=None,
+    landmarks: Optional[Landmarks] = None,
+    stats: Optional[SearchStatistics] = None,
+    budget: Optional[SearchBudget] = None,
 ):
     """find the path through the given graph with least cost from one of the
     starting_nodes to one of the target_nodes
 
     cost_accumulator is used to compute the cost
 
+    graph is either a networkx graph or a GraphSnapshot. In the latter case
+    nodes are given as ids of the snapshot and the cost_accumulator must read
+    the edge data through the snapshot.
+
     When max_cost is given, only return a path, whose cost is smaller than
     max_cost.
 
@@ -137,21 +490,181 @@ def least_cost_path(
     total_cost_from_start_to_dst function must return a value that's equal or
     greater than it's given cost_from_start_to_node parameter, i.e. it must not
     use 'negative costs'.
+
+    When landmarks computed on graph are given, this runs a goal-directed A*
+    search instead (see PathfindingEngine.ALT), which orders the nodes by the
+    cost_accumulator's lower_bound for the cost to the targets. This finds a
+    path with the same cost, but usually expands fewer nodes.
+
+    If stats is given, the counters of the search are recorded in it, see
+    SearchStatistics.
+
+    If budget is given, the search raises SearchBudgetExceeded when it exceeds
+    the limits of the budget, see SearchBudget.
     """
     zero_cost = cost_accumulator.zero()
     cost_fn = cost_accumulator.total_cost_from_start_to_dst
     assert max_cost is None or zero_cost <= max_cost
 
+    lower_bound_fn = None
+    if landmarks is not None:
+        lower_bound_fn = _make_lower_bound_fn(
+            cost_accumulator, landmarks.min_hops_function(target_nodes)
+        )
+
     least_costs: Dict = {}
     backlinks: Dict = {}
     queue: List = []
     for node in starting_nodes:
         if not graph.has_node(node):
             continue
+        if lower_bound_fn is None:
+            priority = zero_cost
+        else:
+            priority = lower_bound_fn(zero_cost, node)
+            if priority is None:
+                continue
         least_costs[node] = zero_cost
         backlinks[node] = None
-        heapq.heappush(queue, (zero_cost, node))
+        heapq.heappush(queue, (priority, zero_cost, node))
 
     return _least_cost_path_helper(
-        graph, target_nodes, queue, least_costs, backlinks, cost_fn, max_cost=max_cost
+        graph,
+        target_nodes,
+        queue,
+        least_costs,
+        backlinks,
+        cost_fn,
+        max_cost=max_cost,
+        lower_bound_fn=lower_bound_fn,
+        stats=stats,
+        budget=budget,
     )
+
+
+def least_cost_paths(
+    *,
+    graph,
+    starting_nodes: Iterable,
+    target_nodes: Iterable,
+    cost_accumulator: CostAccumulator,
+    max_cost=None,
+    stats: Optional[SearchStatistics] = None,
+    budget: Optional[SearchBudget] = None,
+) -> Dict:
+    """find the paths with least cost from one of the starting_nodes to each of
+    the target_nodes with a single search
+
+    The search is continued after a target is reached until all targets are
+    reached or there are no more nodes to explore, so the cost and path to
+    every target is the same as the one least_cost_path returns with this node
+    as the only target.
+
+    The statistics of every continuation of the search are recorded in stats,
+    the budget is charged for the whole search, see least_cost_path.
+
+    Returns a dict mapping each reachable target to a tuple (cost, path)
+    """
+    zero_cost = cost_accumulator.zero()
+    assert max_cost is None or zero_cost <= max_cost
+
+    remaining_targets = set(target_nodes)
+    least_costs: Dict = {}
+    backlinks: Dict = {}
+    queue: List = []
+    visited_nodes: Set = set()
+    for node in starting_nodes:
+        if not graph.has_node(node):
+            continue
+        least_costs[node] = zero_cost
+        backlinks[node] = None
+        heapq.heappush(queue, (zero_cost, zero_cost, node))
+
+    result = {}
+    while remaining_targets:
+        try:
+            cost, path = _least_cost_path_helper(
+                graph,
+                remaining_targets,
+                queue,
+                least_costs,
+                backlinks,
+                cost_accumulator.total_cost_from_start_to_dst,
+                max_cost=max_cost,
+                visited_nodes=visited_nodes,
+                stats=stats,
+                budget=budget,
+            )
+        except nx.NetworkXNoPath:
+            break
+        target = path[-1]
+        result[target] = cost, path
+        remaining_targets.remove(target)
+        # the target was not explored yet, put it back to continue from there
+        heapq.heappush(queue, (cost, cost, target))
+    return result
+
+
+class LeastCostTree(NamedTuple):
+    """The least costs and paths from the starting nodes to all reachable nodes"""
+
+    least_costs: Dict
+    backlinks: Dict
+
+    def path_to(self, node) -> List:
+        return _build_path_from_backlinks(node, self.backlinks)
+
+
+def least_cost_tree(
+    *,
+    graph,
+    starting_nodes: Iterable,
+    cost_accumulator: CostAccumulator,
+    max_cost=None,
+    target_nodes: Optional[Iterable] = None,
+) -> LeastCostTree:
+    """find the paths with least cost from one of the starting_nodes to all
+    nodes reachable from them
+
+    This runs the same search as least_cost_path until all reachable nodes
+    have been visited, so the cost and path to every node is the same as the
+    one least_cost_path returns with this node as the only target.
+
+    If target_nodes is given, the search stops as soon as the paths to all
+    reachable target nodes are known. The tree then contains the paths to the
+    target nodes and to some of the other nodes.
+    """
+    zero_cost = cost_accumulator.zero()
+    assert max_cost is None or zero_cost <= max_cost
+
+    least_costs: Dict = {}
+    backlinks: Dict = {}
+    queue: List = []
+    for node in starting_nodes:
+        if not graph.has_node(node):
+            continue
+        least_costs[node] = zero_cost
+        backlinks[node] = None
+        heapq.heappush(queue, (zero_cost, zero_cost, node))
+
+    remaining_targets = set(target_nodes) if target_nodes is not None else set()
+    visited_nodes: Set = set()
+    while target_nodes is None or remaining_targets:
+        try:
+            cost, path = _least_cost_path_helper(
+                graph,
+                remaining_targets,
+                queue,
+                least_costs,
+                backlinks,
+                cost_accumulator.total_cost_from_start_to_dst,
+                max_cost=max_cost,
+                visited_nodes=visited_nodes,
+            )
+        except nx.NetworkXNoPath:
+            break  # the search ends when all reachable nodes have been visited
+        target = path[-1]
+        remaining_targets.remove(target)
+        # the target was not explored yet, put it back to continue from there
+        heapq.heappush(queue, (cost, cost, target))
+    return LeastCostTree(least_costs=least_costs, backlinks=backlinks)
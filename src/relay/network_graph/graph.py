@@ -1,8 +1,21 @@
+import copy
 import csv
 import io
 import logging
 import math
-from typing import Any, List, NamedTuple
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 import networkx as nx
 
@@ -12,8 +25,9 @@ from relay.ethindex_db.sync_updates import (
     NetworkUnfreezeFeedUpdate,
     TrustlineUpdateFeedUpdate,
 )
-from relay.network_graph.graph_constants import balance_ab, creditline_ab, creditline_ba
+from relay.network_graph import trustline_data
 from relay.network_graph.trustline_data import (
+    TrustlineData,
     get_balance,
     get_creditline,
     get_interest_rate,
@@ -26,14 +40,32 @@ from relay.network_graph.trustline_data import (
     set_mtime,
 )
 
-from . import alg
+from . import alg, kernels
 from .fees import calculate_fees, calculate_fees_reverse, imbalance_generated
-from .interests import balance_with_interests
-from .payment_path import FeePayer, PaymentPath
+from .interests import _ensure_non_negative_delta_time, balance_with_interests
+from .payment_path import FeePayer, PathRequest, PaymentPath
+from .snapshot import GraphSnapshot
 
 logger = logging.getLogger(__name__)
 
 
+class TrustlineGraph(nx.Graph):
+    """A graph storing the data of the trustlines in TrustlineData records"""
+
+    edge_attr_dict_factory = TrustlineData
+
+
+def _copy_graph_structure(graph: nx.Graph) -> nx.Graph:
+    """Returns a copy of graph, which shares the dicts of neighbors and the edge
+    data with graph. These have to be copied before they are changed, see
+    CurrencyNetworkGraph._new_version"""
+    graph_copy = type(graph)()
+    graph_copy.graph = dict(graph.graph)
+    graph_copy._node = dict(graph._node)
+    graph_copy._adj = dict(graph._adj)
+    return graph_copy
+
+
 class NetworkGraphConfig(NamedTuple):
     capacity_imbalance_fee_divisor: int = 0
     trustlines: List = []
@@ -47,7 +79,9 @@ class CapacityPath(NamedTuple):
 class Account(object):
     """account from the view of a"""
 
-    def __init__(self, data, user, counter_party):
+    __slots__ = ("a", "b", "data")
+
+    def __init__(self, data: TrustlineData, user, counter_party):
         self.a = user
         self.b = counter_party
         self.data = data
@@ -207,6 +241,167 @@ class AggregatedAccountSummary(object):
         return self.balance + self.creditline_received
 
 
+class _VersionSnapshot:
+    """The lazily built snapshot of one version of a graph
+
+    It is shared by all pinned copies of the version, so the snapshot is
+    built at most once per version. It is built from the snapshot of an
+    earlier version updated with the changed trustlines if possible, see
+    GraphSnapshot.updated.
+    """
+
+    def __init__(
+        self,
+        snapshot: Optional[GraphSnapshot] = None,
+        base: Optional[GraphSnapshot] = None,
+        changed_trustlines: Set[Tuple[str, str]] = None,
+    ) -> None:
+        self._snapshot = snapshot
+        self._base = base
+        self._changed_trustlines = changed_trustlines or set()
+
+    @property
+    def is_built(self) -> bool:
+        return self._snapshot is not None
+
+    def get(self, graph: nx.Graph) -> GraphSnapshot:
+        if self._snapshot is None:
+            if self._base is None:
+                self._snapshot = GraphSnapshot(graph)
+            elif self._changed_trustlines:
+                self._snapshot = self._base.updated(graph, self._changed_trustlines)
+            else:
+                self._snapshot = self._base
+            self._base = None
+            self._changed_trustlines = set()
+        return self._snapshot
+
+    def next_version(
+        self, changed_trustlines: Set[Tuple[str, str]]
+    ) -> "_VersionSnapshot":
+        """Returns the snapshot of the next version, in which only the data of
+        the given trustlines changed"""
+        if self._snapshot is not None:
+            return _VersionSnapshot(
+                base=self._snapshot, changed_trustlines=set(changed_trustlines)
+            )
+        elif self._base is not None:
+            return _VersionSnapshot(
+                base=self._base,
+                changed_trustlines=self._changed_trustlines | changed_trustlines,
+            )
+        else:
+            return _VersionSnapshot()
+
+
+class _AggregatedAccounts:
+    """The sums over all trustlines of a user, which are updated incrementally
+    with every change of a trustline, see get_aggregated_account_summary
+
+    The balances of trustlines that do not accrue interests are summed up
+    directly. For the other ones the parameters of the interests are kept per
+    counter party, so that the balances can be computed for any time.
+    """
+
+    def __init__(self) -> None:
+        self.balance = 0
+        self.frozen_balance = 0
+        self.creditline_given = 0
+        self.creditline_received = 0
+        # only ever increases, used to check the timestamp of queries
+        self.max_m_time = 0
+        # counter party -> (balance, interest rate, reverse interest rate,
+        #                   m_time, is frozen)
+        self.accounts_with_interests: Dict[str, Tuple[int, int, int, int, bool]] = {}
+
+    def copy(self) -> "_AggregatedAccounts":
+        aggregated_accounts = copy.copy(self)
+        aggregated_accounts.accounts_with_interests = dict(self.accounts_with_interests)
+        return aggregated_accounts
+
+    def add(self, account: Account) -> None:
+        self._update(account, 1)
+
+    def remove(self, account: Account) -> None:
+        self._update(account, -1)
+
+    def _update(self, account: Account, sign: int) -> None:
+        self.creditline_given += sign * account.creditline
+        self.creditline_received += sign * account.reverse_creditline
+        balance = account.balance
+        interest_rate = (
+            account.interest_rate if balance > 0 else account.reverse_interest_rate
+        )
+        if balance != 0 and interest_rate != 0:
+            if sign > 0:
+                self.accounts_with_interests[account.b] = (
+                    balance,
+                    account.interest_rate,
+                    account.reverse_interest_rate,
+                    account.m_time,
+                    account.is_frozen,
+                )
+            else:
+                del self.accounts_with_interests[account.b]
+        elif account.is_frozen:
+            self.frozen_balance += sign * balance
+        else:
+            self.balance += sign * balance
+        if sign > 0:
+            self.max_m_time = max(self.max_m_time, account.m_time)
+
+    def summary(self, timestamp: int) -> AggregatedAccountSummary:
+        _ensure_non_negative_delta_time(timestamp - self.max_m_time)
+        balance = self.balance
+        frozen_balance = self.frozen_balance
+        for (
+            account_balance,
+            interest_rate,
+            reverse_interest_rate,
+            m_time,
+            is_frozen,
+        ) in self.accounts_with_interests.values():
+            account_balance = balance_with_interests(
+                account_balance,
+                interest_rate,
+                reverse_interest_rate,
+                timestamp - m_time,
+            )
+            if is_frozen:
+                frozen_balance += account_balance
+            else:
+                balance += account_balance
+        return AggregatedAccountSummary(
+            balance=balance,
+            frozen_balance=frozen_balance,
+            creditline_given=self.creditline_given,
+            creditline_received=self.creditline_received,
+        )
+
+
+class AccountSummaries:
+    """Columnar account summaries of many trustlines at a given timestamp
+
+    The i-th element of every list belongs to the account of user[i] with
+    counter_party[i] from the view of user[i], the values have the same
+    meaning as the attributes of AccountSummary.
+    """
+
+    def __init__(self, timestamp: int) -> None:
+        self.timestamp = timestamp
+        self.user: List[str] = []
+        self.counter_party: List[str] = []
+        self.balance: List[int] = []
+        self.creditline_given: List[int] = []
+        self.creditline_received: List[int] = []
+        self.interest_rate_given: List[int] = []
+        self.interest_rate_received: List[int] = []
+        self.is_frozen: List[bool] = []
+
+    def __len__(self) -> int:
+        return len(self.user)
+
+
 class SenderPaysCostAccumulatorSnapshot(alg.CostAccumulator):
     """This is the CostAccumulator being used when using our default 'sender
     pays fees' style of payments"
@@ -218,6 +413,10 @@ class SenderPaysCostAccumulatorSnapshot(alg.CostAccumulator):
 
     To find the correct fee, the pathfinding has to be done in reverse from receiver to sender
     as we only know the value to be received at the beginning
+
+    The edge data is read with the given trustline_data accessors. These are
+    the functions of the trustline_data module by default, or a GraphSnapshot
+    when searching on a snapshot. This also holds for the other accumulators below.
     """
 
     class Cost(NamedTuple):
@@ -233,6 +432,7 @@ class SenderPaysCostAccumulatorSnapshot(alg.CostAccumulator):
         max_hops=None,
         max_fees=None,
         ignore=None,
+        trustline_data=trustline_data,
     ):
         if max_hops is None:
             max_hops = math.inf
@@ -245,6 +445,7 @@ class SenderPaysCostAccumulatorSnapshot(alg.CostAccumulator):
         self.max_hops = max_hops
         self.max_fees = max_fees
         self.ignore = ignore
+        self.trustline_data = trustline_data
 
     def zero(self):
         return self.Cost(0, 0)
@@ -254,7 +455,7 @@ class SenderPaysCostAccumulatorSnapshot(alg.CostAccumulator):
     ):
         if dst == self.ignore or node == self.ignore:
             return None
-        if get_is_frozen(edge_data):
+        if self.trustline_data.get_is_frozen(edge_data):
             return None
 
         sum_fees, num_hops = cost_from_start_to_node
@@ -274,11 +475,8 @@ class SenderPaysCostAccumulatorSnapshot(alg.CostAccumulator):
         # method this means that the payment is done from dst to node, i.e. the
         # order of arguments node and dst is reversed in the following code
 
-        pre_balance = balance_with_interests(
-            get_balance(edge_data, dst, node),
-            get_interest_rate(edge_data, dst, node),
-            get_interest_rate(edge_data, node, dst),
-            self.timestamp - get_mtime(edge_data),
+        pre_balance = self.trustline_data.get_balance_with_interests(
+            edge_data, dst, node, self.timestamp
         )
 
         if num_hops == 0:
@@ -295,13 +493,22 @@ class SenderPaysCostAccumulatorSnapshot(alg.CostAccumulator):
             return None
 
         # check that we don't exceed the creditline
-        capacity = pre_balance + get_creditline(edge_data, node, dst)
+        capacity = pre_balance + self.trustline_data.get_creditline(
+            edge_data, node, dst
+        )
         if self.value + sum_fees + fee > capacity:
             # creditline exceeded
             return None
 
         return self.Cost(fees=sum_fees + fee, num_hops=num_hops + 1)
 
+    def lower_bound(self, cost_from_start_to_node, min_hops_to_target):
+        # fees can only increase with every further hop
+        sum_fees, num_hops = cost_from_start_to_node
+        if num_hops + min_hops_to_target > self.max_hops:
+            return None
+        return self.Cost(fees=sum_fees, num_hops=num_hops + min_hops_to_target)
+
 
 class ReceiverPaysCostAccumulatorSnapshot(alg.CostAccumulator):
     """This is the CostAccumulator being used when using our 'receiver pays
@@ -332,6 +539,7 @@ class ReceiverPaysCostAccumulatorSnapshot(alg.CostAccumulator):
         max_hops=None,
         max_fees=None,
         ignore=None,
+        trustline_data=trustline_data,
     ):
         if max_hops is None:
             max_hops = math.inf
@@ -344,6 +552,7 @@ class ReceiverPaysCostAccumulatorSnapshot(alg.CostAccumulator):
         self.max_hops = max_hops
         self.max_fees = max_fees
         self.ignore = ignore
+        self.trustline_data = trustline_data
 
     def zero(self):
         return self.Cost(0, 0, 0)
@@ -353,7 +562,7 @@ class ReceiverPaysCostAccumulatorSnapshot(alg.CostAccumulator):
     ):
         if dst == self.ignore or node == self.ignore:
             return None
-        if get_is_frozen(edge_data):
+        if self.trustline_data.get_is_frozen(edge_data):
             return None
 
         # For this case the pathfinding is not done in reverse.
@@ -368,11 +577,8 @@ class ReceiverPaysCostAccumulatorSnapshot(alg.CostAccumulator):
         if num_hops + 1 > self.max_hops:
             return None
 
-        pre_balance = balance_with_interests(
-            get_balance(edge_data, node, dst),
-            get_interest_rate(edge_data, node, dst),
-            get_interest_rate(edge_data, dst, node),
-            self.timestamp - get_mtime(edge_data),
+        pre_balance = self.trustline_data.get_balance_with_interests(
+            edge_data, node, dst, self.timestamp
         )
 
         fee = calculate_fees(
@@ -386,7 +592,9 @@ class ReceiverPaysCostAccumulatorSnapshot(alg.CostAccumulator):
             return None
 
         # check that we don't exceed the creditline
-        capacity = pre_balance + get_creditline(edge_data, dst, node)
+        capacity = pre_balance + self.trustline_data.get_creditline(
+            edge_data, dst, node
+        )
         if self.value - sum_fees - previous_hop_fee > capacity:
             # creditline exceeded
             return None
@@ -397,6 +605,18 @@ class ReceiverPaysCostAccumulatorSnapshot(alg.CostAccumulator):
             previous_hop_fee=fee,
         )
 
+    def lower_bound(self, cost_from_start_to_node: Cost, min_hops_to_target):
+        # the fee of the previous hop is added to the fees with the next hop,
+        # so this can only increase the first element of the cost
+        sum_fees, num_hops, previous_hop_fee = cost_from_start_to_node
+        if num_hops + min_hops_to_target > self.max_hops:
+            return None
+        return self.Cost(
+            fees=sum_fees,
+            num_hops=num_hops + min_hops_to_target,
+            previous_hop_fee=previous_hop_fee,
+        )
+
 
 class SenderPaysCapacityAccumulator(alg.CostAccumulator):
     """This is being used to find a path with the maximum capacity
@@ -417,25 +637,30 @@ class SenderPaysCapacityAccumulator(alg.CostAccumulator):
         num_hops: int
         previous_hop_fee: int
 
-    def __init__(self, *, timestamp, capacity_imbalance_fee_divisor, max_hops=None):
+    def __init__(
+        self,
+        *,
+        timestamp,
+        capacity_imbalance_fee_divisor,
+        max_hops=None,
+        trustline_data=trustline_data,
+    ):
         if max_hops is None:
             max_hops = math.inf
         self.max_hops = max_hops
         self.timestamp = timestamp
         self.capacity_imbalance_fee_divisor = capacity_imbalance_fee_divisor
+        self.trustline_data = trustline_data
 
     def get_balance(self, node, dst, edge_data):
-        return balance_with_interests(
-            get_balance(edge_data, node, dst),
-            get_interest_rate(edge_data, node, dst),
-            get_interest_rate(edge_data, dst, node),
-            self.timestamp - get_mtime(edge_data),
+        return self.trustline_data.get_balance_with_interests(
+            edge_data, node, dst, self.timestamp
         )
 
     def get_capacity(self, node, dst, edge_data):
-        return self.get_balance(node, dst, edge_data) + get_creditline(
-            edge_data, dst, node
-        )
+        return self.get_balance(
+            node, dst, edge_data
+        ) + self.trustline_data.get_creditline(edge_data, dst, node)
 
     def zero(self):
         # We use (- capacity, num_hops, last_hop_fee) as cost
@@ -445,7 +670,7 @@ class SenderPaysCapacityAccumulator(alg.CostAccumulator):
     def total_cost_from_start_to_dst(
         self, cost_from_start_to_node: Cost, node, dst, edge_data
     ):
-        if get_is_frozen(edge_data):
+        if self.trustline_data.get_is_frozen(edge_data):
             return None
 
         capacity_from_start_to_node = -cost_from_start_to_node.minus_capacity
@@ -455,8 +680,10 @@ class SenderPaysCapacityAccumulator(alg.CostAccumulator):
         if num_hops + 1 > self.max_hops:
             return None
 
+        # the balance is needed for the capacity and the fee
+        balance = self.get_balance(node, dst, edge_data)
         capacity_this_edge = min(
-            self.get_capacity(node, dst, edge_data),
+            balance + self.trustline_data.get_creditline(edge_data, dst, node),
             capacity_from_start_to_node - previous_hop_fee,
         )
 
@@ -465,7 +692,7 @@ class SenderPaysCapacityAccumulator(alg.CostAccumulator):
 
         fee = calculate_fees(
             imbalance_generated=imbalance_generated(
-                value=capacity_this_edge, balance=self.get_balance(node, dst, edge_data)
+                value=capacity_this_edge, balance=balance
             ),
             capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
         )
@@ -476,6 +703,80 @@ class SenderPaysCapacityAccumulator(alg.CostAccumulator):
             previous_hop_fee=fee,
         )
 
+    def lower_bound(self, cost_from_start_to_node: Cost, min_hops_to_target):
+        # the capacity can only decrease with every further hop, the fee of the
+        # last hop is unknown
+        minus_capacity, num_hops, _ = cost_from_start_to_node
+        if num_hops + min_hops_to_target > self.max_hops:
+            return None
+        if min_hops_to_target == 0:
+            return cost_from_start_to_node
+        return self.Cost(
+            minus_capacity=minus_capacity,
+            num_hops=num_hops + min_hops_to_target,
+            previous_hop_fee=0,
+        )
+
+
+class CapacityToTargetAccumulator(alg.CostAccumulator):
+    """This is being used to find paths with a large capacity from all nodes
+    to a single target with one search
+
+    The search is done in reverse from the target, so the fees can not be
+    computed and this sorts by the minimum capacity of the trustlines along the
+    path without fees, then the number of hops. The capacity of the found
+    paths including fees can be computed with a SenderPaysCapacityAccumulator.
+    """
+
+    class Cost(NamedTuple):
+        minus_capacity: int
+        num_hops: int
+
+    def __init__(self, *, timestamp, max_hops=None, trustline_data=trustline_data):
+        if max_hops is None:
+            max_hops = math.inf
+        self.max_hops = max_hops
+        self.timestamp = timestamp
+        self.trustline_data = trustline_data
+
+    def zero(self):
+        return self.Cost(-math.inf, 0)
+
+    def total_cost_from_start_to_dst(
+        self, cost_from_start_to_node: Cost, node, dst, edge_data
+    ):
+        if self.trustline_data.get_is_frozen(edge_data):
+            return None
+
+        minus_capacity, num_hops = cost_from_start_to_node
+        if num_hops + 1 > self.max_hops:
+            return None
+
+        # the payment is done from dst to node
+        capacity = min(
+            self.trustline_data.get_balance_with_interests(
+                edge_data, dst, node, self.timestamp
+            )
+            + self.trustline_data.get_creditline(edge_data, node, dst),
+            -minus_capacity,
+        )
+        if capacity <= 0:
+            return None
+
+        return self.Cost(minus_capacity=-capacity, num_hops=num_hops + 1)
+
+
+# specialized searches used instead of alg.least_cost_path with the cost
+# accumulator, see the kernels module
+_TRANSFER_PATH_KERNELS = {
+    SenderPaysCostAccumulatorSnapshot: kernels.sender_pays_least_cost_path,
+    ReceiverPaysCostAccumulatorSnapshot: kernels.receiver_pays_least_cost_path,
+}
+
+# cost accumulators for which the search is done from the receiver of the
+# payment to the sender
+_REVERSE_SEARCH_ACCUMULATORS = frozenset({SenderPaysCostAccumulatorSnapshot})
+
 
 class CurrencyNetworkGraph(object):
     """The whole graph of a Token Network"""
@@ -493,28 +794,253 @@ class CurrencyNetworkGraph(object):
         self.custom_interests = custom_interests
         self.prevent_mediator_interests = prevent_mediator_interests
         self.is_frozen = is_frozen
-        self.graph = nx.Graph()
+        # The graph is never changed in place. Changes are applied to a copy,
+        # which is published as a new version when all changes of a batch are
+        # done, see _new_version. Readers can pin a version, see pinned.
+        self.graph: nx.Graph = TrustlineGraph()
+        # incremented with every published change of the trustlines, can be
+        # used to detect whether results computed on the graph are outdated
+        self.version = 0
+        # snapshot of the graph used for pathfinding, see the snapshot property
+        self._version_snapshot = _VersionSnapshot()
+        # sums over the trustlines of every user, updated with every version
+        self._aggregated_accounts: Dict[str, _AggregatedAccounts] = {}
+        # statistics of the network, updated with every version
+        self._number_of_trustlines = 0
+        self._money_created = 0
+        self._total_creditlines = 0
+        # state of the version that is currently built
+        self._next_graph: Optional[nx.Graph] = None
+        self._owned_nodes: Set[str] = set()
+        self._owned_edges: Set[Tuple[str, str]] = set()
+        self._next_changed_trustlines: Set[Tuple[str, str]] = set()
+        self._next_trustlines_changed = False
 
-    def gen_network(self, trustlines: List[Any]):
-        logger.debug(
-            "Generate Graph from scratch with %d trustline edges", len(trustlines)
-        )
-        self.graph.clear()
-        for trustline in trustlines:
-            assert trustline.user < trustline.counter_party
-            logger.debug("Insert edge: (%s)", trustline)
-            self.graph.add_edge(
-                trustline.user,
-                trustline.counter_party,
-                creditline_ab=trustline.creditline_given,
-                creditline_ba=trustline.creditline_received,
-                interest_ab=trustline.interest_rate_given,
-                interest_ba=trustline.interest_rate_received,
-                is_frozen=trustline.is_frozen,
-                m_time=trustline.m_time,
-                balance_ab=trustline.balance,
+    @property
+    def snapshot(self) -> GraphSnapshot:
+        """Returns a read-only array snapshot of the graph used for pathfinding
+
+        The snapshot is rebuilt lazily: when trustlines were added or removed
+        it is rebuilt from scratch, when only the data of some trustlines
+        changed, the data of these trustlines is updated in a copy of the
+        previous snapshot. It is built once per version and shared with the
+        pinned copies of the version.
+        """
+        return self._version_snapshot.get(self.graph)
+
+    @staticmethod
+    def _get_landmarks(
+        snapshot: GraphSnapshot, engine: alg.PathfindingEngine
+    ) -> Optional[alg.Landmarks]:
+        if engine == alg.PathfindingEngine.ALT:
+            return snapshot.landmarks
+        elif engine == alg.PathfindingEngine.DIJKSTRA:
+            return None
+        else:
+            raise ValueError(f"Unknown pathfinding engine: {engine}")
+
+    def pinned(self) -> "CurrencyNetworkGraph":
+        """Returns the current version of the graph, which is not changed by
+        later updates. Readers use it to get consistent results over multiple
+        calls, e.g. for the duration of a request.
+
+        Pinning is cheap, the returned graph shares all data with this one.
+        """
+        return copy.copy(self)
+
+    @contextmanager
+    def _new_version(self):
+        """Context in which changes to the graph are applied to a new version,
+        which is published when the context is left without an exception
+
+        All changes to the graph have to be made within this context on
+        self._draft(). The neighbors of a node and the data of an edge are
+        shared with the published version, so they have to be made writable
+        via _writable_neighbors and _writable_edge_data before changing them.
+        Contexts can be nested, the changes are then part of the outer one.
+        """
+        if self._next_graph is not None:
+            yield
+            return
+
+        self._next_graph = _copy_graph_structure(self.graph)
+        self._owned_nodes = set()
+        self._owned_edges = set()
+        self._next_changed_trustlines = set()
+        self._next_trustlines_changed = False
+        self._next_graph_replaced = False
+        try:
+            yield
+            self._publish_next_version()
+        finally:
+            self._next_graph = None
+
+    def _draft(self) -> nx.Graph:
+        """Returns the graph of the version that is currently built, only
+        available within _new_version"""
+        assert self._next_graph is not None, "Graph changed outside of _new_version"
+        return self._next_graph
+
+    def _publish_next_version(self):
+        if self._next_graph_replaced:
+            self._aggregated_accounts = self._aggregate_accounts(self._draft())
+            self._number_of_trustlines = 0
+            self._money_created = 0
+            self._total_creditlines = 0
+            for _, _, data in self._draft().edges(data=True):
+                self._update_statistics(data, 1)
+        elif self._owned_edges:
+            self._aggregated_accounts = self._updated_aggregated_accounts()
+            for a, b in self._owned_edges:
+                old_data = self.graph.get_edge_data(a, b)
+                if old_data is not None:
+                    self._update_statistics(old_data, -1)
+                new_data = self._draft().get_edge_data(a, b)
+                if new_data is not None:
+                    self._update_statistics(new_data, 1)
+        self.graph = self._draft()
+        if self._next_trustlines_changed:
+            self.version += 1
+            self._version_snapshot = _VersionSnapshot()
+        elif self._next_changed_trustlines:
+            self.version += 1
+            self._version_snapshot = self._version_snapshot.next_version(
+                self._next_changed_trustlines
             )
 
+    def _update_statistics(self, data: TrustlineData, sign: int) -> None:
+        self._number_of_trustlines += sign
+        # does not include interests
+        self._money_created += sign * abs(data.balance_ab)
+        self._total_creditlines += sign * (data.creditline_ab + data.creditline_ba)
+
+    @staticmethod
+    def _aggregate_accounts(graph: nx.Graph) -> Dict[str, _AggregatedAccounts]:
+        aggregated_accounts: Dict[str, _AggregatedAccounts] = {}
+        for a, b, data in graph.edges(data=True):
+            for user, counter_party in [(a, b), (b, a)]:
+                if user not in aggregated_accounts:
+                    aggregated_accounts[user] = _AggregatedAccounts()
+                aggregated_accounts[user].add(Account(data, user, counter_party))
+        return aggregated_accounts
+
+    def _updated_aggregated_accounts(self) -> Dict[str, _AggregatedAccounts]:
+        """Returns the aggregated accounts updated with the changes of all
+        trustlines changed in the next version
+
+        The aggregated accounts of the users are shared with the published
+        version, so they are copied before they are changed."""
+        aggregated_accounts = dict(self._aggregated_accounts)
+        copied_users = set()
+        for a, b in self._owned_edges:
+            old_data = self.graph.get_edge_data(a, b)
+            new_data = self._draft().get_edge_data(a, b)
+            for user, counter_party in [(a, b), (b, a)]:
+                if user not in copied_users:
+                    copied_users.add(user)
+                    if user in aggregated_accounts:
+                        aggregated_accounts[user] = aggregated_accounts[user].copy()
+                    else:
+                        aggregated_accounts[user] = _AggregatedAccounts()
+                if old_data is not None:
+                    aggregated_accounts[user].remove(
+                        Account(old_data, user, counter_party)
+                    )
+                if new_data is not None:
+                    aggregated_accounts[user].add(
+                        Account(new_data, user, counter_party)
+                    )
+        for user in copied_users:
+            if not self._draft().has_node(user):
+                del aggregated_accounts[user]
+        return aggregated_accounts
+
+    def _writable_neighbors(self, node) -> Dict:
+        """Returns the dict of neighbors of node in the next version, which
+        can be changed without changing the published version"""
+        adjacency = self._draft()._adj
+        if node not in self._owned_nodes:
+            if node in adjacency:
+                adjacency[node] = dict(adjacency[node])
+            self._owned_nodes.add(node)
+        return adjacency.get(node)
+
+    def _writable_edge_data(self, a, b) -> TrustlineData:
+        """Returns the data of the trustline between a and b in the next
+        version, which can be changed without changing the published version"""
+        edge = (a, b) if a < b else (b, a)
+        if edge not in self._owned_edges:
+            data = self._draft().adj[a][b].copy()
+            self._writable_neighbors(a)[b] = data
+            self._writable_neighbors(b)[a] = data
+            self._owned_edges.add(edge)
+        return self._draft().adj[a][b]
+
+    def _trustline_changed(self, a, b):
+        """has to be called whenever the data of the trustline between a and b changed"""
+        self._next_changed_trustlines.add((a, b))
+
+    def _trustlines_changed(self):
+        """has to be called whenever trustlines have been added or removed"""
+        self._next_trustlines_changed = True
+
+    def gen_network(self, trustlines: Iterable[Any]):
+        """Generate the graph from scratch with the given trustlines, which
+        may be streamed, e.g. from the database"""
+        logger.debug("Generate Graph from scratch")
+        with self._new_version():
+            self._trustlines_changed()
+            self._next_graph_replaced = True
+            graph = self._draft()
+            graph.clear()
+            for trustline in trustlines:
+                assert trustline.user < trustline.counter_party
+                logger.debug("Insert edge: (%s)", trustline)
+                graph.add_edge(
+                    trustline.user,
+                    trustline.counter_party,
+                    creditline_ab=trustline.creditline_given,
+                    creditline_ba=trustline.creditline_received,
+                    interest_ab=trustline.interest_rate_given,
+                    interest_ba=trustline.interest_rate_received,
+                    is_frozen=trustline.is_frozen,
+                    m_time=trustline.m_time,
+                    balance_ab=trustline.balance,
+                )
+            logger.debug(
+                "Generated Graph with %d trustline edges", graph.number_of_edges()
+            )
+
+    def gen_network_from_snapshot(self, snapshot: GraphSnapshot):
+        """Generate the graph from scratch with the trustlines of snapshot,
+        e.g. one that was persisted, see the persistence module"""
+        logger.debug(
+            "Generate Graph from snapshot with %d trustline edges",
+            snapshot.number_of_edges,
+        )
+        addresses = snapshot.addresses
+        with self._new_version():
+            self._trustlines_changed()
+            self._next_graph_replaced = True
+            graph = self._draft()
+            graph.clear()
+            graph.add_nodes_from(addresses)
+            for node in snapshot.nodes:
+                for dst, edge in snapshot.neighbor_items(node):
+                    if dst < node:
+                        continue
+                    graph.add_edge(
+                        addresses[node],
+                        addresses[dst],
+                        creditline_ab=snapshot.creditline_ab[edge],
+                        creditline_ba=snapshot.creditline_ba[edge],
+                        interest_ab=snapshot.interest_ab[edge],
+                        interest_ba=snapshot.interest_ba[edge],
+                        is_frozen=bool(snapshot.is_frozen[edge]),
+                        m_time=snapshot.m_time[edge],
+                        balance_ab=snapshot.balance_ab[edge],
+                    )
+
     @classmethod
     def from_config(cls, config: NetworkGraphConfig):
         currency_network_graph = CurrencyNetworkGraph(
@@ -523,14 +1049,40 @@ class CurrencyNetworkGraph(object):
         currency_network_graph.gen_network(config.trustlines)
         return currency_network_graph
 
+    @classmethod
+    def for_pathfinding(
+        cls, snapshot: GraphSnapshot, capacity_imbalance_fee_divisor=0
+    ) -> "CurrencyNetworkGraph":
+        """Returns a graph that runs the pathfinding on the given snapshot
+
+        The graph itself stays empty, so only the methods that read from the
+        snapshot can be used, i.e. the path finding methods.
+        """
+        currency_network_graph = cls(
+            capacity_imbalance_fee_divisor=capacity_imbalance_fee_divisor
+        )
+        currency_network_graph._version_snapshot = _VersionSnapshot(snapshot)
+        return currency_network_graph
+
     @property
     def users(self):
         return list(self.graph.nodes())
 
+    @property
+    def number_of_users(self) -> int:
+        return self.graph.number_of_nodes()
+
+    @property
+    def number_of_trustlines(self) -> int:
+        return self._number_of_trustlines
+
+    def has_user(self, address) -> bool:
+        return address in self.graph
+
     @property
     def money_created(self):
         # does not include interests
-        return sum([abs(edge[2]) for edge in self.graph.edges(data=balance_ab)])
+        return self._money_created
 
     @property
     def has_interests(self) -> bool:
@@ -538,9 +1090,7 @@ class CurrencyNetworkGraph(object):
 
     @property
     def total_creditlines(self):
-        return sum([edge[2] for edge in self.graph.edges(data=creditline_ab)]) + sum(
-            [edge[2] for edge in self.graph.edges(data=creditline_ba)]
-        )
+        return self._total_creditlines
 
     def get_friends(self, address):
         if address in self.graph:
@@ -559,35 +1109,41 @@ class CurrencyNetworkGraph(object):
         is_frozen: bool = False,
     ):
         """to update the creditlines, used to react on changes on the blockchain"""
-        if not self.graph.has_edge(creditor, debtor):
-            self.create_edge(creditor, debtor)
+        with self._new_version():
+            if not self._draft().has_edge(creditor, debtor):
+                self.create_edge(creditor, debtor)
 
-        account = Account(self.graph[creditor][debtor], creditor, debtor)
-        logger.debug(
-            "Update trustline (%s, %s) from: %s", creditor, debtor, account.data
-        )
-        account.creditline = creditline_given
-        account.reverse_creditline = creditline_received
-
-        if interest_rate_given is not None:
-            account.interest_rate = interest_rate_given
-        elif self.custom_interests:
-            raise RuntimeError(
-                "Not interests specified even though custom interests are enabled"
+            account = Account(
+                self._writable_edge_data(creditor, debtor), creditor, debtor
             )
-
-        if interest_rate_received is not None:
-            account.reverse_interest_rate = interest_rate_received
-        elif self.custom_interests:
-            raise RuntimeError(
-                "Not interests specified even though custom interests are enabled"
+            logger.debug(
+                "Update trustline (%s, %s) from: %s", creditor, debtor, account.data
+            )
+            account.creditline = creditline_given
+            account.reverse_creditline = creditline_received
+
+            if interest_rate_given is not None:
+                account.interest_rate = interest_rate_given
+            elif self.custom_interests:
+                raise RuntimeError(
+                    "Not interests specified even though custom interests are enabled"
+                )
+
+            if interest_rate_received is not None:
+                account.reverse_interest_rate = interest_rate_received
+            elif self.custom_interests:
+                raise RuntimeError(
+                    "Not interests specified even though custom interests are enabled"
+                )
+            account.is_frozen = is_frozen
+            self._trustline_changed(creditor, debtor)
+
+            logger.debug(
+                "Update trustline (%s, %s) to: %s", creditor, debtor, account.data
             )
-        account.is_frozen = is_frozen
-
-        logger.debug("Update trustline (%s, %s) to: %s", creditor, debtor, account.data)
 
-        if account.can_be_closed():
-            self.remove_trustline(creditor, debtor)
+            if account.can_be_closed():
+                self.remove_trustline(creditor, debtor)
 
     def get_balance_with_interests(self, a, b, timestamp):
         if not self.graph.has_edge(a, b):
@@ -597,32 +1153,41 @@ class CurrencyNetworkGraph(object):
     def update_balance(self, a: str, b: str, balance: int, timestamp: int = None):
         """to update the balance, used to react on changes on the blockchain
         the last modification time of the balance is also updated to keep track of the interests"""
-        if not self.graph.has_edge(a, b):
-            self.create_edge(a, b)
-        account = Account(self.graph[a][b], a, b)
-        logger.debug(
-            "Update balance of trustline (%s, %s) from: (balance=%s, timestamp=%d)",
-            a,
-            b,
-            account.balance,
-            account.m_time,
-        )
-        account.balance = balance
-        if timestamp is not None:
-            account.m_time = timestamp
-        elif self.has_interests:
-            raise RuntimeError(
-                "No timestamp was given. When using interests a timestamp is mandatory"
+        with self._new_version():
+            if not self._draft().has_edge(a, b):
+                self.create_edge(a, b)
+            account = Account(self._writable_edge_data(a, b), a, b)
+            logger.debug(
+                "Update balance of trustline (%s, %s) from: (balance=%s, timestamp=%d)",
+                a,
+                b,
+                account.balance,
+                account.m_time,
             )
-        logger.debug(
-            "Update balance of trustline (%s, %s) to: (balance=%s, timestamp=%d)",
-            a,
-            b,
-            account.balance,
-            account.m_time,
-        )
-        if account.can_be_closed():
-            self.remove_trustline(a, b)
+            account.balance = balance
+            if timestamp is not None:
+                account.m_time = timestamp
+            elif self.has_interests:
+                raise RuntimeError(
+                    "No timestamp was given. When using interests a timestamp is mandatory"
+                )
+            self._trustline_changed(a, b)
+            logger.debug(
+                "Update balance of trustline (%s, %s) to: (balance=%s, timestamp=%d)",
+                a,
+                b,
+                account.balance,
+                account.m_time,
+            )
+            if account.can_be_closed():
+                self.remove_trustline(a, b)
+
+    def apply_feed_updates(self, feed_updates: Iterable) -> None:
+        """apply the feed updates to a new version of the graph, which is only
+        published when all updates were applied successfully"""
+        with self._new_version():
+            for feed_update in feed_updates:
+                self.update_from_feed(feed_update)
 
     def update_from_feed(self, feed_update):
         if type(feed_update) == TrustlineUpdateFeedUpdate:
@@ -651,27 +1216,38 @@ class CurrencyNetworkGraph(object):
 
     def create_edge(self, a, b):
         logger.debug("Create new trustline edge: (%s, %s)", a, b)
-        self.graph.add_edge(
-            a,
-            b,
-            creditline_ab=0,
-            creditline_ba=0,
-            interest_ab=self.default_interest_rate,
-            interest_ba=self.default_interest_rate,
-            is_frozen=False,
-            m_time=0,
-            balance_ab=0,
-        )
+        with self._new_version():
+            self._trustlines_changed()
+            self._writable_neighbors(a)
+            self._writable_neighbors(b)
+            self._draft().add_edge(
+                a,
+                b,
+                creditline_ab=0,
+                creditline_ba=0,
+                interest_ab=self.default_interest_rate,
+                interest_ba=self.default_interest_rate,
+                is_frozen=False,
+                m_time=0,
+                balance_ab=0,
+            )
+            self._owned_edges.add((a, b) if a < b else (b, a))
 
     def remove_trustline(self, a, b):
         logger.debug("Remove trustline edge: (%s, %s)", a, b)
-        self.graph.remove_edge(a, b)
+        with self._new_version():
+            self._trustlines_changed()
+            self._writable_neighbors(a)
+            self._writable_neighbors(b)
+            self._owned_edges.add((a, b) if a < b else (b, a))
+            graph = self._draft()
+            graph.remove_edge(a, b)
 
-        if len(self.graph.edges(a)) == 0:
-            self.graph.remove_node(a)
+            if len(graph.edges(a)) == 0:
+                graph.remove_node(a)
 
-        if len(self.graph.edges(b)) == 0:
-            self.graph.remove_node(b)
+            if len(graph.edges(b)) == 0:
+                graph.remove_node(b)
 
     def get_account_sum(
         self, user: str, counter_party: str = None, *, timestamp: int = 0
@@ -682,20 +1258,16 @@ class CurrencyNetworkGraph(object):
             return self.get_account_summary(user, counter_party, timestamp)
 
     def get_aggregated_account_summary(self, user, timestamp: int = 0):
-        aggregated_account_summary = AggregatedAccountSummary()
-
-        for counter_party in self.get_friends(user):
-            account = Account(self.graph[user][counter_party], user, counter_party)
+        """Returns the sums over all trustlines of user at the given time
 
-            unfrozen_balance = account.unfrozen_balance_with_interests(timestamp)
-            balance = account.balance_with_interests(timestamp)
-
-            aggregated_account_summary.balance += unfrozen_balance
-            aggregated_account_summary.frozen_balance += balance - unfrozen_balance
-            aggregated_account_summary.creditline_given += account.creditline
-            aggregated_account_summary.creditline_received += account.reverse_creditline
-
-        return aggregated_account_summary
+        The sums are kept up to date with every change of a trustline, only the
+        interests of the trustlines of user that accrue interests have to be
+        computed.
+        """
+        aggregated_accounts = self._aggregated_accounts.get(user)
+        if aggregated_accounts is None:
+            return AggregatedAccountSummary()
+        return aggregated_accounts.summary(timestamp)
 
     def get_account_summary(self, user, counter_party, timestamp):
         if self.graph.has_edge(user, counter_party):
@@ -711,23 +1283,104 @@ class CurrencyNetworkGraph(object):
         else:
             return AccountSummary()
 
+    def get_account_summaries(
+        self, timestamp: int, trustlines: Iterable[Tuple[str, str]] = None
+    ) -> AccountSummaries:
+        """Returns the account summaries of the given (user, counter_party)
+        pairs or of all trustlines in the order of get_trustlines_list
+
+        This reads the data from the snapshot in a single pass and reuses the
+        balances with interests memoized on it, it is meant to be used when
+        summaries of a lot of trustlines are needed. Building the snapshot
+        costs a pass over the whole network, so the given trustlines are read
+        from the graph directly if the snapshot of this version is not built
+        yet. Pairs that are not connected by a trustline are skipped.
+        """
+        if trustlines is None:
+            trustlines = self.get_trustlines_list()
+        elif not self._version_snapshot.is_built:
+            return self._get_account_summaries_from_graph(timestamp, trustlines)
+        snapshot = self.snapshot
+        ids = snapshot.ids
+        summaries = AccountSummaries(timestamp)
+        edges_of_user: Dict[int, Dict[int, int]] = {}
+        for user, counter_party in trustlines:
+            user_id = ids.get(user)
+            counter_party_id = ids.get(counter_party)
+            if user_id is None or counter_party_id is None:
+                continue
+            edges = edges_of_user.get(user_id)
+            if edges is None:
+                edges = dict(snapshot.neighbor_items(user_id))
+                edges_of_user[user_id] = edges
+            edge = edges.get(counter_party_id)
+            if edge is None:
+                continue
+
+            summaries.user.append(user)
+            summaries.counter_party.append(counter_party)
+            summaries.balance.append(
+                snapshot.get_balance_with_interests(
+                    edge, user_id, counter_party_id, timestamp
+                )
+            )
+            summaries.creditline_given.append(
+                snapshot.get_creditline(edge, user_id, counter_party_id)
+            )
+            summaries.creditline_received.append(
+                snapshot.get_creditline(edge, counter_party_id, user_id)
+            )
+            summaries.interest_rate_given.append(
+                snapshot.get_interest_rate(edge, user_id, counter_party_id)
+            )
+            summaries.interest_rate_received.append(
+                snapshot.get_interest_rate(edge, counter_party_id, user_id)
+            )
+            summaries.is_frozen.append(bool(snapshot.get_is_frozen(edge)))
+        return summaries
+
+    def _get_account_summaries_from_graph(
+        self, timestamp: int, trustlines: Iterable[Tuple[str, str]]
+    ) -> AccountSummaries:
+        summaries = AccountSummaries(timestamp)
+        for user, counter_party in trustlines:
+            data = self.graph.get_edge_data(user, counter_party)
+            if data is None:
+                continue
+            account = Account(data, user, counter_party)
+            summaries.user.append(user)
+            summaries.counter_party.append(counter_party)
+            summaries.balance.append(account.balance_with_interests(timestamp))
+            summaries.creditline_given.append(account.creditline)
+            summaries.creditline_received.append(account.reverse_creditline)
+            summaries.interest_rate_given.append(account.interest_rate)
+            summaries.interest_rate_received.append(account.reverse_interest_rate)
+            summaries.is_frozen.append(bool(account.is_frozen))
+        return summaries
+
     def draw(self, filename):
         """draw graph to a file called filename"""
 
-        def mapping(address):
-            return address[2:6] if len(address) > 6 else address[2:]
-
-        for u, v, d in self.graph.edges(data=True):
-            self.graph.node[u]["width"] = 0.6
-            self.graph.node[u]["height"] = 0.4
-            d["color"] = "blue"
-            d["len"] = 1.4
-        g = nx.relabel_nodes(self.graph, mapping)
-        a = nx.drawing.nx_agraph.to_agraph(g)
+        a = nx.drawing.nx_agraph.to_agraph(self._drawing_graph())
         a.graph_attr["label"] = "Trustlines Network"
         a.layout()
         a.draw(filename)
 
+    def _drawing_graph(self) -> nx.Graph:
+        """Returns a graph with the shortened addresses of the users as nodes
+        and only the attributes used for drawing, the trustline records on the
+        edges are not touched"""
+
+        def mapping(address):
+            return address[2:6] if len(address) > 6 else address[2:]
+
+        g = nx.Graph()
+        for user in self.graph.nodes:
+            g.add_node(mapping(user), width=0.6, height=0.4)
+        for u, v in self.graph.edges:
+            g.add_edge(mapping(u), mapping(v), color="blue", len=1.4)
+        return g
+
     def dump(self):
         output = io.StringIO()
         fieldnames = [
@@ -756,7 +1409,16 @@ class CurrencyNetworkGraph(object):
         return self.graph.edges(data=False)
 
     def find_transfer_path_sender_pays_fees(
-        self, source, target, value=None, max_hops=None, max_fees=None, timestamp=0
+        self,
+        source,
+        target,
+        value=None,
+        max_hops=None,
+        max_fees=None,
+        timestamp=0,
+        engine=alg.PathfindingEngine.DIJKSTRA,
+        stats: Optional[alg.SearchStatistics] = None,
+        budget: Optional[alg.SearchBudget] = None,
     ):
 
         cost, path = self._find_transfer_path(
@@ -767,12 +1429,24 @@ class CurrencyNetworkGraph(object):
             max_fees=max_fees,
             timestamp=timestamp,
             cost_accumulator_function=SenderPaysCostAccumulatorSnapshot,
+            engine=engine,
+            stats=stats,
+            budget=budget,
         )
 
         return cost, list(reversed(path))
 
     def find_transfer_path_receiver_pays_fees(
-        self, source, target, value=None, max_hops=None, max_fees=None, timestamp=0
+        self,
+        source,
+        target,
+        value=None,
+        max_hops=None,
+        max_fees=None,
+        timestamp=0,
+        engine=alg.PathfindingEngine.DIJKSTRA,
+        stats: Optional[alg.SearchStatistics] = None,
+        budget: Optional[alg.SearchBudget] = None,
     ):
 
         return self._find_transfer_path(
@@ -783,6 +1457,9 @@ class CurrencyNetworkGraph(object):
             max_fees=max_fees,
             timestamp=timestamp,
             cost_accumulator_function=ReceiverPaysCostAccumulatorSnapshot,
+            engine=engine,
+            stats=stats,
+            budget=budget,
         )
 
     def _find_transfer_path(
@@ -795,42 +1472,159 @@ class CurrencyNetworkGraph(object):
         max_fees=None,
         timestamp=0,
         cost_accumulator_function,
+        engine=alg.PathfindingEngine.DIJKSTRA,
+        snapshot=None,
+        stats: Optional[alg.SearchStatistics] = None,
+        budget: Optional[alg.SearchBudget] = None,
     ):
 
         if value is None:
             value = 1
 
-        cost_accumulator = cost_accumulator_function(
-            timestamp=timestamp,
-            value=value,
-            capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
-            max_hops=max_hops,
-            max_fees=max_fees,
-        )
+        if snapshot is None:
+            snapshot = self.snapshot
+        kernel = _TRANSFER_PATH_KERNELS.get(cost_accumulator_function)
 
         try:
-            cost, path = alg.least_cost_path(
-                graph=self.graph,
-                starting_nodes={source},
-                target_nodes={target},
-                cost_accumulator=cost_accumulator,
-            )
+            source_id = snapshot.ids[source]
+            target_id = snapshot.ids[target]
+            if cost_accumulator_function in _REVERSE_SEARCH_ACCUMULATORS:
+                sender, receiver = target_id, source_id
+            else:
+                sender, receiver = source_id, target_id
+            if not snapshot.reachability.may_have_path(sender, receiver):
+                return 0, []
+            if kernel is not None and engine == alg.PathfindingEngine.DIJKSTRA:
+                cost, path = kernel(
+                    snapshot,
+                    source=source_id,
+                    target_nodes={target_id},
+                    timestamp=timestamp,
+                    value=value,
+                    capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
+                    max_hops=max_hops,
+                    max_fees=max_fees,
+                    stats=stats,
+                    budget=budget,
+                )
+            else:
+                cost_accumulator = cost_accumulator_function(
+                    timestamp=timestamp,
+                    value=value,
+                    capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
+                    max_hops=max_hops,
+                    max_fees=max_fees,
+                    trustline_data=snapshot,
+                )
+                cost, path = alg.least_cost_path(
+                    graph=snapshot,
+                    starting_nodes={source_id},
+                    target_nodes={target_id},
+                    cost_accumulator=cost_accumulator,
+                    landmarks=self._get_landmarks(snapshot, engine),
+                    stats=stats,
+                    budget=budget,
+                )
         except (
             nx.NetworkXNoPath,
             # key error if source or target is not in graph
             KeyError,
         ):
             return 0, []
-        return cost[0], list(path)
+        return cost[0], snapshot.to_addresses(path)
+
+    def find_payment_paths(
+        self,
+        path_requests: Iterable[PathRequest],
+        timestamp: int,
+        engine=alg.PathfindingEngine.DIJKSTRA,
+        stats: Optional[alg.SearchStatistics] = None,
+        budget: Optional[alg.SearchBudget] = None,
+    ) -> List[PaymentPath]:
+        """Finds the paths for all path_requests on the same snapshot of the
+        graph at the same timestamp and returns them in the same order
+
+        The balances with interests memoized on the snapshot are shared by all
+        searches. Every search may expand the nodes allowed by the budget, the
+        deadline of the budget is shared by all of them. If no path can be
+        found for a request, the search fails or exceeds its budget, the
+        payment path for it has an empty path.
+        """
+        snapshot = self.snapshot
+        payment_paths = []
+        for path_request in path_requests:
+            if path_request.fee_payer == FeePayer.SENDER:
+                # the search is done from target to source to accumulate the
+                # fees correctly, see find_transfer_path_sender_pays_fees
+                source, target = path_request.target, path_request.source
+                cost_accumulator_function: Union[
+                    Type[SenderPaysCostAccumulatorSnapshot],
+                    Type[ReceiverPaysCostAccumulatorSnapshot],
+                ] = SenderPaysCostAccumulatorSnapshot
+            elif path_request.fee_payer == FeePayer.RECEIVER:
+                source, target = path_request.source, path_request.target
+                cost_accumulator_function = ReceiverPaysCostAccumulatorSnapshot
+            else:
+                raise ValueError(f"Unknown fee payer: {path_request.fee_payer}")
+            try:
+                cost, path = self._find_transfer_path(
+                    source=source,
+                    target=target,
+                    value=path_request.value,
+                    max_hops=path_request.max_hops,
+                    max_fees=path_request.max_fees,
+                    timestamp=timestamp,
+                    cost_accumulator_function=cost_accumulator_function,
+                    engine=engine,
+                    snapshot=snapshot,
+                    stats=stats,
+                    budget=None if budget is None else budget.for_next_search(),
+                )
+            except alg.SearchBudgetExceeded:
+                cost, path = 0, []
+            except ValueError:
+                # e.g. the timestamp is before the last update of a trustline
+                logger.warning(f"Could not find path for {path_request}", exc_info=True)
+                cost, path = 0, []
+            if path_request.fee_payer == FeePayer.SENDER:
+                path = list(reversed(path))
+            payment_paths.append(
+                PaymentPath(
+                    fee=cost,
+                    path=path,
+                    value=path_request.value,
+                    fee_payer=path_request.fee_payer,
+                )
+            )
+        return payment_paths
 
     def close_trustline_path_triangulation(
-        self, timestamp, source, target, max_hops=None, max_fees=None
+        self,
+        timestamp,
+        source,
+        target,
+        max_hops=None,
+        max_fees=None,
+        engine=alg.PathfindingEngine.DIJKSTRA,
+        stats: Optional[alg.SearchStatistics] = None,
+        budget: Optional[alg.SearchBudget] = None,
     ):
-        if not (self.graph.has_node(source) and self.graph.has_node(target)):
+        snapshot = self.snapshot
+        if source not in snapshot.ids or target not in snapshot.ids:
             return PaymentPath(fee=0, path=[], value=0, fee_payer=FeePayer.SENDER)
 
-        neighbors = {x[0] for x in self.graph.adj[source].items()} - {target}
-        balance = self.get_balance_with_interests(source, target, timestamp)
+        source_id = snapshot.ids[source]
+        target_id = snapshot.ids[target]
+        neighbors = {neighbor for neighbor, _ in snapshot.neighbor_items(source_id)} - {
+            target_id
+        }
+        edge = snapshot.get_edge_data(source_id, target_id)
+        if edge is None:
+            balance = 0
+        else:
+            balance = snapshot.get_balance_with_interests(
+                edge, source_id, target_id, timestamp
+            )
         value = abs(balance)
 
         if max_hops is not None:
@@ -847,7 +1641,10 @@ class CurrencyNetworkGraph(object):
             # since in this case we use sender pays, we search in reverse from
             # target to neighbor
             fee_payer = FeePayer.SENDER
-            cost_accumulator_class = SenderPaysCostAccumulatorSnapshot
+            cost_accumulator_class: Union[
+                Type[SenderPaysCostAccumulatorSnapshot],
+                Type[ReceiverPaysCostAccumulatorSnapshot],
+            ] = SenderPaysCostAccumulatorSnapshot
 
         elif balance > 0:
             # payment looks like
@@ -865,35 +1662,48 @@ class CurrencyNetworkGraph(object):
             capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
             max_hops=max_hops,
             max_fees=max_fees,
-            ignore=source,
+            ignore=source_id,
+            trustline_data=snapshot,
         )
 
         try:
             # can't use the cost as returned by alg.least_cost_path since it
             # doesn't include the source node at the beginning and end
             _, path = alg.least_cost_path(
-                graph=self.graph,
-                starting_nodes={target},
+                graph=snapshot,
+                starting_nodes={target_id},
                 target_nodes=neighbors,
                 cost_accumulator=cost_accumulator,
+                landmarks=self._get_landmarks(snapshot, engine),
+                stats=stats,
+                budget=budget,
             )
-            path = [source] + path + [source]
+            path = [source_id] + path + [source_id]
             cost_accumulator.ignore = None  # hackish, but otherwise the following compute_cost_for_path won't work
             cost_accumulator.max_hops = (
                 math.inf
             )  # don't check max_hops, we know we're below
-            cost = cost_accumulator.compute_cost_for_path(self.graph, path)
+            cost = cost_accumulator.compute_cost_for_path(snapshot, path)
 
         except nx.NetworkXNoPath:
             return PaymentPath(fee=0, path=[], value=value, fee_payer=FeePayer.SENDER)
 
+        path = snapshot.to_addresses(path)
+
         if balance < 0:
             path.reverse()
 
         return PaymentPath(fee=cost[0], path=path, value=value, fee_payer=fee_payer)
 
     def find_maximum_capacity_path(
-        self, source, target, max_hops=None, timestamp=0
+        self,
+        source,
+        target,
+        max_hops=None,
+        timestamp=0,
+        engine=alg.PathfindingEngine.DIJKSTRA,
+        stats: Optional[alg.SearchStatistics] = None,
+        budget: Optional[alg.SearchBudget] = None,
     ) -> CapacityPath:
         """
         find a path probably with the maximum capacity to transfer from source to target
@@ -903,30 +1713,234 @@ class CurrencyNetworkGraph(object):
             source: source for the path
             target: target for the path
             max_hops: the maximum number of hops to find the path
+            engine: the search algorithm to use, see alg.PathfindingEngine
+            stats: if given, the counters of the search are recorded in it
+            budget: if given, the search raises alg.SearchBudgetExceeded when
+                it exceeds the limits of the budget
 
         Returns:
             returns the value that can be send in the max capacity path and the path,
         """
-        capacity_accumulator = SenderPaysCapacityAccumulator(
-            timestamp=timestamp,
-            capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
-            max_hops=max_hops,
-        )
+        snapshot = self.snapshot
 
+        # the minus capacity is -inf if the source is the target
+        cost: Tuple[Any, int, int]
         try:
-            cost, path = alg.least_cost_path(
-                graph=self.graph,
-                starting_nodes={source},
-                target_nodes={target},
-                cost_accumulator=capacity_accumulator,
-            )
+            source_id = snapshot.ids[source]
+            target_id = snapshot.ids[target]
+            if not snapshot.reachability.may_have_path(source_id, target_id):
+                return CapacityPath(capacity=0, path=[])
+            if engine == alg.PathfindingEngine.DIJKSTRA:
+                cost, path = kernels.maximum_capacity_path(
+                    snapshot,
+                    source=source_id,
+                    target_nodes={target_id},
+                    timestamp=timestamp,
+                    capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
+                    max_hops=max_hops,
+                    stats=stats,
+                    budget=budget,
+                )
+            else:
+                capacity_accumulator = SenderPaysCapacityAccumulator(
+                    timestamp=timestamp,
+                    capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
+                    max_hops=max_hops,
+                    trustline_data=snapshot,
+                )
+                cost, path = alg.least_cost_path(
+                    graph=snapshot,
+                    starting_nodes={source_id},
+                    target_nodes={target_id},
+                    cost_accumulator=capacity_accumulator,
+                    landmarks=self._get_landmarks(snapshot, engine),
+                    stats=stats,
+                    budget=budget,
+                )
         except (
             nx.NetworkXNoPath,
             KeyError,
         ):  # key error for if source or target is not in graph
             return CapacityPath(capacity=0, path=[])
 
-        return CapacityPath(capacity=-cost[0], path=list(path))
+        return CapacityPath(capacity=-cost[0], path=snapshot.to_addresses(path))
+
+    def find_maximum_capacity_paths(
+        self,
+        source,
+        targets: Iterable[str],
+        max_hops=None,
+        timestamp=0,
+        stats: Optional[alg.SearchStatistics] = None,
+        budget: Optional[alg.SearchBudget] = None,
+    ) -> Dict[str, CapacityPath]:
+        """
+        find the paths with probably the maximum capacity from source to each
+        of the targets with a single search, which stops as soon as all targets
+        are reached. The result for every target is the same as the one of
+        find_maximum_capacity_path.
+
+        If given, the counters of the search are recorded in stats and the
+        search raises alg.SearchBudgetExceeded when it exceeds budget.
+
+        Returns:
+            a dict mapping every target to the capacity path from source to it,
+            with a capacity of 0 and an empty path if it cannot be reached
+        """
+        capacity_paths = {
+            target: CapacityPath(capacity=0, path=[]) for target in targets
+        }
+        snapshot = self.snapshot
+        if source not in snapshot.ids:
+            return capacity_paths
+        capacity_accumulator = SenderPaysCapacityAccumulator(
+            timestamp=timestamp,
+            capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
+            max_hops=max_hops,
+            trustline_data=snapshot,
+        )
+        source_id = snapshot.ids[source]
+        reachability = snapshot.reachability
+        target_nodes = {
+            target_id
+            for target_id in snapshot.to_ids(capacity_paths)
+            if target_id != source_id
+            and reachability.may_have_path(source_id, target_id)
+        }
+        if not target_nodes:
+            return capacity_paths
+        least_cost_paths = alg.least_cost_paths(
+            graph=snapshot,
+            starting_nodes={source_id},
+            target_nodes=target_nodes,
+            cost_accumulator=capacity_accumulator,
+            stats=stats,
+            budget=budget,
+        )
+        for target, (cost, path) in least_cost_paths.items():
+            capacity_paths[snapshot.addresses[target]] = CapacityPath(
+                capacity=-cost[0], path=snapshot.to_addresses(path)
+            )
+        return capacity_paths
+
+    def find_maximum_capacity_paths_from_source(
+        self, source, max_hops=None, timestamp=0, users: Iterable[str] = None
+    ) -> Dict[str, CapacityPath]:
+        """
+        find the paths with probably the maximum capacity from source to all
+        other users with a single search. The result for every user is the same
+        as the one of find_maximum_capacity_path.
+
+        Returns:
+            a dict mapping every user that can be reached to the capacity path
+            from source to it, only for the given users if users is not None
+        """
+        snapshot = self.snapshot
+        if source not in snapshot.ids:
+            return {}
+        capacity_accumulator = SenderPaysCapacityAccumulator(
+            timestamp=timestamp,
+            capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
+            max_hops=max_hops,
+            trustline_data=snapshot,
+        )
+        source_id = snapshot.ids[source]
+        if not snapshot.reachability.has_outgoing_capacity[source_id]:
+            return {}
+        target_nodes = None if users is None else snapshot.to_ids(users)
+        tree = alg.least_cost_tree(
+            graph=snapshot,
+            starting_nodes={source_id},
+            cost_accumulator=capacity_accumulator,
+            target_nodes=target_nodes,
+        )
+        nodes: Iterable[int] = (
+            tree.least_costs.keys() if target_nodes is None else target_nodes
+        )
+        return {
+            snapshot.addresses[node]: CapacityPath(
+                capacity=-tree.least_costs[node][0],
+                path=snapshot.to_addresses(tree.path_to(node)),
+            )
+            for node in nodes
+            if node != source_id and node in tree.least_costs
+        }
+
+    def find_maximum_capacity_paths_to_target(
+        self, target, max_hops=None, timestamp=0, users: Iterable[str] = None
+    ) -> Dict[str, CapacityPath]:
+        """
+        find paths with a large capacity from all other users to target
+
+        Without fees, the paths are found with a single search from target, see
+        CapacityToTargetAccumulator, which stops once the paths of all given
+        users are known. The capacity of a path depends on the fees paid
+        further along the path, which are not known in a search from target.
+        So in a network with fees, or for a single user, there is one search
+        per user with find_maximum_capacity_path instead. The result for every
+        user is then exactly the one of find_maximum_capacity_path, and the
+        cost grows with the number of users, e.g. the debtors of a debt list.
+
+        Returns:
+            a dict mapping every user that can reach target to the capacity path
+            from it to target, only for the given users if users is not None
+        """
+        snapshot = self.snapshot
+        if target not in snapshot.ids:
+            return {}
+        target_id = snapshot.ids[target]
+        if not snapshot.reachability.has_incoming_capacity[target_id]:
+            return {}
+        if users is not None:
+            users = list(users)
+        if self.capacity_imbalance_fee_divisor != 0 or (
+            users is not None and len(users) == 1
+        ):
+            if users is None:
+                users = self.users
+            capacity_paths = {}
+            for user in users:
+                if user == target:
+                    continue
+                capacity_path = self.find_maximum_capacity_path(
+                    user, target, max_hops=max_hops, timestamp=timestamp
+                )
+                if capacity_path.path:
+                    capacity_paths[user] = capacity_path
+            return capacity_paths
+
+        reverse_accumulator = CapacityToTargetAccumulator(
+            timestamp=timestamp, max_hops=max_hops, trustline_data=snapshot
+        )
+        capacity_accumulator = SenderPaysCapacityAccumulator(
+            timestamp=timestamp,
+            capacity_imbalance_fee_divisor=self.capacity_imbalance_fee_divisor,
+            trustline_data=snapshot,
+        )
+        target_nodes = None if users is None else snapshot.to_ids(users)
+        tree = alg.least_cost_tree(
+            graph=snapshot,
+            starting_nodes={target_id},
+            cost_accumulator=reverse_accumulator,
+            target_nodes=target_nodes,
+        )
+        nodes: Iterable[int] = (
+            tree.least_costs.keys() if target_nodes is None else target_nodes
+        )
+        capacity_paths = {}
+        for node in nodes:
+            if node == target_id or node not in tree.least_costs:
+                continue
+            path = list(reversed(tree.path_to(node)))
+            try:
+                cost = capacity_accumulator.compute_cost_for_path(snapshot, path)
+            except nx.NetworkXNoPath:
+                # the path has no capacity left
+                continue
+            capacity_paths[snapshot.addresses[node]] = CapacityPath(
+                capacity=-cost[0], path=snapshot.to_addresses(path)
+            )
+        return capacity_paths
 
     def get_balances_along_path(self, path):
         balances = []
@@ -958,9 +1972,12 @@ class CurrencyNetworkGraphForTesting(CurrencyNetworkGraph):
     def freeze_trustline(self, creditor, debtor):
         if not self.graph.has_edge(creditor, debtor):
             raise ValueError("Trustlines does not exist.")
-        else:
-            account = Account(self.graph[creditor][debtor], creditor, debtor)
+        with self._new_version():
+            account = Account(
+                self._writable_edge_data(creditor, debtor), creditor, debtor
+            )
             account.is_frozen = True
+            self._trustline_changed(creditor, debtor)
 
     def transfer_path(self, path, value, expected_fees, timestamp=0):
         assert value > 0
@@ -972,15 +1989,17 @@ class CurrencyNetworkGraphForTesting(CurrencyNetworkGraph):
         cost = cost_accumulator.zero()
 
         path = list(reversed(path))
-        for source, target in zip(path, path[1:]):
-            edge_data = self.graph.get_edge_data(source, target)
-            cost = cost_accumulator.total_cost_from_start_to_dst(
-                cost, source, target, edge_data
-            )
-            if cost is None:
-                raise nx.NetworkXNoPath("no path found")
-            new_balance = get_balance(edge_data, target, source) - value - cost[0]
-            set_balance(edge_data, target, source, new_balance)
+        with self._new_version():
+            for source, target in zip(path, path[1:]):
+                edge_data = self._writable_edge_data(source, target)
+                cost = cost_accumulator.total_cost_from_start_to_dst(
+                    cost, source, target, edge_data
+                )
+                if cost is None:
+                    raise nx.NetworkXNoPath("no path found")
+                new_balance = get_balance(edge_data, target, source) - value - cost[0]
+                set_balance(edge_data, target, source, new_balance)
+                self._trustline_changed(source, target)
 
         assert expected_fees == cost[0]
         return cost[0]
@@ -22,6 +22,9 @@ def calculate_interests(
     highest_order: int = 15,
 ) -> int:
     delta_time_in_seconds = _ensure_non_negative_delta_time(delta_time_in_seconds)
+    if internal_interest_rate == 0 or delta_time_in_seconds == 0 or balance == 0:
+        # every term of the taylor approximation is 0
+        return 0
     intermediate_order = balance
     interests = 0
     # Calculate compound interests using taylor approximation
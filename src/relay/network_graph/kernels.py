@@ -0,0 +1,499 @@
+"""specialized path searches on graph snapshots
+
+These implement the same search as alg.least_cost_path with the cost
+accumulators SenderPaysCostAccumulatorSnapshot,
+ReceiverPaysCostAccumulatorSnapshot and SenderPaysCapacityAccumulator, and
+find the same paths with the same costs. Instead of calling the accumulator and
+the accessors of the snapshot for every edge, they read the arrays of the
+snapshot directly and inline the computation of the fees and capacities. The
+costs are kept as plain tuples, which are flattened into the entries of the
+queue, so that the order of the entries and thus the found paths do not change.
+
+The generic search with a CostAccumulator is still used for custom
+accumulators and the goal-directed search.
+
+The counters of the searches are always kept in local variables and are
+recorded in the given alg.SearchStatistics at the end of a search. A given
+alg.SearchBudget is charged for every expanded node like in the generic search.
+"""
+import heapq
+import math
+import time
+from typing import List, Optional, Set, Tuple
+
+import networkx as nx
+
+from .alg import PruneReason, SearchBudget, SearchBudgetExceeded, SearchStatistics
+from .interests import DELTA_TIME_MINIMAL_ALLOWED_VALUE
+from .snapshot import GraphSnapshot
+
+
+def _record_stats(
+    stats: Optional[SearchStatistics],
+    start_time: float,
+    popped_nodes: int,
+    relaxed_edges: int,
+    pruned_frozen: int,
+    pruned_hops: int,
+    pruned_fees: int,
+    pruned_capacity: int,
+) -> None:
+    if stats is not None:
+        stats.record(
+            popped_nodes=popped_nodes,
+            relaxed_edges=relaxed_edges,
+            pruned_edges={
+                PruneReason.FROZEN: pruned_frozen,
+                PruneReason.HOPS: pruned_hops,
+                PruneReason.FEES: pruned_fees,
+                PruneReason.CAPACITY: pruned_capacity,
+            },
+            elapsed=time.perf_counter() - start_time,
+        )
+
+
+def _count_unvisited(node, indptr, neighbors, visited) -> int:
+    """Returns the number of neighbors of node which have not been visited"""
+    return sum(
+        1 for i in range(indptr[node], indptr[node + 1]) if not visited[neighbors[i]]
+    )
+
+
+def _build_path(node, backlinks: List) -> List:
+    path = [node]
+    while True:
+        node = backlinks[node]
+        if node is None:
+            path.reverse()
+            return path
+        path.append(node)
+
+
+def sender_pays_least_cost_path(
+    snapshot: GraphSnapshot,
+    *,
+    source: int,
+    target_nodes: Set[int],
+    timestamp: int,
+    value: int,
+    capacity_imbalance_fee_divisor: int,
+    max_hops=None,
+    max_fees=None,
+    stats: Optional[SearchStatistics] = None,
+    budget: Optional[SearchBudget] = None,
+) -> Tuple[Tuple[int, int], List[int]]:
+    """find the path with the least fees when the sender pays the fees
+
+    Same as alg.least_cost_path with a SenderPaysCostAccumulatorSnapshot, so
+    the search is done in reverse from the receiver of the payment at source
+    to the sender in target_nodes. Returns the cost (fees, num_hops) and the
+    path or raises nx.NetworkXNoPath.
+    """
+    if max_hops is None:
+        max_hops = math.inf
+    if max_fees is None:
+        max_fees = math.inf
+
+    indptr = snapshot.indptr
+    neighbors = snapshot.neighbors
+    edges = snapshot.edges
+    balance_ab = snapshot.balance_ab
+    creditline_ab = snapshot.creditline_ab
+    creditline_ba = snapshot.creditline_ba
+    is_frozen = snapshot.is_frozen
+    m_time = snapshot.m_time
+    has_interests = snapshot.has_interests
+    get_balance_with_interests = snapshot.get_balance_with_interests
+    latest_m_time = timestamp - DELTA_TIME_MINIMAL_ALLOWED_VALUE
+    divisor = capacity_imbalance_fee_divisor
+    start_time = time.perf_counter()
+    popped_nodes = relaxed_edges = 0
+    pruned_frozen = pruned_hops = pruned_fees = pruned_capacity = 0
+
+    number_of_nodes = snapshot.number_of_nodes
+    least_costs: List = [None] * number_of_nodes
+    backlinks: List = [None] * number_of_nodes
+    visited = bytearray(number_of_nodes)
+    least_costs[source] = (0, 0)
+    queue = [(0, 0, source)]
+
+    while queue:
+        fees, num_hops, node = heapq.heappop(queue)
+        popped_nodes += 1
+        if node in target_nodes:
+            _record_stats(
+                stats,
+                start_time,
+                popped_nodes,
+                relaxed_edges,
+                pruned_frozen,
+                pruned_hops,
+                pruned_fees,
+                pruned_capacity,
+            )
+            return (fees, num_hops), _build_path(node, backlinks)
+        if (fees, num_hops) > least_costs[node]:
+            continue
+        visited[node] = 1
+        if budget is not None:
+            try:
+                budget.expand()
+            except SearchBudgetExceeded:
+                _record_stats(
+                    stats,
+                    start_time,
+                    popped_nodes,
+                    relaxed_edges,
+                    pruned_frozen,
+                    pruned_hops,
+                    pruned_fees,
+                    pruned_capacity,
+                )
+                raise
+
+        next_num_hops = num_hops + 1
+        if next_num_hops > max_hops:
+            unvisited = _count_unvisited(node, indptr, neighbors, visited)
+            relaxed_edges += unvisited
+            pruned_hops += unvisited
+            continue
+        for i in range(indptr[node], indptr[node + 1]):
+            dst = neighbors[i]
+            if visited[dst]:
+                continue
+            relaxed_edges += 1
+            edge = edges[i]
+            if is_frozen[edge]:
+                pruned_frozen += 1
+                continue
+
+            # the payment is done from dst to node
+            if has_interests:
+                pre_balance = get_balance_with_interests(edge, dst, node, timestamp)
+            else:
+                if m_time[edge] > latest_m_time:
+                    raise ValueError("delta_time out of bounds")
+                pre_balance = balance_ab[edge] if dst < node else -balance_ab[edge]
+
+            fee = 0
+            if num_hops != 0 and divisor != 0:
+                imbalance = value + fees
+                if pre_balance > 0:
+                    imbalance = max(imbalance - pre_balance, 0)
+                if imbalance != 0:
+                    fee = (imbalance - 1) // (divisor - 1) + 1
+
+            next_fees = fees + fee
+            if next_fees > max_fees:
+                pruned_fees += 1
+                continue
+            creditline = creditline_ab[edge] if node < dst else creditline_ba[edge]
+            if value + next_fees > pre_balance + creditline:
+                pruned_capacity += 1
+                continue
+
+            cost = (next_fees, next_num_hops)
+            least_cost = least_costs[dst]
+            if least_cost is None or cost < least_cost:
+                heapq.heappush(queue, (next_fees, next_num_hops, dst))
+                least_costs[dst] = cost
+                backlinks[dst] = node
+
+    _record_stats(
+        stats,
+        start_time,
+        popped_nodes,
+        relaxed_edges,
+        pruned_frozen,
+        pruned_hops,
+        pruned_fees,
+        pruned_capacity,
+    )
+    raise nx.NetworkXNoPath("no path found")
+
+
+def receiver_pays_least_cost_path(
+    snapshot: GraphSnapshot,
+    *,
+    source: int,
+    target_nodes: Set[int],
+    timestamp: int,
+    value: int,
+    capacity_imbalance_fee_divisor: int,
+    max_hops=None,
+    max_fees=None,
+    stats: Optional[SearchStatistics] = None,
+    budget: Optional[SearchBudget] = None,
+) -> Tuple[Tuple[int, int, int], List[int]]:
+    """find the path with the least fees when the receiver pays the fees
+
+    Same as alg.least_cost_path with a ReceiverPaysCostAccumulatorSnapshot.
+    Returns the cost (fees, num_hops, previous_hop_fee) and the path or raises
+    nx.NetworkXNoPath.
+    """
+    if max_hops is None:
+        max_hops = math.inf
+    if max_fees is None:
+        max_fees = math.inf
+
+    indptr = snapshot.indptr
+    neighbors = snapshot.neighbors
+    edges = snapshot.edges
+    balance_ab = snapshot.balance_ab
+    creditline_ab = snapshot.creditline_ab
+    creditline_ba = snapshot.creditline_ba
+    is_frozen = snapshot.is_frozen
+    m_time = snapshot.m_time
+    has_interests = snapshot.has_interests
+    get_balance_with_interests = snapshot.get_balance_with_interests
+    latest_m_time = timestamp - DELTA_TIME_MINIMAL_ALLOWED_VALUE
+    divisor = capacity_imbalance_fee_divisor
+    start_time = time.perf_counter()
+    popped_nodes = relaxed_edges = 0
+    pruned_frozen = pruned_hops = pruned_fees = pruned_capacity = 0
+
+    number_of_nodes = snapshot.number_of_nodes
+    least_costs: List = [None] * number_of_nodes
+    backlinks: List = [None] * number_of_nodes
+    visited = bytearray(number_of_nodes)
+    least_costs[source] = (0, 0, 0)
+    queue = [(0, 0, 0, source)]
+
+    while queue:
+        fees, num_hops, previous_hop_fee, node = heapq.heappop(queue)
+        popped_nodes += 1
+        if node in target_nodes:
+            _record_stats(
+                stats,
+                start_time,
+                popped_nodes,
+                relaxed_edges,
+                pruned_frozen,
+                pruned_hops,
+                pruned_fees,
+                pruned_capacity,
+            )
+            return (
+                (fees, num_hops, previous_hop_fee),
+                _build_path(node, backlinks),
+            )
+        if (fees, num_hops, previous_hop_fee) > least_costs[node]:
+            continue
+        visited[node] = 1
+        if budget is not None:
+            try:
+                budget.expand()
+            except SearchBudgetExceeded:
+                _record_stats(
+                    stats,
+                    start_time,
+                    popped_nodes,
+                    relaxed_edges,
+                    pruned_frozen,
+                    pruned_hops,
+                    pruned_fees,
+                    pruned_capacity,
+                )
+                raise
+
+        next_num_hops = num_hops + 1
+        if next_num_hops > max_hops:
+            unvisited = _count_unvisited(node, indptr, neighbors, visited)
+            relaxed_edges += unvisited
+            pruned_hops += unvisited
+            continue
+        # the fee of the previous hop is paid with the next hop
+        next_fees = fees + previous_hop_fee
+        if next_fees > max_fees:
+            unvisited = _count_unvisited(node, indptr, neighbors, visited)
+            relaxed_edges += unvisited
+            pruned_fees += unvisited
+            continue
+        remaining_value = value - next_fees
+        for i in range(indptr[node], indptr[node + 1]):
+            dst = neighbors[i]
+            if visited[dst]:
+                continue
+            relaxed_edges += 1
+            edge = edges[i]
+            if is_frozen[edge]:
+                pruned_frozen += 1
+                continue
+
+            if has_interests:
+                pre_balance = get_balance_with_interests(edge, node, dst, timestamp)
+            else:
+                if m_time[edge] > latest_m_time:
+                    raise ValueError("delta_time out of bounds")
+                pre_balance = balance_ab[edge] if node < dst else -balance_ab[edge]
+
+            creditline = creditline_ab[edge] if dst < node else creditline_ba[edge]
+            if remaining_value > pre_balance + creditline:
+                pruned_capacity += 1
+                continue
+
+            fee = 0
+            if divisor != 0:
+                imbalance = remaining_value
+                if pre_balance > 0:
+                    imbalance = max(imbalance - pre_balance, 0)
+                if imbalance != 0:
+                    fee = (imbalance - 1) // divisor + 1
+
+            cost = (next_fees, next_num_hops, fee)
+            least_cost = least_costs[dst]
+            if least_cost is None or cost < least_cost:
+                heapq.heappush(queue, (next_fees, next_num_hops, fee, dst))
+                least_costs[dst] = cost
+                backlinks[dst] = node
+
+    _record_stats(
+        stats,
+        start_time,
+        popped_nodes,
+        relaxed_edges,
+        pruned_frozen,
+        pruned_hops,
+        pruned_fees,
+        pruned_capacity,
+    )
+    raise nx.NetworkXNoPath("no path found")
+
+
+def maximum_capacity_path(
+    snapshot: GraphSnapshot,
+    *,
+    source: int,
+    target_nodes: Set[int],
+    timestamp: int,
+    capacity_imbalance_fee_divisor: int,
+    max_hops=None,
+    stats: Optional[SearchStatistics] = None,
+    budget: Optional[SearchBudget] = None,
+) -> Tuple[Tuple[float, int, int], List[int]]:
+    """find the path with the maximum capacity
+
+    Same as alg.least_cost_path with a SenderPaysCapacityAccumulator. Returns
+    the cost (minus_capacity, num_hops, previous_hop_fee) and the path or
+    raises nx.NetworkXNoPath.
+    """
+    if max_hops is None:
+        max_hops = math.inf
+
+    indptr = snapshot.indptr
+    neighbors = snapshot.neighbors
+    edges = snapshot.edges
+    balance_ab = snapshot.balance_ab
+    creditline_ab = snapshot.creditline_ab
+    creditline_ba = snapshot.creditline_ba
+    is_frozen = snapshot.is_frozen
+    m_time = snapshot.m_time
+    has_interests = snapshot.has_interests
+    get_balance_with_interests = snapshot.get_balance_with_interests
+    latest_m_time = timestamp - DELTA_TIME_MINIMAL_ALLOWED_VALUE
+    divisor = capacity_imbalance_fee_divisor
+    start_time = time.perf_counter()
+    popped_nodes = relaxed_edges = 0
+    pruned_frozen = pruned_hops = pruned_fees = pruned_capacity = 0
+
+    number_of_nodes = snapshot.number_of_nodes
+    least_costs: List = [None] * number_of_nodes
+    backlinks: List = [None] * number_of_nodes
+    visited = bytearray(number_of_nodes)
+    least_costs[source] = (-math.inf, 0, 0)
+    queue = [(-math.inf, 0, 0, source)]
+
+    while queue:
+        minus_capacity, num_hops, previous_hop_fee, node = heapq.heappop(queue)
+        popped_nodes += 1
+        if node in target_nodes:
+            _record_stats(
+                stats,
+                start_time,
+                popped_nodes,
+                relaxed_edges,
+                pruned_frozen,
+                pruned_hops,
+                pruned_fees,
+                pruned_capacity,
+            )
+            return (
+                (minus_capacity, num_hops, previous_hop_fee),
+                _build_path(node, backlinks),
+            )
+        if (minus_capacity, num_hops, previous_hop_fee) > least_costs[node]:
+            continue
+        visited[node] = 1
+        if budget is not None:
+            try:
+                budget.expand()
+            except SearchBudgetExceeded:
+                _record_stats(
+                    stats,
+                    start_time,
+                    popped_nodes,
+                    relaxed_edges,
+                    pruned_frozen,
+                    pruned_hops,
+                    pruned_fees,
+                    pruned_capacity,
+                )
+                raise
+
+        next_num_hops = num_hops + 1
+        if next_num_hops > max_hops:
+            unvisited = _count_unvisited(node, indptr, neighbors, visited)
+            relaxed_edges += unvisited
+            pruned_hops += unvisited
+            continue
+        # the capacity that is left after paying the fee of the previous hop
+        capacity_to_node = -minus_capacity - previous_hop_fee
+        for i in range(indptr[node], indptr[node + 1]):
+            dst = neighbors[i]
+            if visited[dst]:
+                continue
+            relaxed_edges += 1
+            edge = edges[i]
+            if is_frozen[edge]:
+                pruned_frozen += 1
+                continue
+
+            if has_interests:
+                balance = get_balance_with_interests(edge, node, dst, timestamp)
+            else:
+                if m_time[edge] > latest_m_time:
+                    raise ValueError("delta_time out of bounds")
+                balance = balance_ab[edge] if node < dst else -balance_ab[edge]
+
+            creditline = creditline_ab[edge] if dst < node else creditline_ba[edge]
+            capacity = min(balance + creditline, capacity_to_node)
+            if capacity <= 0:
+                pruned_capacity += 1
+                continue
+
+            fee = 0
+            if divisor != 0:
+                imbalance = capacity
+                if balance > 0:
+                    imbalance = max(imbalance - balance, 0)
+                if imbalance != 0:
+                    fee = (imbalance - 1) // divisor + 1
+
+            cost = (-capacity, next_num_hops, fee)
+            least_cost = least_costs[dst]
+            if least_cost is None or cost < least_cost:
+                heapq.heappush(queue, (-capacity, next_num_hops, fee, dst))
+                least_costs[dst] = cost
+                backlinks[dst] = node
+
+    _record_stats(
+        stats,
+        start_time,
+        popped_nodes,
+        relaxed_edges,
+        pruned_frozen,
+        pruned_hops,
+        pruned_fees,
+        pruned_capacity,
+    )
+    raise nx.NetworkXNoPath("no path found")
@@ -0,0 +1,107 @@
+from typing import Dict, Iterable, List, Tuple
+
+from .alg import PruneReason, SearchStatistics
+
+# upper bounds of the buckets of the histograms
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+COUNT_BUCKETS = (10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+
+class Histogram:
+    """Counts observed values in buckets with the given upper bounds
+
+    Like prometheus histograms, every bucket counts the observations less than
+    or equal to its upper bound, so the counts are cumulative.
+    """
+
+    def __init__(self, buckets: Iterable[float]) -> None:
+        self.buckets: List[float] = sorted(buckets)
+        self.counts: List[int] = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            "buckets": [
+                {"le": bound, "count": count}
+                for bound, count in zip(self.buckets, self.counts)
+            ],
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class EndpointMetrics:
+    """Metrics of the path searches for one endpoint of a network"""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        # requests whose searches exceeded their search budget
+        self.budget_exceeded = 0
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.popped_nodes = Histogram(COUNT_BUCKETS)
+        self.relaxed_edges = Histogram(COUNT_BUCKETS)
+        self.pruned_edges: Dict[PruneReason, int] = {}
+
+    def record(
+        self, stats: SearchStatistics, duration: float, budget_exceeded: bool = False
+    ) -> None:
+        self.requests += 1
+        if budget_exceeded:
+            self.budget_exceeded += 1
+        self.duration.observe(duration)
+        self.popped_nodes.observe(stats.popped_nodes)
+        self.relaxed_edges.observe(stats.relaxed_edges)
+        for reason, count in stats.pruned_edges.items():
+            self.pruned_edges[reason] = self.pruned_edges.get(reason, 0) + count
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "budgetExceeded": self.budget_exceeded,
+            "duration": self.duration.to_dict(),
+            "poppedNodes": self.popped_nodes.to_dict(),
+            "relaxedEdges": self.relaxed_edges.to_dict(),
+            "prunedEdges": {
+                reason.value: count for reason, count in self.pruned_edges.items()
+            },
+        }
+
+
+class PathfindingMetrics:
+    """Aggregates the statistics of path searches per network and endpoint"""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[Tuple[str, str], EndpointMetrics] = {}
+
+    def record(
+        self,
+        network_address: str,
+        endpoint: str,
+        stats: SearchStatistics,
+        duration: float,
+        budget_exceeded: bool = False,
+    ) -> None:
+        """record the statistics of the searches of one request, duration is
+        its wall time in seconds and budget_exceeded whether the searches were
+        aborted because they exceeded their search budget"""
+        key = network_address, endpoint
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            metrics = self._metrics[key] = EndpointMetrics()
+        metrics.record(stats, duration, budget_exceeded)
+
+    def network_metrics(self, network_address: str) -> Dict[str, Dict]:
+        """Returns the metrics of all endpoints of the network"""
+        return {
+            endpoint: metrics.to_dict()
+            for (network, endpoint), metrics in self._metrics.items()
+            if network == network_address
+        }
@@ -0,0 +1,66 @@
+import time
+from typing import Any, Callable, Hashable, Tuple
+
+from cachetools import TTLCache
+
+
+class PathCache:
+    """LRU cache for the results of path queries on a currency network graph
+
+    Wallets tend to ask for the same path repeatedly while a user is editing a
+    payment. The results are keyed on the version of the graph, which changes
+    with every update of a trustline or balance, so that a result computed on
+    an older state of the graph is never returned. The cache is cleared as soon
+    as a new version is seen.
+
+    Results are computed for the time of the query, and balances with interests
+    change over time even without an update, so entries also expire after
+    max_age seconds.
+    """
+
+    def __init__(
+        self, graph, *, maxsize: int = 1000, max_age: float = 10, timer=time.monotonic
+    ) -> None:
+        self.graph = graph
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._version = graph.version
+        self._cache: TTLCache = TTLCache(max(maxsize, 1), ttl=max_age, timer=timer)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.max_age > 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get_or_compute(self, key: Tuple[Hashable, ...], compute: Callable[[], Any]):
+        """Returns the cached result for key or the result of compute(), which
+        is then cached"""
+        if not self.enabled:
+            return compute()
+
+        version = self.graph.version
+        if version != self._version:
+            self._cache.clear()
+            self._version = version
+
+        try:
+            result = self._cache[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            return result
+
+        result = compute()
+        # do not cache the result if the graph was updated by another greenlet
+        # in the meantime
+        if self.graph.version == version:
+            self._cache[key] = result
+        return result
+
+    def clear(self) -> None:
+        self._cache.clear()
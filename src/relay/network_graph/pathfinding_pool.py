@@ -0,0 +1,201 @@
+"""run the pathfinding on the currency network graphs in separate processes
+
+The relay runs all requests in greenlets of a single process, so a long
+running path search blocks everything else. The PathfindingPool runs the path
+searches in a pool of worker processes instead, while the requesting greenlet
+waits for the result in a thread of the gevent threadpool.
+
+The snapshot of a graph is serialized into a shared memory block once per
+version of the graph (see GraphSnapshot.to_bytes) and the workers read it from
+there without copying the arrays. Every worker keeps the snapshot of a network
+until a task for a newer version arrives. A block is released after a newer
+snapshot has been published and no running task uses it anymore.
+"""
+import atexit
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import gevent
+
+from relay.network_graph.alg import SearchStatistics
+from relay.network_graph.graph import CurrencyNetworkGraph
+from relay.network_graph.snapshot import GraphSnapshot
+
+logger = logging.getLogger("pathfinding_pool")
+
+# methods of the CurrencyNetworkGraph that can be run in the pool, these only
+# read from the snapshot of the graph
+PATHFINDING_METHODS = frozenset(
+    {
+        "find_transfer_path_sender_pays_fees",
+        "find_transfer_path_receiver_pays_fees",
+        "find_payment_paths",
+        "find_maximum_capacity_path",
+        "find_maximum_capacity_paths",
+        "close_trustline_path_triangulation",
+    }
+)
+
+
+class SharedSnapshot:
+    """A snapshot of a version of a graph in a shared memory block"""
+
+    def __init__(self, graph: CurrencyNetworkGraph) -> None:
+        self.version = graph.version
+        self.capacity_imbalance_fee_divisor = graph.capacity_imbalance_fee_divisor
+        data = graph.snapshot.to_bytes()
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=len(data))
+        self.shared_memory.buf[: len(data)] = memoryview(data)
+        self.running_tasks = 0
+        self.is_outdated = False
+
+    @property
+    def name(self) -> str:
+        return self.shared_memory.name
+
+    def release(self) -> None:
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+
+class PathfindingPool:
+    def __init__(self, processes: int, timeout: Optional[float] = None) -> None:
+        """start a pool with the given number of worker processes
+
+        timeout is the maximum time in seconds to wait for the result of a task
+        """
+        self.processes = processes
+        self.timeout = timeout
+        # multiprocessing.Pool does not work with the queue module patched by
+        # gevent. Do not fork the process running gevent.
+        self._executor = ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._shared_snapshots: Dict[str, SharedSnapshot] = {}
+
+    def refresh(self, network_address: str, graph: CurrencyNetworkGraph) -> None:
+        """publish a new snapshot of graph, if it changed since the last one"""
+        self._get_shared_snapshot(network_address, graph)
+
+    def run(
+        self,
+        network_address: str,
+        graph: CurrencyNetworkGraph,
+        method_name: str,
+        **kwargs,
+    ):
+        """run the pathfinding method of graph with the given keyword arguments in
+        a worker process and return its result
+
+        Only blocks the calling greenlet until the result is available. If a
+        SearchStatistics is given as stats, the counters of the search in the
+        worker are added to it.
+        """
+        if method_name not in PATHFINDING_METHODS:
+            raise ValueError(f"Can not run {method_name} in the pathfinding pool")
+        stats = kwargs.pop("stats", None)
+
+        shared_snapshot = self._get_shared_snapshot(network_address, graph)
+        shared_snapshot.running_tasks += 1
+        try:
+            future = self._executor.submit(
+                _run_in_worker,
+                network_address,
+                shared_snapshot.name,
+                shared_snapshot.capacity_imbalance_fee_divisor,
+                method_name,
+                kwargs,
+                stats is not None,
+            )
+            result, worker_stats = gevent.get_hub().threadpool.apply(
+                future.result, (self.timeout,)
+            )
+            if stats is not None:
+                stats.add(worker_stats)
+            return result
+        finally:
+            shared_snapshot.running_tasks -= 1
+            if shared_snapshot.is_outdated and shared_snapshot.running_tasks == 0:
+                shared_snapshot.release()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        for shared_snapshot in self._shared_snapshots.values():
+            shared_snapshot.release()
+        self._shared_snapshots.clear()
+
+    def _get_shared_snapshot(
+        self, network_address: str, graph: CurrencyNetworkGraph
+    ) -> SharedSnapshot:
+        shared_snapshot = self._shared_snapshots.get(network_address)
+        if shared_snapshot is not None and shared_snapshot.version == graph.version:
+            return shared_snapshot
+
+        logger.debug(
+            "Publish snapshot of version %d for network %s",
+            graph.version,
+            network_address,
+        )
+        self._shared_snapshots[network_address] = SharedSnapshot(graph)
+        if shared_snapshot is not None:
+            shared_snapshot.is_outdated = True
+            if shared_snapshot.running_tasks == 0:
+                shared_snapshot.release()
+        return self._shared_snapshots[network_address]
+
+
+# The state of a worker process: the name of the shared memory block of the
+# snapshot of each network, the block and the graph reading from it
+_worker_graphs: Dict[
+    str, Tuple[str, shared_memory.SharedMemory, CurrencyNetworkGraph]
+] = {}
+
+
+def _run_in_worker(
+    network_address: str,
+    snapshot_name: str,
+    capacity_imbalance_fee_divisor: int,
+    method_name: str,
+    kwargs: Dict,
+    collect_stats: bool,
+):
+    """run the method on the graph of the snapshot and return its result and
+    the statistics of the search, if they should be collected"""
+    name, memory, graph = _worker_graphs.get(network_address, (None, None, None))
+    if name != snapshot_name:
+        if memory is not None:
+            del _worker_graphs[network_address]
+            graph = None
+            _close_shared_memory(memory)
+        memory = shared_memory.SharedMemory(name=snapshot_name)
+        graph = CurrencyNetworkGraph.for_pathfinding(
+            GraphSnapshot.from_buffer(memory.buf),
+            capacity_imbalance_fee_divisor=capacity_imbalance_fee_divisor,
+        )
+        _worker_graphs[network_address] = snapshot_name, memory, graph
+
+    stats = None
+    if collect_stats:
+        stats = kwargs["stats"] = SearchStatistics()
+    return getattr(graph, method_name)(**kwargs), stats
+
+
+@atexit.register
+def _release_worker_graphs() -> None:
+    # the graphs have to be released before the shared memory can be closed
+    memories = [memory for _, memory, _ in _worker_graphs.values()]
+    _worker_graphs.clear()
+    for memory in memories:
+        _close_shared_memory(memory)
+
+
+def _close_shared_memory(memory: shared_memory.SharedMemory) -> None:
+    try:
+        memory.close()
+    except BufferError:
+        # still referenced from somewhere, the memory is unmapped when the
+        # references are garbage collected
+        pass
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
 import attr
 
@@ -15,3 +15,13 @@ class PaymentPath:
     path: List
     value: int
     fee_payer: FeePayer
+
+
+@attr.s(auto_attribs=True)
+class PathRequest:
+    source: str
+    target: str
+    value: int = 1
+    max_hops: Optional[int] = None
+    max_fees: Optional[int] = None
+    fee_payer: FeePayer = FeePayer.SENDER
@@ -0,0 +1,102 @@
+"""persist the graphs of the currency networks to restart the relay quickly
+
+A graph file contains the snapshot of a network graph (see
+GraphSnapshot.to_bytes) together with the id of the last row of the graph feed
+applied to the graph. On startup the graph is built from the file and only the
+rows of the graph feed after this id are replayed, instead of reading the whole
+state of the network from the chain.
+
+The file starts with a fixed size header containing the sync id, the size and
+a checksum of the snapshot, followed by the snapshot. The snapshot is read from
+a memory map of the file without copying its arrays. Files are written to a
+temporary file first, which is then moved into place, so that a crash while
+writing does not leave a truncated file behind.
+"""
+import mmap
+import os
+import zlib
+from contextlib import contextmanager
+from struct import Struct
+from typing import Iterator, Tuple
+
+from .snapshot import GraphSnapshot, _aligned
+
+# magic, format version, graph feed sync id, size of the snapshot and crc32 of
+# the sync id and the snapshot
+_HEADER = Struct("=4sIqqI")
+_SYNC_ID = Struct("=q")
+_MAGIC = b"TLGF"
+_FORMAT_VERSION = 1
+# the arrays of the snapshot have to be aligned in the memory map
+_SNAPSHOT_OFFSET = _aligned(_HEADER.size)
+
+
+class InvalidGraphFile(Exception):
+    pass
+
+
+def graph_file_path(directory: str, network_address: str) -> str:
+    return os.path.join(directory, f"{network_address}.graph")
+
+
+def _checksum(sync_id: int, data) -> int:
+    return zlib.crc32(data, zlib.crc32(_SYNC_ID.pack(sync_id)))
+
+
+def write_graph_file(path: str, snapshot: GraphSnapshot, graph_feed_sync_id: int):
+    data = snapshot.to_bytes()
+    header = _HEADER.pack(
+        _MAGIC,
+        _FORMAT_VERSION,
+        graph_feed_sync_id,
+        len(data),
+        _checksum(graph_feed_sync_id, data),
+    )
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(header)
+        f.write(bytes(_SNAPSHOT_OFFSET - len(header)))
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+
+@contextmanager
+def open_graph_file(path: str) -> Iterator[Tuple[GraphSnapshot, int]]:
+    """Context returning the snapshot of the graph file at path and the graph
+    feed sync id it was written with
+
+    The snapshot reads from a memory map of the file, which is closed when the
+    context is left, so the snapshot must not be used afterwards. Raises
+    FileNotFoundError if there is no file and InvalidGraphFile if the file is
+    not a complete graph file of the current format.
+    """
+    with open(path, "rb") as f:
+        try:
+            memory_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise InvalidGraphFile(f"Empty graph file: {path}")
+    view = memoryview(memory_map)  # type: ignore
+    try:
+        if len(view) < _SNAPSHOT_OFFSET:
+            raise InvalidGraphFile(f"Truncated graph file: {path}")
+        magic, format_version, sync_id, size, checksum = _HEADER.unpack_from(view)
+        if magic != _MAGIC or format_version != _FORMAT_VERSION:
+            raise InvalidGraphFile(f"Not a graph file of the current format: {path}")
+        data = view[_SNAPSHOT_OFFSET : _SNAPSHOT_OFFSET + size]
+        if len(data) != size or _checksum(sync_id, data) != checksum:
+            raise InvalidGraphFile(f"Corrupted graph file: {path}")
+        try:
+            snapshot = GraphSnapshot.from_buffer(data)
+        except ValueError as e:
+            raise InvalidGraphFile(f"Invalid snapshot in graph file {path}: {e}")
+        yield snapshot, sync_id
+    finally:
+        view.release()
+        try:
+            memory_map.close()
+        except BufferError:
+            # the arrays of the snapshot are still referenced, the file is
+            # unmapped when they are garbage collected
+            pass
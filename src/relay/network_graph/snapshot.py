@@ -0,0 +1,444 @@
+"""compact, read-only array representation of a currency network graph
+
+A GraphSnapshot maps the addresses of the users to integer ids and stores the
+adjacency in compressed sparse row (CSR) format: the neighbors of node `i` are
+`neighbors[indptr[i]:indptr[i + 1]]` and the trustline connecting `i` to each
+of these neighbors is found at the same positions in `edges`. The data of a
+trustline is stored in per-edge arrays indexed by these edge ids.
+
+Ids are assigned in sorted address order, so comparing two ids gives the same
+result as comparing the corresponding addresses. This means the view
+dependent accessors below work the same way as the ones in trustline_data,
+the snapshot can be passed to the cost accumulators in place of that module.
+
+Building a snapshot is linear in the size of the graph. Pathfinding on it
+avoids hashing addresses and looking up string keys in the networkx attribute
+dicts for every relaxed edge. On a random network with 20k users and 100k
+trustlines a search takes about 15% less time than on the networkx graph, most
+of the remaining time is spent inside the cost accumulators (see
+benchmarks/pathfinding.py).
+
+A snapshot can be serialized into a flat buffer via `to_bytes`. The buffer
+starts with a fixed size header, followed by the integer arrays in native byte
+order and the pickled addresses, balances and creditlines. `from_buffer` reads
+such a buffer without copying the arrays, which allows to share a snapshot
+between processes via shared memory.
+
+The Reachability of a snapshot tells in constant time that there can not be a
+path between two users, e.g. because they are in different connected
+components, so that such queries are answered without running a search.
+"""
+import pickle
+import struct
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+
+from relay.network_graph import alg
+from relay.network_graph.interests import (
+    _ensure_non_negative_delta_time,
+    balance_with_interests,
+)
+
+# magic, format version, number of nodes, number of adjacency entries,
+# number of edges, size of the pickled data
+_HEADER = struct.Struct("=4sIqqqq")
+_MAGIC = b"TLGS"
+_FORMAT_VERSION = 1
+_INT_SIZE = array("q").itemsize
+
+
+class GraphSnapshot:
+    """Read-only snapshot of the trustlines of a currency network graph
+
+    balances and creditlines are stored in lists, since they may not fit into
+    a 64 bit integer.
+    """
+
+    def __init__(self, graph: nx.Graph) -> None:
+        self.addresses: List[str] = sorted(graph.nodes())
+        self.ids: Dict[str, int] = {
+            address: node for node, address in enumerate(self.addresses)
+        }
+
+        self.indptr = array("q", [0])
+        self.neighbors = array("q")
+        self.edges = array("q")
+
+        self.balance_ab: List[int] = []
+        self.creditline_ab: List[int] = []
+        self.creditline_ba: List[int] = []
+        self.interest_ab = array("q")
+        self.interest_ba = array("q")
+        self.m_time = array("q")
+        self.is_frozen = bytearray()
+        self._landmarks: Optional[alg.Landmarks] = None
+        self._reachability: Optional[Reachability] = None
+        # balances with interests from the view of a, memoized per edge for
+        # the timestamp of the last query, see get_balance_with_interests
+        self._balances_timestamp: Optional[int] = None
+        self._balances_with_interests: Dict[int, int] = {}
+
+        edge_ids: Dict[Tuple[int, int], int] = {}
+        ids = self.ids
+        graph_adj = graph.adj
+        for address in self.addresses:
+            node = ids[address]
+            # keep the order of the networkx adjacency, so that the search
+            # explores the neighbors in the same order on both representations
+            for counter_party, data in graph_adj[address].items():
+                dst = ids[counter_party]
+                key = (node, dst) if node < dst else (dst, node)
+                edge = edge_ids.get(key)
+                if edge is None:
+                    edge = self._add_edge_data(data)
+                    edge_ids[key] = edge
+                self.neighbors.append(dst)
+                self.edges.append(edge)
+            self.indptr.append(len(self.neighbors))
+        self.has_interests = any(self.interest_ab) or any(self.interest_ba)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "GraphSnapshot":
+        """Returns the snapshot serialized into buffer by `to_bytes`
+
+        The integer arrays of the snapshot are read-only views of buffer, so
+        buffer must not be changed or released while the snapshot is used.
+        """
+        view = memoryview(buffer).cast("B")
+        (
+            magic,
+            format_version,
+            number_of_nodes,
+            number_of_adjacency_entries,
+            number_of_edges,
+            pickled_size,
+        ) = _HEADER.unpack_from(view)
+        if magic != _MAGIC or format_version != _FORMAT_VERSION:
+            raise ValueError("Buffer does not contain a graph snapshot")
+
+        offset = _HEADER.size
+
+        def read(size, format):
+            nonlocal offset
+            data = view[offset : offset + size]
+            offset += _aligned(size)
+            return data.toreadonly().cast(format)
+
+        snapshot = cls.__new__(cls)
+        snapshot.indptr = read((number_of_nodes + 1) * _INT_SIZE, "q")
+        snapshot.neighbors = read(number_of_adjacency_entries * _INT_SIZE, "q")
+        snapshot.edges = read(number_of_adjacency_entries * _INT_SIZE, "q")
+        snapshot.interest_ab = read(number_of_edges * _INT_SIZE, "q")
+        snapshot.interest_ba = read(number_of_edges * _INT_SIZE, "q")
+        snapshot.m_time = read(number_of_edges * _INT_SIZE, "q")
+        snapshot.is_frozen = read(number_of_edges, "B")
+        (
+            snapshot.addresses,
+            snapshot.balance_ab,
+            snapshot.creditline_ab,
+            snapshot.creditline_ba,
+        ) = pickle.loads(view[offset : offset + pickled_size])
+        snapshot.ids = {
+            address: node for node, address in enumerate(snapshot.addresses)
+        }
+        snapshot._landmarks = None
+        snapshot._reachability = None
+        snapshot._balances_timestamp = None
+        snapshot._balances_with_interests = {}
+        snapshot.has_interests = any(snapshot.interest_ab) or any(snapshot.interest_ba)
+        return snapshot
+
+    def to_bytes(self) -> bytes:
+        """Returns the snapshot serialized into a flat buffer, see `from_buffer`"""
+        pickled = pickle.dumps(
+            (self.addresses, self.balance_ab, self.creditline_ab, self.creditline_ba),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        parts = [
+            _HEADER.pack(
+                _MAGIC,
+                _FORMAT_VERSION,
+                self.number_of_nodes,
+                len(self.neighbors),
+                self.number_of_edges,
+                len(pickled),
+            )
+        ]
+        for data in [
+            self.indptr,
+            self.neighbors,
+            self.edges,
+            self.interest_ab,
+            self.interest_ba,
+            self.m_time,
+            self.is_frozen,
+        ]:
+            chunk = bytes(data)
+            parts.append(chunk)
+            parts.append(bytes(_aligned(len(chunk)) - len(chunk)))
+        parts.append(pickled)
+        return b"".join(parts)
+
+    def _add_edge_data(self, data) -> int:
+        self.balance_ab.append(data.balance_ab)
+        self.creditline_ab.append(data.creditline_ab)
+        self.creditline_ba.append(data.creditline_ba)
+        self.interest_ab.append(data.interest_ab)
+        self.interest_ba.append(data.interest_ba)
+        self.m_time.append(data.m_time)
+        self.is_frozen.append(bool(data.is_frozen))
+        return len(self.balance_ab) - 1
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.addresses)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.balance_ab)
+
+    @property
+    def nodes(self) -> range:
+        return range(len(self.addresses))
+
+    @property
+    def landmarks(self) -> alg.Landmarks:
+        """landmarks for the goal-directed search, computed on first use
+
+        They only depend on the adjacency, so they are shared with the
+        snapshots created via `updated` afterwards."""
+        if self._landmarks is None:
+            self._landmarks = alg.Landmarks(self)
+        return self._landmarks
+
+    @property
+    def reachability(self) -> "Reachability":
+        """the reachability index of the users, computed on first use
+
+        It is updated incrementally for the snapshots created via `updated`
+        afterwards."""
+        if self._reachability is None:
+            self._reachability = Reachability(self)
+        return self._reachability
+
+    def has_node(self, node) -> bool:
+        return isinstance(node, int) and 0 <= node < len(self.addresses)
+
+    def neighbor_items(self, node):
+        """Returns an iterable of (neighbor, edge) pairs of node"""
+        start = self.indptr[node]
+        end = self.indptr[node + 1]
+        return zip(self.neighbors[start:end], self.edges[start:end])
+
+    def get_edge_data(self, u, v) -> Optional[int]:
+        """Returns the id of the edge between u and v or None"""
+        for dst, edge in self.neighbor_items(u):
+            if dst == v:
+                return edge
+        return None
+
+    def to_ids(self, addresses: Iterable[str]) -> List[int]:
+        """Returns the ids of the given addresses, skipping unknown ones"""
+        ids = self.ids
+        return [ids[address] for address in addresses if address in ids]
+
+    def to_addresses(self, nodes: Iterable[int]) -> List[str]:
+        addresses = self.addresses
+        return [addresses[node] for node in nodes]
+
+    # The accessors below mirror the ones in trustline_data, with `edge` being
+    # the id of an edge instead of the attribute dict stored on the graph
+
+    def get_balance(self, edge, user, counter_party):
+        """Returns the balance between user and counter_party from the view of user"""
+        if user < counter_party:
+            return self.balance_ab[edge]
+        else:
+            return -self.balance_ab[edge]
+
+    def get_creditline(self, edge, user, counter_party):
+        """Returns the creditline given by user to counter_party"""
+        if user < counter_party:
+            return self.creditline_ab[edge]
+        else:
+            return self.creditline_ba[edge]
+
+    def get_interest_rate(self, edge, user, counter_party):
+        """Returns the interest rate of the credit given from user to counter_party"""
+        if user < counter_party:
+            return self.interest_ab[edge]
+        else:
+            return self.interest_ba[edge]
+
+    def get_balance_with_interests(self, edge, user, counter_party, timestamp):
+        """Returns the balance between user and counter_party from the view of
+        user at the given time with an estimation of the interests
+
+        The computation of the interests is rather expensive, so the results
+        are memoized per edge. Pathfinding evaluates the same edges repeatedly
+        and all queries within the same second use the same timestamp, so only
+        the results for the most recent timestamp are kept.
+        """
+        delta_time = timestamp - self.m_time[edge]
+        if not self.has_interests:
+            _ensure_non_negative_delta_time(delta_time)
+            balance = self.balance_ab[edge]
+        else:
+            if timestamp != self._balances_timestamp:
+                self._balances_timestamp = timestamp
+                self._balances_with_interests = {}
+            balance = self._balances_with_interests.get(edge)
+            if balance is None:
+                # interests are symmetric in the point of view, so this is
+                # computed from the view of a only
+                balance = balance_with_interests(
+                    self.balance_ab[edge],
+                    self.interest_ab[edge],
+                    self.interest_ba[edge],
+                    delta_time,
+                )
+                self._balances_with_interests[edge] = balance
+        if user < counter_party:
+            return balance
+        else:
+            return -balance
+
+    def get_is_frozen(self, edge):
+        return self.is_frozen[edge]
+
+    def get_mtime(self, edge):
+        """Returns the unix timestamp of the last modification time of this trustline"""
+        return self.m_time[edge]
+
+    def updated(self, graph: nx.Graph, trustlines: Iterable) -> "GraphSnapshot":
+        """Returns a new snapshot with the data of the given trustlines read
+        from graph. The trustlines have to be in this snapshot already, i.e.
+        this can be used when the data of a trustline changed but not the set
+        of trustlines.
+
+        The adjacency arrays are shared with this snapshot, the per-edge arrays
+        are copied so that this snapshot stays unchanged."""
+        snapshot = GraphSnapshot.__new__(GraphSnapshot)
+        snapshot.__dict__.update(self.__dict__)
+        snapshot.balance_ab = list(self.balance_ab)
+        snapshot.creditline_ab = list(self.creditline_ab)
+        snapshot.creditline_ba = list(self.creditline_ba)
+        snapshot.interest_ab = array("q", self.interest_ab)
+        snapshot.interest_ba = array("q", self.interest_ba)
+        snapshot.m_time = array("q", self.m_time)
+        snapshot.is_frozen = bytearray(self.is_frozen)
+        snapshot._balances_with_interests = dict(self._balances_with_interests)
+
+        ids = self.ids
+        for a, b in trustlines:
+            edge = self.get_edge_data(ids[a], ids[b])
+            if edge is None:
+                raise KeyError(f"Trustline ({a}, {b}) is not in the snapshot")
+            snapshot._balances_with_interests.pop(edge, None)
+            data = graph.adj[a][b]
+            snapshot.balance_ab[edge] = data.balance_ab
+            snapshot.creditline_ab[edge] = data.creditline_ab
+            snapshot.creditline_ba[edge] = data.creditline_ba
+            snapshot.interest_ab[edge] = data.interest_ab
+            snapshot.interest_ba[edge] = data.interest_ba
+            snapshot.m_time[edge] = data.m_time
+            snapshot.is_frozen[edge] = bool(data.is_frozen)
+            snapshot.has_interests = snapshot.has_interests or bool(
+                data.interest_ab or data.interest_ba
+            )
+        if self._reachability is not None:
+            snapshot._reachability = self._reachability.updated(
+                snapshot, {ids[user] for trustline in trustlines for user in trustline}
+            )
+        return snapshot
+
+
+class Reachability:
+    """Index of the users of a snapshot to rule out paths in constant time
+
+    components maps every node to the id of its connected component.
+    has_outgoing_capacity and has_incoming_capacity tell whether a node has a
+    trustline that is not frozen and may have capacity to pay to, or
+    respectively receive from, the counter party. Trustlines with interests
+    are assumed to have capacity in both directions, since their balance
+    changes over time.
+
+    The components only depend on the adjacency, so they are shared with the
+    index of updated snapshots, only the flags of the users of changed
+    trustlines are recomputed.
+    """
+
+    def __init__(self, snapshot: GraphSnapshot) -> None:
+        self.components = _connected_components(snapshot)
+        self.has_outgoing_capacity = bytearray(snapshot.number_of_nodes)
+        self.has_incoming_capacity = bytearray(snapshot.number_of_nodes)
+        for node in snapshot.nodes:
+            self._update_flags(snapshot, node)
+
+    def updated(self, snapshot: GraphSnapshot, nodes: Iterable[int]) -> "Reachability":
+        """Returns the index of snapshot, which has the same trustlines as the
+        snapshot of this index but changed data of the trustlines of nodes"""
+        reachability = Reachability.__new__(Reachability)
+        reachability.components = self.components
+        reachability.has_outgoing_capacity = bytearray(self.has_outgoing_capacity)
+        reachability.has_incoming_capacity = bytearray(self.has_incoming_capacity)
+        for node in nodes:
+            reachability._update_flags(snapshot, node)
+        return reachability
+
+    def _update_flags(self, snapshot: GraphSnapshot, node: int) -> None:
+        has_outgoing_capacity = has_incoming_capacity = False
+        for dst, edge in snapshot.neighbor_items(node):
+            if snapshot.is_frozen[edge]:
+                continue
+            if snapshot.interest_ab[edge] or snapshot.interest_ba[edge]:
+                has_outgoing_capacity = has_incoming_capacity = True
+                break
+            balance = snapshot.get_balance(edge, node, dst)
+            if balance + snapshot.get_creditline(edge, dst, node) > 0:
+                has_outgoing_capacity = True
+            if -balance + snapshot.get_creditline(edge, node, dst) > 0:
+                has_incoming_capacity = True
+            if has_outgoing_capacity and has_incoming_capacity:
+                break
+        self.has_outgoing_capacity[node] = has_outgoing_capacity
+        self.has_incoming_capacity[node] = has_incoming_capacity
+
+    def may_have_path(self, source: int, target: int) -> bool:
+        """Returns False if there is certainly no path to pay from source to
+        target, otherwise a search is needed to find out"""
+        return source == target or bool(
+            self.components[source] == self.components[target]
+            and self.has_outgoing_capacity[source]
+            and self.has_incoming_capacity[target]
+        )
+
+
+def _connected_components(snapshot: GraphSnapshot) -> array:
+    """Returns the id of the connected component of every node"""
+    indptr = snapshot.indptr
+    neighbors = snapshot.neighbors
+    components = array("q", [-1]) * snapshot.number_of_nodes
+    number_of_components = 0
+    for start in snapshot.nodes:
+        if components[start] != -1:
+            continue
+        component = number_of_components
+        number_of_components += 1
+        components[start] = component
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for i in range(indptr[node], indptr[node + 1]):
+                dst = neighbors[i]
+                if components[dst] == -1:
+                    components[dst] = component
+                    stack.append(dst)
+    return components
+
+
+def _aligned(size: int) -> int:
+    """Returns size rounded up to a multiple of the size of the integers"""
+    return -(-size // _INT_SIZE) * _INT_SIZE
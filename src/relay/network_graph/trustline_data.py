@@ -12,6 +12,105 @@ from relay.network_graph.graph_constants import (
     is_frozen,
     m_time,
 )
+from relay.network_graph.interests import balance_with_interests
+
+
+class TrustlineData:
+    """The data of a trustline stored on an edge of the graph
+
+    A slotted record instead of a dict per edge to save memory and to get the
+    values via attribute access. It implements the part of the mapping
+    protocol networkx uses for edge data, so that it can be used as the
+    edge_attr_dict_factory of a graph.
+    """
+
+    __slots__ = (
+        creditline_ab,
+        creditline_ba,
+        interest_ab,
+        interest_ba,
+        is_frozen,
+        m_time,
+        balance_ab,
+    )
+
+    def __init__(
+        self,
+        creditline_ab=0,
+        creditline_ba=0,
+        interest_ab=0,
+        interest_ba=0,
+        is_frozen=False,
+        m_time=0,
+        balance_ab=0,
+    ):
+        self.creditline_ab = creditline_ab
+        self.creditline_ba = creditline_ba
+        self.interest_ab = interest_ab
+        self.interest_ba = interest_ba
+        self.is_frozen = is_frozen
+        self.m_time = m_time
+        self.balance_ab = balance_ab
+
+    def copy(self) -> "TrustlineData":
+        return TrustlineData(
+            self.creditline_ab,
+            self.creditline_ba,
+            self.interest_ab,
+            self.interest_ba,
+            self.is_frozen,
+            self.m_time,
+            self.balance_ab,
+        )
+
+    def update(self, other=(), **kwargs):
+        if hasattr(other, "keys"):
+            items = [(key, other[key]) for key in other.keys()]
+        else:
+            items = other
+        for key, value in items:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def keys(self):
+        return iter(self.__slots__)
+
+    def items(self):
+        return ((key, getattr(self, key)) for key in self.__slots__)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, TrustlineData):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    def __repr__(self):
+        return "TrustlineData({})".format(
+            ", ".join(f"{key}={value!r}" for key, value in self.items())
+        )
 
 
 def get(user, counter_party, value, reverse_value):
@@ -35,12 +134,26 @@ def get_balance(data, user, counter_party):
     A positive balance means that counter_party ows user, or in other words, that
     user has a claim against counter_party over this amount
     """
-    return get(user, counter_party, data[balance_ab], -data[balance_ab])
+    return get(user, counter_party, data.balance_ab, -data.balance_ab)
+
+
+def get_balance_with_interests(data, user, counter_party, timestamp):
+    """Returns the balance between user and counter_party from the view of user
+    at the given time with an estimation of the interests"""
+    return balance_with_interests(
+        get_balance(data, user, counter_party),
+        get_interest_rate(data, user, counter_party),
+        get_interest_rate(data, counter_party, user),
+        timestamp - get_mtime(data),
+    )
 
 
 def set_balance(data, user, counter_party, balance):
     """Sets the balance between user and counter_party from the view of user"""
-    set(data, user, counter_party, {balance_ab: balance}, {balance_ab: -balance})
+    if user < counter_party:
+        data.balance_ab = balance
+    else:
+        data.balance_ab = -balance
 
 
 def get_creditline(data, user, counter_party):
@@ -49,7 +162,7 @@ def get_creditline(data, user, counter_party):
 
     To get the creditline given by counter_party to user, you can use `get_creditline(data, counter_party, user)`
     """
-    return get(user, counter_party, data[creditline_ab], data[creditline_ba])
+    return get(user, counter_party, data.creditline_ab, data.creditline_ba)
 
 
 def set_creditline(data, user, counter_party, creditline):
@@ -59,44 +172,38 @@ def set_creditline(data, user, counter_party, creditline):
     To set the creditline given by counter_party to user,
     you can use `set_creditline(data, counter_party, user, creditline)`
     """
-    set(
-        data,
-        user,
-        counter_party,
-        {creditline_ab: creditline},
-        {creditline_ba: creditline},
-    )
+    if user < counter_party:
+        data.creditline_ab = creditline
+    else:
+        data.creditline_ba = creditline
 
 
 def get_interest_rate(data, user, counter_party):
     """Returns the interest rate of the credit given from user to counter_party"""
-    return get(user, counter_party, data[interest_ab], data[interest_ba])
+    return get(user, counter_party, data.interest_ab, data.interest_ba)
 
 
 def set_interest_rate(data, user, counter_party, interest_rate):
     """Sets the interest rate of the credit given from user to counter_party"""
-    set(
-        data,
-        user,
-        counter_party,
-        {interest_ab: interest_rate},
-        {interest_ba: interest_rate},
-    )
+    if user < counter_party:
+        data.interest_ab = interest_rate
+    else:
+        data.interest_ba = interest_rate
 
 
 def get_is_frozen(data):
-    return data[is_frozen]
+    return data.is_frozen
 
 
 def set_is_frozen(data, _is_frozen):
-    data[is_frozen] = _is_frozen
+    data.is_frozen = _is_frozen
 
 
 def get_mtime(data):
     """Returns the unix timestamp of the last modification time of this trustline"""
-    return data[m_time]
+    return data.m_time
 
 
 def set_mtime(data, timestamp):
     """Sets the unix timestamp of the last modification time of this trustline"""
-    data[m_time] = timestamp
+    data.m_time = timestamp
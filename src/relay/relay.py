@@ -1,14 +1,17 @@
 import json
 import logging
 import os
+import time
 from collections import defaultdict
 from copy import deepcopy
 from enum import Enum
-from typing import Dict, Iterable, List, NamedTuple, Optional
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
 
 import eth_account
 import eth_keyfile
 import gevent
+import gevent.pool
+import psycopg2
 import sqlalchemy
 from eth_utils import is_checksum_address, to_checksum_address
 from sqlalchemy.engine.url import URL
@@ -17,11 +20,24 @@ from tldeploy.identity import MetaTransaction
 from web3 import Web3
 
 from relay import signing_middleware
+from relay.blockchain.batch_calls import BatchCaller
 from relay.blockchain.identity_events import FeePaymentEventType
 from relay.blockchain.identity_proxy import IdentityProxy
 from relay.blockchain.proxy import LogFilterListener
 from relay.ethindex_db import ethindex_db
-from relay.ethindex_db.sync_updates import FeedUpdate, graph_update_getter
+from relay.ethindex_db.graph_state import trustlines_state
+from relay.ethindex_db.sync_updates import (
+    BalanceUpdateFeedUpdate,
+    FeedUpdate,
+    GraphFeedListener,
+    TrustlineUpdateFeedUpdate,
+    coalesce_feed_updates,
+    ensure_graph_sync_id_file_exists,
+    get_graph_updates_feed_batches,
+    get_graph_updates_feed_of_network,
+    get_latest_graph_sync_id,
+    write_graph_sync_id_file,
+)
 from relay.pushservice.client import PushNotificationClient
 from relay.pushservice.client_token_db import (
     ClientTokenAlreadyExistsException,
@@ -50,7 +66,17 @@ from .blockchain.unw_eth_proxy import UnwEthProxy
 from .ethindex_db.events_informations import EventsInformationFetcher
 from .events import BalanceEvent, NetworkBalanceEvent
 from .exchange.orderbook import OrderBookGreenlet
+from .network_graph.alg import SearchBudget, SearchBudgetExceeded, SearchStatistics
 from .network_graph.graph import CurrencyNetworkGraph
+from .network_graph.metrics import PathfindingMetrics
+from .network_graph.path_cache import PathCache
+from .network_graph.pathfinding_pool import PathfindingPool
+from .network_graph.persistence import (
+    InvalidGraphFile,
+    graph_file_path,
+    open_graph_file,
+    write_graph_file,
+)
 from .streams import MessagingSubject, Subject
 
 logger = logging.getLogger("relay")
@@ -74,6 +100,19 @@ class NetworkInfo(NamedTuple):
     is_frozen: bool
 
 
+class NetworkStartupTiming(NamedTuple):
+    # where the graph was synced from: graph file, ethindex or chain
+    graph_source: str
+    # seconds spent reading the properties of the network contract
+    contract_duration: float
+    # seconds spent syncing the graph
+    graph_duration: float
+
+    @property
+    def total_duration(self) -> float:
+        return self.contract_duration + self.graph_duration
+
+
 class ContractTypes(Enum):
     CURRENCY_NETWORK = "CurrencyNetwork"
     EXCHANGE = "Exchange"
@@ -112,6 +151,24 @@ class TrustlinesRelay:
         self.addresses_json_path = addresses_json_path
         self.currency_network_proxies: Dict[str, CurrencyNetworkProxy] = {}
         self.currency_network_graphs: Dict[str, CurrencyNetworkGraph] = {}
+        self.path_caches: Dict[str, PathCache] = {}
+        self.pathfinding_pool: Optional[PathfindingPool] = None
+        self.pathfinding_metrics = PathfindingMetrics()
+        # graph feed ids the graphs were loaded at from graph files or ethindex
+        self._graph_feed_sync_ids: Dict[str, int] = {}
+        # id of the last graph feed row applied to the graphs, None until the
+        # graph feed is synced
+        self._graph_feed_sync_id: Optional[int] = None
+        # networks with a synced graph, which is not fed by the graph feed yet,
+        # with the graph feed id after which the feed has to be applied to it
+        self._networks_catching_up: Dict[str, int] = {}
+        self._graph_files_written_at = time.monotonic()
+        # networks that are added but whose graphs are not synced yet
+        self._networks_syncing: Set[str] = set()
+        self.network_startup_timings: Dict[str, NetworkStartupTiming] = {}
+        # user address -> networks with a trustline of the user, the networks
+        # are the keys of a dict to keep them in the order they were added
+        self._networks_of_users: Dict[str, Dict[str, None]] = {}
         self.subjects = defaultdict(Subject)
         self.messaging = defaultdict(MessagingSubject)
         self.contracts = {}
@@ -215,6 +272,10 @@ class TrustlinesRelay:
     def is_currency_network(self, address: str) -> bool:
         return address in self.network_addresses
 
+    def is_currency_network_syncing(self, address: str) -> bool:
+        """whether the network is known but its graph is not synced yet"""
+        return address in self._networks_syncing
+
     def is_currency_network_frozen(self, address: str) -> bool:
         return self.currency_network_graphs[address].is_frozen
 
@@ -232,7 +293,7 @@ class TrustlinesRelay:
             name=proxy.name,
             symbol=proxy.symbol,
             decimals=proxy.decimals,
-            num_users=len(graph.users),
+            num_users=graph.number_of_users,
             capacity_imbalance_fee_divisor=proxy.capacity_imbalance_fee_divisor,
             default_interest_rate=proxy.default_interest_rate,
             custom_interests=proxy.custom_interests,
@@ -245,6 +306,7 @@ class TrustlinesRelay:
         return [
             self.get_network_info(network_address)
             for network_address in self.network_addresses
+            if not self.is_currency_network_syncing(network_address)
         ]
 
     def get_users_of_network(self, network_address: str):
@@ -415,45 +477,251 @@ class TrustlinesRelay:
         self._log_listener = LogFilterListener(self._web3)
         if self.config["delegate"]["enable"]:
             self._start_delegate()
-        self._load_addresses()
+        self._start_pathfinding_pool()
+        network_addresses = self._load_addresses()
+        gevent.Greenlet.spawn(self._bootstrap, network_addresses)
+
+    def _bootstrap(self, network_addresses: List[str]):
+        """keep the graphs in sync with the graph feed and sync the graphs of
+        the networks, every network is fed by the graph feed and listened to
+        as soon as its graph is synced"""
         self._start_sync_graphs_via_feed()
+        self._bootstrap_networks(network_addresses)
+
+    def _bootstrap_networks(self, network_addresses: List[str]):
+        """add the networks concurrently, every network can be used as soon
+        as its graph is synced"""
+        network_addresses = [
+            address
+            for address in dict.fromkeys(network_addresses)
+            if address not in self.network_addresses
+        ]
+        self._networks_syncing.update(network_addresses)
+        concurrency = self.config["trustline_index"]["network_bootstrap_concurrency"]
+        logger.info(
+            f"Bootstrap {len(network_addresses)} networks, {concurrency} at a time"
+        )
+        started_at = time.monotonic()
+        pool = gevent.pool.Pool(concurrency)
+        for address in network_addresses:
+            pool.spawn(self._bootstrap_network, address)
+        pool.join()
+        self._log_startup_timings(network_addresses, time.monotonic() - started_at)
+
+    def _bootstrap_network(self, address: str):
+        try:
+            self.new_network(address)
+        except Exception:
+            logger.exception(f"Could not bootstrap network {address}")
+            self._networks_syncing.discard(address)
+
+    def _log_startup_timings(self, network_addresses: List[str], duration: float):
+        timings = sorted(
+            (
+                (address, self.network_startup_timings[address])
+                for address in network_addresses
+                if address in self.network_startup_timings
+            ),
+            key=lambda item: item[1].total_duration,
+            reverse=True,
+        )
+        lines = [
+            f"{address}: {timing.total_duration:.2f}s (contract "
+            f"{timing.contract_duration:.2f}s, graph from {timing.graph_source} "
+            f"{timing.graph_duration:.2f}s)"
+            for address, timing in timings
+        ]
+        logger.info(
+            f"Bootstrapped {len(timings)} of {len(network_addresses)} networks in "
+            f"{duration:.2f}s\n" + "\n".join(lines)
+        )
+
+    def _start_pathfinding_pool(self):
+        processes = self.config["trustline_index"]["pathfinding_processes"]
+        if processes > 0:
+            logger.info(f"Start pathfinding pool with {processes} processes")
+            self.pathfinding_pool = PathfindingPool(processes)
 
     def _start_sync_graphs_via_feed(self):
         conn = ethindex_db.connect("")
-        updates_getter = graph_update_getter()
+        ensure_graph_sync_id_file_exists()
+        self._graph_feed_sync_id = int(get_latest_graph_sync_id())
+        config = self.config["trustline_index"]
+        listener: Optional[GraphFeedListener] = None
+        if config["graph_feed_notifications"]:
+            # listen before the first fetch to not miss rows inserted meanwhile
+            listener = GraphFeedListener(
+                notification_delay=config["graph_feed_notification_delay"]
+            )
+            listener.listen()
 
         def sync():
             while True:
-                graph_updates = updates_getter(conn)
-                self._apply_feed_update_on_graph(graph_updates)
-                gevent.sleep(self.config["trustline_index"]["sync_interval"])
+                self._sync_graph_feed(conn, config["graph_feed_batch_size"])
+                self._refresh_pathfinding_snapshots()
+                self._write_graph_files_if_due()
+                if listener is not None:
+                    # the sync interval is the maximum time between two fetches
+                    listener.wait(config["sync_interval"])
+                else:
+                    gevent.sleep(config["sync_interval"])
 
         gevent.Greenlet.spawn(sync)
 
+    def _sync_graph_feed(self, conn, batch_size: int):
+        """apply the new rows of the graph feed batch by batch to the synced
+        graphs, the sync id is checkpointed after every batch
+
+        Networks whose graphs got synced in the meantime catch up with the
+        graph feed in between the batches."""
+        if not self._has_synced_networks():
+            if not self._networks_catching_up:
+                # there is no graph to apply the graph feed to
+                return
+            self._skip_graph_feed_to(min(self._networks_catching_up.values()))
+        self._catch_up_networks_with_graph_feed(conn)
+        for graph_updates, sync_id in get_graph_updates_feed_batches(conn, batch_size):
+            coalesced_updates = coalesce_feed_updates(graph_updates)
+            dropped = len(graph_updates) - len(coalesced_updates)
+            if dropped:
+                logger.info(
+                    f"Dropped {dropped} of {len(graph_updates)} graph feed updates "
+                    f"overwritten by later ones up to sync id {sync_id}"
+                )
+            self._apply_feed_update_on_graph(
+                [
+                    update
+                    for update in coalesced_updates
+                    if not self.is_currency_network_syncing(update.address)
+                ]
+            )
+            write_graph_sync_id_file(sync_id)
+            self._graph_feed_sync_id = sync_id
+            self._catch_up_networks_with_graph_feed(conn)
+            # serve requests in between the batches while catching up
+            gevent.sleep(0)
+
+    def _has_synced_networks(self) -> bool:
+        return any(
+            not self.is_currency_network_syncing(address)
+            for address in self.currency_network_graphs
+        )
+
+    def _skip_graph_feed_to(self, sync_id: int):
+        """continue the graph feed after sync_id if it is behind it, only used
+        when no graph is fed by the graph feed"""
+        assert self._graph_feed_sync_id is not None
+        if sync_id > self._graph_feed_sync_id:
+            logger.info(f"Continue graph feed after id {sync_id}")
+            write_graph_sync_id_file(sync_id)
+            self._graph_feed_sync_id = sync_id
+
+    def _catch_up_networks_with_graph_feed(self, conn):
+        """apply the rows of the graph feed, which were already synced while
+        the graphs of the networks were synced, and mark the networks as synced
+
+        Graphs loaded at a graph feed id after the last synced one wait until
+        the graph feed reached it, the updates are idempotent but applying
+        older ones would revert the graph for a while."""
+        assert self._graph_feed_sync_id is not None
+        for address, sync_id in list(self._networks_catching_up.items()):
+            if sync_id > self._graph_feed_sync_id:
+                continue
+            graph_updates = get_graph_updates_feed_of_network(
+                conn, address, sync_id, self._graph_feed_sync_id
+            )
+            self._apply_feed_update_on_graph(coalesce_feed_updates(graph_updates))
+            del self._networks_catching_up[address]
+            self._networks_syncing.discard(address)
+            logger.info(
+                f"Network {address} caught up with {len(graph_updates)} graph feed "
+                f"updates after id {sync_id} and is fed by the graph feed"
+            )
+
+    def _feed_synced_graph(self, address: str, feed_sync_id: Optional[int]):
+        """let the graph feed catch up the synced graph of the network, the
+        network stays syncing until then
+
+        The graph feed is applied after the id the graph was loaded at, or
+        after feed_sync_id, the graph feed sync id when the graph started to
+        be synced from the chain. Without the graph feed being synced, the
+        network is synced at once."""
+        sync_id = self._graph_feed_sync_ids.get(address, feed_sync_id)
+        if self._graph_feed_sync_id is None or sync_id is None:
+            self._networks_syncing.discard(address)
+        else:
+            self._networks_catching_up[address] = sync_id
+
     def new_network(self, address: str) -> None:
         assert is_checksum_address(address)
         if address in self.network_addresses:
             return
         logger.info("New network: {}".format(address))
-        self.currency_network_proxies[address] = CurrencyNetworkProxy(
-            self._web3, self.contracts["CurrencyNetwork"]["abi"], address
+        started_at = time.monotonic()
+        self._networks_syncing.add(address)
+        # a graph synced from the chain contains all rows of the graph feed
+        # which are synced now
+        feed_sync_id = self._graph_feed_sync_id
+        try:
+            currency_network_proxy = CurrencyNetworkProxy(
+                self._web3, self.contracts["CurrencyNetwork"]["abi"], address
+            )
+            self.currency_network_proxies[address] = currency_network_proxy
+            self.currency_network_graphs[address] = CurrencyNetworkGraph(
+                capacity_imbalance_fee_divisor=currency_network_proxy.capacity_imbalance_fee_divisor,
+                default_interest_rate=currency_network_proxy.default_interest_rate,
+                custom_interests=currency_network_proxy.custom_interests,
+                prevent_mediator_interests=currency_network_proxy.prevent_mediator_interests,
+            )
+            self.path_caches[address] = PathCache(
+                self.currency_network_graphs[address],
+                maxsize=self.config["trustline_index"]["path_cache_size"],
+                max_age=self.config["trustline_index"]["path_cache_max_age"],
+            )
+            contract_loaded_at = time.monotonic()
+            graph_source = self._sync_new_graph(address)
+            self._log_listener.add_proxy(currency_network_proxy)
+            self._start_listen_network(address)
+            self._log_listener.start()
+        except Exception:
+            self._remove_network_of_users(address)
+            self.currency_network_proxies.pop(address, None)
+            self.currency_network_graphs.pop(address, None)
+            self.path_caches.pop(address, None)
+            self._networks_syncing.discard(address)
+            raise
+        self._feed_synced_graph(address, feed_sync_id)
+
+        timing = NetworkStartupTiming(
+            graph_source=graph_source,
+            contract_duration=contract_loaded_at - started_at,
+            graph_duration=time.monotonic() - contract_loaded_at,
         )
-        currency_network_proxy = self.currency_network_proxies[address]
-        self.currency_network_graphs[address] = CurrencyNetworkGraph(
-            capacity_imbalance_fee_divisor=currency_network_proxy.capacity_imbalance_fee_divisor,
-            default_interest_rate=currency_network_proxy.default_interest_rate,
-            custom_interests=currency_network_proxy.custom_interests,
-            prevent_mediator_interests=currency_network_proxy.prevent_mediator_interests,
+        self.network_startup_timings[address] = timing
+        logger.info(
+            f"Graph of network {address} synced after {timing.total_duration:.2f}s"
         )
-        self._log_listener.add_proxy(currency_network_proxy)
+
+    def _sync_new_graph(self, address: str) -> str:
+        """sync the graph of a new network, returns where it was synced from"""
+        if self._load_graph_file(address):
+            return "graph file"
+        if self._load_graph_from_ethindex(address):
+            return "ethindex"
         self.fully_sync_graph(address)
-        self._start_listen_network(address)
+        return "chain"
 
     def fully_sync_graph(self, address):
         logger.info(f"Fully syncing graph from blockchain state for address: {address}")
 
+        old_users = self.currency_network_graphs[address].users
         self.currency_network_graphs[address].gen_network(
-            self.currency_network_proxies[address].gen_graph_representation()
+            self.currency_network_proxies[address].gen_graph_representation(
+                self._new_batch_caller()
+            )
+        )
+        self._update_networks_of_users(
+            address, old_users + self.currency_network_graphs[address].users
         )
         self.currency_network_graphs[address].is_frozen = self.currency_network_proxies[
             address
@@ -461,6 +729,110 @@ class TrustlinesRelay:
 
         logger.info(f"Graph fully synced for address: {address}")
 
+    def _new_batch_caller(self) -> Optional[BatchCaller]:
+        """the batch caller used to sync graphs from the chain, None if the
+        calls should be made one after another"""
+        config = self.config["trustline_index"]
+        if config["chain_sync_concurrency"] <= 0:
+            return None
+        return BatchCaller(
+            self._web3,
+            batch_size=config["chain_sync_batch_size"],
+            concurrency=config["chain_sync_concurrency"],
+            retries=config["chain_sync_retries"],
+        )
+
+    @property
+    def _graph_file_directory(self) -> str:
+        """the directory of the graph files, graph files are disabled if empty"""
+        return self.config["trustline_index"]["graph_file_directory"]
+
+    def _load_graph_file(self, address: str) -> bool:
+        """load the graph of the network from its graph file, returns whether
+        it was loaded"""
+        if not self._graph_file_directory:
+            return False
+        path = graph_file_path(self._graph_file_directory, address)
+        graph = self.currency_network_graphs[address]
+        try:
+            with open_graph_file(path) as (snapshot, sync_id):
+                graph.gen_network_from_snapshot(snapshot)
+        except FileNotFoundError:
+            logger.info(f"No graph file for address: {address}")
+            return False
+        except InvalidGraphFile as e:
+            logger.warning(f"Could not load graph file for address {address}: {e}")
+            return False
+
+        self._update_networks_of_users(address, graph.users)
+        graph.is_frozen = self.currency_network_proxies[
+            address
+        ].fetch_is_frozen_status()
+        self._graph_feed_sync_ids[address] = sync_id
+        logger.info(
+            f"Graph loaded from graph file for address {address} at graph feed id {sync_id}"
+        )
+        return True
+
+    def _load_graph_from_ethindex(self, address: str) -> bool:
+        """load the graph of the network from the latest trustline events in
+        ethindex if enabled, returns whether it was loaded"""
+        if not self.config["trustline_index"]["bootstrap_from_ethindex"]:
+            return False
+        logger.info(f"Syncing graph from ethindex for address: {address}")
+        graph = self.currency_network_graphs[address]
+        old_users = graph.users
+        try:
+            conn = ethindex_db.connect("")
+            try:
+                with trustlines_state(conn, address) as (sync_id, trustlines):
+                    graph.gen_network(trustlines)
+            finally:
+                conn.close()
+        except psycopg2.Error:
+            logger.exception(
+                f"Could not sync graph from ethindex for address {address}"
+            )
+            return False
+
+        self._update_networks_of_users(address, old_users + graph.users)
+        graph.is_frozen = self.currency_network_proxies[
+            address
+        ].fetch_is_frozen_status()
+        self._graph_feed_sync_ids[address] = sync_id
+        logger.info(
+            f"Graph synced from ethindex for address {address} at graph feed id {sync_id}"
+        )
+        return True
+
+    def _write_graph_files_if_due(self):
+        if not self._graph_file_directory:
+            return
+        now = time.monotonic()
+        interval = self.config["trustline_index"]["graph_file_interval"]
+        if now - self._graph_files_written_at < interval:
+            return
+        self._graph_files_written_at = now
+        self.write_graph_files()
+
+    def write_graph_files(self):
+        """write the graphs of all networks to their graph files
+
+        Has to be called between applying batches of the graph feed, so that
+        the graphs contain all updates up to the latest graph feed sync id."""
+        sync_id = int(get_latest_graph_sync_id())
+        os.makedirs(self._graph_file_directory, exist_ok=True)
+        for address, graph in self.currency_network_graphs.items():
+            if self.is_currency_network_syncing(address):
+                # the graph is not at the graph feed sync id
+                continue
+            path = graph_file_path(self._graph_file_directory, address)
+            try:
+                write_graph_file(path, graph.snapshot, sync_id)
+            except OSError:
+                logger.exception(f"Could not write graph file for address {address}")
+        logger.debug(f"Graph files written at graph feed id {sync_id}")
+
     def new_exchange(self, address: str) -> None:
         assert is_checksum_address(address)
         if address not in self.exchange_addresses:
@@ -499,11 +871,31 @@ class TrustlinesRelay:
 
     def get_networks_of_user(self, user_address: str) -> List[str]:
         assert is_checksum_address(user_address)
-        networks_of_user: List[str] = []
-        for network_address in self.network_addresses:
-            if user_address in self.currency_network_graphs[network_address].users:
-                networks_of_user.append(network_address)
-        return networks_of_user
+        return list(self._networks_of_users.get(user_address, ()))
+
+    def _update_networks_of_users(self, network_address: str, users: Iterable[str]):
+        """update the networks of the given users after the graph of the network
+        changed, must be called with every user that was added or removed"""
+        graph = self.currency_network_graphs[network_address]
+        for user in users:
+            networks_of_user = self._networks_of_users.get(user)
+            if graph.has_user(user):
+                if networks_of_user is None:
+                    networks_of_user = self._networks_of_users[user] = {}
+                networks_of_user[network_address] = None
+            elif networks_of_user is not None:
+                networks_of_user.pop(network_address, None)
+                if not networks_of_user:
+                    del self._networks_of_users[user]
+
+    def _remove_network_of_users(self, network_address: str):
+        """remove the network from the networks of all users, e.g. when it
+        could not be added"""
+        for user in list(self._networks_of_users):
+            networks_of_user = self._networks_of_users[user]
+            networks_of_user.pop(network_address, None)
+            if not networks_of_user:
+                del self._networks_of_users[user]
 
     def add_push_client_token(self, user_address: str, client_token: str) -> None:
         if self._firebase_raw_push_service is not None:
@@ -746,12 +1138,90 @@ class TrustlinesRelay:
     def _apply_feed_update_on_graph(
         self, feed_update: Iterable[FeedUpdate],
     ):
+        # apply the updates of each network as one new version of its graph
+        updates_by_network: Dict[str, List[FeedUpdate]] = defaultdict(list)
         for update in feed_update:
             if update.address not in self.currency_network_graphs.keys():
                 logger.warning(f"Got event_feed with unknown network address {update}")
                 continue
-            graph = self.currency_network_graphs[update.address]
-            graph.update_from_feed(update)
+            updates_by_network[update.address].append(update)
+        for address, updates in updates_by_network.items():
+            self.currency_network_graphs[address].apply_feed_updates(updates)
+            self._update_networks_of_users(
+                address,
+                {
+                    user
+                    for update in updates
+                    if isinstance(
+                        update, (TrustlineUpdateFeedUpdate, BalanceUpdateFeedUpdate)
+                    )
+                    for user in (update.from_, update.to)
+                },
+            )
+
+    def _refresh_pathfinding_snapshots(self):
+        if self.pathfinding_pool is None:
+            return
+        for address, graph in self.currency_network_graphs.items():
+            self.pathfinding_pool.refresh(address, graph)
+
+    def find_path(
+        self,
+        network_address: str,
+        method_name: str,
+        endpoint: Optional[str] = None,
+        **kwargs,
+    ):
+        """run the pathfinding method of the graph of the network with the given
+        keyword arguments, in the pathfinding pool if it is enabled
+
+        The statistics of the search are recorded in the pathfinding metrics
+        of the endpoint, which defaults to the name of the method.
+
+        The search is limited by the search budget configured in the
+        trustline_index section and raises SearchBudgetExceeded when it
+        exceeds it."""
+        # all searches of the method run on the same version of the graph
+        graph = self.currency_network_graphs[network_address].pinned()
+        stats = SearchStatistics()
+        budget = self._new_search_budget()
+        start = time.perf_counter()
+        budget_exceeded = False
+        try:
+            if self.pathfinding_pool is None:
+                return getattr(graph, method_name)(stats=stats, budget=budget, **kwargs)
+            else:
+                return self.pathfinding_pool.run(
+                    network_address,
+                    graph,
+                    method_name,
+                    stats=stats,
+                    budget=budget,
+                    **kwargs,
+                )
+        except SearchBudgetExceeded:
+            budget_exceeded = True
+            raise
+        finally:
+            self.pathfinding_metrics.record(
+                network_address,
+                endpoint or method_name,
+                stats,
+                time.perf_counter() - start,
+                budget_exceeded=budget_exceeded,
+            )
+
+    def _new_search_budget(self) -> SearchBudget:
+        """Returns a new budget for the searches of one request, a limit of 0
+        in the config means no limit"""
+        config = self.config.get("trustline_index", {})
+        return SearchBudget(
+            max_expanded_nodes=config.get("max_search_nodes") or None,
+            max_duration=config.get("max_search_duration") or None,
+            yield_interval=config.get("search_yield_interval") or None,
+            # let other greenlets run during long searches in this process
+            yield_fn=gevent.sleep,
+        )
 
     def _load_gas_price_settings(self, gas_price_settings: Dict):
         method = gas_price_settings["method"]
@@ -776,7 +1246,9 @@ class TrustlinesRelay:
         self.orderbook.connect_db(engine=create_engine())
         self.orderbook.start()
 
-    def _load_addresses(self):
+    def _load_addresses(self) -> List[str]:
+        """load the addresses of the addresses file, returns the addresses of
+        the networks, which have to be bootstrapped"""
         addresses = {}
         with open(self.addresses_json_path) as data_file:
             content = data_file.read()
@@ -787,9 +1259,9 @@ class TrustlinesRelay:
                     logger.error("Could not read addresses.json:" + str(e))
             else:
                 logger.warning(f"{self.addresses_json_path} file is empty")
-        network_addresses = addresses.get("networks", [])
-        for address in network_addresses:
-            self.new_network(to_checksum_address(address))
+        network_addresses: List[str] = [
+            to_checksum_address(address) for address in addresses.get("networks", [])
+        ]
         exchange_address = addresses.get("exchange", None)
         if exchange_address is not None:
             self.new_exchange(to_checksum_address(exchange_address))
@@ -803,7 +1275,7 @@ class TrustlinesRelay:
         else:
             self.new_known_factory(known_factories)
 
-        self._log_listener.start()
+        return network_addresses
 
     def _start_listen_network(self, address):
         assert is_checksum_address(address)
@@ -874,7 +1346,7 @@ class TrustlinesRelay:
 
     def _generate_trustline_events(self, *, user1, user2, network_address, timestamp):
         events = []
-        graph = self.currency_network_graphs[network_address]
+        graph = self.currency_network_graphs[network_address].pinned()
         for (from_, to) in [(user1, user2), (user2, user1)]:
             events.append(
                 BalanceEvent(
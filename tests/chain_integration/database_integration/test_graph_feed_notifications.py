@@ -0,0 +1,67 @@
+import pytest
+from tests.chain_integration.conftest import CurrencyNetworkProxy
+from tests.chain_integration.database_integration.conftest import (
+    POSTGRES_DATABASE,
+    POSTGRES_PASSWORD,
+    POSTGRES_USER,
+)
+
+from relay.ethindex_db.sync_updates import (
+    GraphFeedListener,
+    install_graph_feed_notify_trigger,
+)
+
+
+def dsn(port):
+    return (
+        f"host=127.0.0.1 port={port} dbname={POSTGRES_DATABASE} "
+        f"user={POSTGRES_USER} password={POSTGRES_PASSWORD}"
+    )
+
+
+@pytest.fixture()
+def graph_feed_listener(postgres_port):
+    install_graph_feed_notify_trigger(dsn(postgres_port))
+    listener = GraphFeedListener(dsn(postgres_port), notification_delay=0.1)
+    assert listener.listen()
+    yield listener
+    listener.close()
+
+
+def test_not_notified_without_new_rows(graph_feed_listener):
+    assert graph_feed_listener.wait(0.1) is False
+
+
+def test_notified_on_new_rows(
+    graph_feed_listener,
+    currency_network: CurrencyNetworkProxy,
+    wait_for_ethindex_to_sync,
+    accounts,
+):
+    currency_network.update_trustline_with_accept(accounts[0], accounts[1], 100, 200)
+    wait_for_ethindex_to_sync()
+
+    assert graph_feed_listener.wait(5) is True
+
+
+def test_burst_of_rows_notified_once(
+    graph_feed_listener,
+    currency_network: CurrencyNetworkProxy,
+    wait_for_ethindex_to_sync,
+    accounts,
+):
+    currency_network.update_trustline_with_accept(accounts[0], accounts[1], 100, 200)
+    currency_network.update_trustline_with_accept(accounts[1], accounts[2], 100, 200)
+    currency_network.update_trustline_with_accept(accounts[2], accounts[3], 100, 200)
+    wait_for_ethindex_to_sync()
+
+    assert graph_feed_listener.wait(5) is True
+    assert graph_feed_listener.wait(0.1) is False
+
+
+def test_fall_back_to_polling_without_notifications():
+    listener = GraphFeedListener(dsn(1))
+
+    assert listener.listen() is False
+    assert listener.wait(0.01) is False
+    assert not listener.is_listening
@@ -10,6 +10,7 @@ from relay.blockchain.currency_network_events import (
     TrustlineUpdateEventType,
 )
 from relay.ethindex_db.ethindex_db import CurrencyNetworkEthindexDB
+from relay.ethindex_db.graph_state import trustlines_state
 from relay.ethindex_db.sync_updates import (
     BalanceUpdateFeedUpdate,
     NetworkFreezeFeedUpdate,
@@ -17,6 +18,8 @@ from relay.ethindex_db.sync_updates import (
     TrustlineUpdateFeedUpdate,
     ensure_graph_sync_id_file_exists,
     get_graph_updates_feed,
+    get_graph_updates_feed_batches,
+    get_latest_graph_sync_id,
     write_graph_sync_id_file,
 )
 from relay.network_graph.graph import CurrencyNetworkGraph
@@ -678,6 +681,79 @@ def test_sync_with_reordering_of_events(
     assert trustline_data["creditline_ba"] == credit_limit_1
 
 
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+def test_get_event_feed_in_batches(
+    currency_network_with_trustlines_and_interests_session: CurrencyNetworkProxy,
+    wait_for_ethindex_to_sync,
+    accounts,
+    generic_db_connection,
+    batch_size,
+):
+    currency_network = currency_network_with_trustlines_and_interests_session
+    sync_id = int(get_latest_graph_sync_id())
+    currency_network.transfer_on_path(
+        123, [accounts[0], accounts[1], accounts[2], accounts[3]]
+    )
+    currency_network.update_trustline_with_accept(accounts[0], accounts[1], 100, 200)
+    wait_for_ethindex_to_sync()
+
+    batches = list(get_graph_updates_feed_batches(generic_db_connection, batch_size))
+    write_graph_sync_id_file(sync_id)
+    feed_updates = get_graph_updates_feed(generic_db_connection)
+
+    assert all(len(updates) <= batch_size for updates, _ in batches)
+    assert [update for updates, _ in batches for update in updates] == feed_updates
+    batch_sync_ids = [batch_sync_id for _, batch_sync_id in batches]
+    assert batch_sync_ids == sorted(batch_sync_ids)
+    assert batch_sync_ids[-1] == int(get_latest_graph_sync_id())
+
+
+def test_graph_from_ethindex_equals_graph_from_chain(
+    currency_network_with_trustlines_and_interests_session: CurrencyNetworkProxy,
+    wait_for_ethindex_to_sync,
+    accounts,
+    generic_db_connection,
+):
+    currency_network = currency_network_with_trustlines_and_interests_session
+    currency_network.transfer_on_path(
+        123, [accounts[0], accounts[1], accounts[2], accounts[3]]
+    )
+    currency_network.transfer_on_path(321, [accounts[4], accounts[3], accounts[2]])
+    currency_network.update_trustline_with_accept(
+        accounts[0], accounts[1], 123123123, 321321321, 222, 333
+    )
+    currency_network.update_trustline_with_accept(accounts[5], accounts[4], 100, 200)
+    wait_for_ethindex_to_sync()
+
+    ethindex_graph = Graph(
+        currency_network.capacity_imbalance_fee_divisor,
+        currency_network.default_interest_rate,
+        currency_network.custom_interests,
+        currency_network.prevent_mediator_interests,
+    )
+    chain_graph = Graph(
+        currency_network.capacity_imbalance_fee_divisor,
+        currency_network.default_interest_rate,
+        currency_network.custom_interests,
+        currency_network.prevent_mediator_interests,
+    )
+    with trustlines_state(generic_db_connection, currency_network.address) as (
+        sync_id,
+        trustlines,
+    ):
+        ethindex_graph.gen_network(trustlines)
+    chain_graph.gen_network(currency_network.gen_graph_representation())
+
+    assert len(ethindex_graph.get_trustlines_list()) == len(
+        chain_graph.get_trustlines_list()
+    )
+    assert_equal_graphs(ethindex_graph, chain_graph)
+
+    # the graph contains every update of the feed up to the sync id
+    write_graph_sync_id_file(sync_id)
+    assert get_graph_updates_feed(generic_db_connection) == []
+
+
 def test_sync_network_freeze_on_graph():
     feed_graph = CurrencyNetworkGraph(is_frozen=False)
     network_freeze_update = NetworkFreezeFeedUpdate(address=ZERO_ADDRESS, timestamp=0)
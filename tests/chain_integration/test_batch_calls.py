@@ -0,0 +1,106 @@
+import json
+
+import pytest
+from web3 import HTTPProvider, Web3
+
+from relay.blockchain import batch_calls
+from relay.blockchain.batch_calls import BatchCaller, BatchCallError, ContractCall
+
+
+class JSONRPCResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture()
+def batch_node(web3, monkeypatch):
+    """Answers the JSON-RPC batch requests of a batch caller with the tester chain,
+    the requests can be made to fail with `fail_requests`"""
+
+    class BatchNode:
+        batch_requests = 0
+        fail_requests = 0
+
+        def post(self, url, data, **kwargs):
+            self.batch_requests += 1
+            payload = json.loads(data)
+            if self.fail_requests > 0:
+                self.fail_requests -= 1
+                return JSONRPCResponse(
+                    [
+                        {"jsonrpc": "2.0", "id": request["id"], "error": "failed"}
+                        for request in payload
+                    ]
+                )
+            return JSONRPCResponse(
+                [
+                    {
+                        "jsonrpc": "2.0",
+                        "id": request["id"],
+                        "result": web3.eth.call(*request["params"]).hex(),
+                    }
+                    for request in reversed(payload)
+                ]
+            )
+
+    node = BatchNode()
+    monkeypatch.setattr(batch_calls.requests, "post", node.post)
+    return node
+
+
+@pytest.fixture()
+def batch_caller(batch_node):
+    return BatchCaller(
+        Web3(HTTPProvider("http://localhost:8545")), batch_size=3, retry_interval=0
+    )
+
+
+@pytest.fixture()
+def calls(currency_network_with_trustlines):
+    users = currency_network_with_trustlines.fetch_users()
+    return [ContractCall("getFriends", (user,)) for user in users] + [
+        ContractCall("getAccount", (users[0], users[1]))
+    ]
+
+
+@pytest.fixture()
+def expected_results(currency_network_with_trustlines):
+    users = currency_network_with_trustlines.fetch_users()
+    return [currency_network_with_trustlines.fetch_friends(user) for user in users] + [
+        currency_network_with_trustlines.fetch_account(users[0], users[1])
+    ]
+
+
+def test_batch_calls(
+    currency_network_with_trustlines, batch_caller, batch_node, calls, expected_results
+):
+    results = batch_caller.call(currency_network_with_trustlines._proxy, calls)
+
+    assert results == expected_results
+    assert batch_node.batch_requests == 3
+
+
+def test_batch_calls_retried(
+    currency_network_with_trustlines, batch_caller, batch_node, calls, expected_results
+):
+    batch_node.fail_requests = 2
+
+    results = batch_caller.call(currency_network_with_trustlines._proxy, calls)
+
+    assert results == expected_results
+    assert batch_node.batch_requests == 5
+
+
+def test_batch_calls_failed(
+    currency_network_with_trustlines, batch_caller, batch_node, calls
+):
+    batch_node.fail_requests = 100
+
+    with pytest.raises(BatchCallError):
+        batch_caller.call(currency_network_with_trustlines._proxy, calls)
@@ -1,5 +1,7 @@
 import gevent
 
+from relay.blockchain.batch_calls import BatchCaller
+
 
 def context_switch():
     gevent.sleep(0.01)
@@ -163,3 +165,18 @@ def test_listen_on_trustline_update_with_interests(currency_network, accounts):
     assert events[0].is_frozen is False
 
     greenlet.kill()
+
+
+def test_gen_graph_representation_batched(
+    currency_network_with_trustlines_and_interests, web3
+):
+    currency_network = currency_network_with_trustlines_and_interests
+    currency_network.transfer_on_path(
+        123, [currency_network.fetch_users()[0], currency_network.fetch_users()[1]]
+    )
+
+    batched_representation = currency_network.gen_graph_representation(
+        BatchCaller(web3, batch_size=2)
+    )
+
+    assert batched_representation == currency_network.gen_graph_representation()
@@ -0,0 +1,12 @@
+from relay.api.app import _validation_error_messages
+
+
+def test_validation_error_messages_nested():
+    messages = {
+        "paths": {0: {"to": ["Missing data for required field."]}},
+        "value": ["Not a valid integer.", "Too small."],
+    }
+    assert list(_validation_error_messages(messages)) == [
+        "paths.0.to: Missing data for required field.",
+        "value: Not a valid integer., Too small.",
+    ]
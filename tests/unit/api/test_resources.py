@@ -0,0 +1,43 @@
+import pytest
+
+from relay.api.resources import _dump_account_summaries, _get_extended_account_summary
+from relay.api.schemas import TrustlineSchema
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.network_graph.graph import CurrencyNetworkGraph
+
+NETWORK_ADDRESS = "0x51a240271AB8AB9f9a21C82d9a85396b704E164d"
+A = "0x0A5e8aC1f6c0B87cF09d8D0c0b6bE8a7F5fe1C1b"
+B = "0x1C4f3bE1b4F5e2a8C1e0D3F0C8B0A4b0cE3A4E2F"
+C = "0x2b7D1A1F3a5e6c5F8a7a0F2B8dE3a5C4b0E2F7A3"
+
+
+@pytest.fixture
+def graph():
+    graph = CurrencyNetworkGraph()
+    graph.gen_network(
+        [
+            Trustline(A, B, 100, 150, 1000, 2000, False, 0, -50),
+            Trustline(B, C, 200, 250, 0, 0, True, 0, 30),
+            Trustline(A, C, 10 ** 6, 10 ** 6, 300, 100, False, 0, 700_000),
+        ]
+    )
+    return graph
+
+
+def test_dump_account_summaries_like_trustline_schema(graph):
+    timestamp = 10 ** 8
+    trustlines = list(graph.get_trustlines_list()) + [(B, A), (C, B)]
+
+    expected = TrustlineSchema(many=True).dump(
+        [
+            _get_extended_account_summary(graph, NETWORK_ADDRESS, a, b, timestamp)
+            for a, b in trustlines
+        ]
+    )
+
+    assert (
+        _dump_account_summaries(
+            NETWORK_ADDRESS, graph.get_account_summaries(timestamp, trustlines)
+        )
+        == expected
+    )
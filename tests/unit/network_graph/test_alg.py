@@ -1,4 +1,7 @@
+import math
+
 import networkx as nx
+import pytest
 
 from relay.network_graph import alg
 
@@ -35,3 +38,203 @@ def test_optimize_number_of_costfn_calls():
         cost_accumulator=cost_accumulator,
     )
     assert cost_accumulator.num_calls == len(nodes) - 1
+
+
+class HopsCostAccumulator(FeeCostAccumulatorCounter):
+    def lower_bound(self, cost_from_start_to_node, min_hops_to_target):
+        return cost_from_start_to_node + min_hops_to_target
+
+
+def test_landmarks_bound_hops():
+    g = nx.grid_2d_graph(6, 6)
+    g.add_edge("x", "y")  # second component
+    landmarks = alg.Landmarks(g, number_of_landmarks=3)
+    min_hops = landmarks.min_hops_function({(5, 5)})
+    lengths = nx.single_source_shortest_path_length(g, (5, 5))
+    for node, length in lengths.items():
+        assert min_hops(node) <= length
+    assert min_hops("x") == math.inf
+
+
+def test_goal_directed_search_finds_least_cost_path():
+    g = nx.grid_2d_graph(6, 6)
+    for src, dst, data in g.edges(data=True):
+        data["fee"] = 1 + (src[0] * 7 + dst[1] * 3) % 4
+
+    landmarks = alg.Landmarks(g)
+    for target in [(5, 5), (0, 5), (3, 2)]:
+        dijkstra_counter = HopsCostAccumulator()
+        alt_counter = HopsCostAccumulator()
+        dijkstra_cost, _ = alg.least_cost_path(
+            graph=g,
+            starting_nodes={(0, 0)},
+            target_nodes={target},
+            cost_accumulator=dijkstra_counter,
+        )
+        alt_cost, path = alg.least_cost_path(
+            graph=g,
+            starting_nodes={(0, 0)},
+            target_nodes={target},
+            cost_accumulator=alt_counter,
+            landmarks=landmarks,
+        )
+        assert alt_cost == dijkstra_cost
+        assert path[0] == (0, 0) and path[-1] == target
+        assert alt_counter.num_calls <= dijkstra_counter.num_calls
+
+
+def test_goal_directed_search_unreachable_target():
+    g = nx.Graph()
+    g.add_edge(1, 2, fee=1)
+    g.add_edge(3, 4, fee=1)
+    cost_accumulator = HopsCostAccumulator()
+    with pytest.raises(nx.NetworkXNoPath):
+        alg.least_cost_path(
+            graph=g,
+            starting_nodes={1},
+            target_nodes={4},
+            cost_accumulator=cost_accumulator,
+            landmarks=alg.Landmarks(g),
+        )
+    assert cost_accumulator.num_calls == 0
+
+
+def test_least_cost_paths_same_as_single_searches():
+    g = nx.grid_2d_graph(6, 6)
+    g.add_edge("x", "y")  # second component
+    for src, dst, data in g.edges(data=True):
+        data["fee"] = 1 + (str(src).count("1") + str(dst).count("3")) % 4
+
+    targets = [(5, 5), (0, 5), (3, 2), "x"]
+    result = alg.least_cost_paths(
+        graph=g,
+        starting_nodes={(0, 0)},
+        target_nodes=targets,
+        cost_accumulator=FeeCostAccumulatorCounter(),
+    )
+    assert set(result) == set(targets) - {"x"}
+    for target in targets[:3]:
+        cost, path = result[target]
+        assert (cost, path) == alg.least_cost_path(
+            graph=g,
+            starting_nodes={(0, 0)},
+            target_nodes={target},
+            cost_accumulator=FeeCostAccumulatorCounter(),
+        )
+
+
+def test_least_cost_paths_stops_after_last_target():
+    g = nx.Graph()
+    nodes = list(range(1, 20))
+    for src, dst in zip(nodes, nodes[1:]):
+        g.add_edge(src, dst, fee=1)
+
+    cost_accumulator = FeeCostAccumulatorCounter()
+    result = alg.least_cost_paths(
+        graph=g,
+        starting_nodes={1},
+        target_nodes={3, 5},
+        cost_accumulator=cost_accumulator,
+    )
+    assert result == {3: (2, [1, 2, 3]), 5: (4, [1, 2, 3, 4, 5])}
+    assert cost_accumulator.num_calls == 4
+
+
+class ForbiddingCostAccumulator(FeeCostAccumulatorCounter):
+    def __init__(self, forbidden_nodes):
+        super().__init__()
+        self.forbidden_nodes = forbidden_nodes
+
+    def total_cost_from_start_to_dst(
+        self, cost_from_start_to_node, node, dst, graph_data
+    ):
+        if dst in self.forbidden_nodes:
+            return None
+        return super().total_cost_from_start_to_dst(
+            cost_from_start_to_node, node, dst, graph_data
+        )
+
+
+def test_search_statistics():
+    g = nx.Graph()
+    g.add_edge(1, 2, fee=1)
+    g.add_edge(1, 3, fee=1)
+    g.add_edge(2, 4, fee=1)
+    g.add_edge(2, 5, fee=5)
+
+    stats = alg.SearchStatistics()
+    cost, path = alg.least_cost_path(
+        graph=g,
+        starting_nodes={1},
+        target_nodes={4},
+        cost_accumulator=ForbiddingCostAccumulator({3}),
+        max_cost=3,
+        stats=stats,
+    )
+    assert path == [1, 2, 4]
+    assert stats.searches == 1
+    # 1 and 2 are expanded, 4 is popped as target
+    assert stats.popped_nodes == 3
+    assert stats.relaxed_edges == 4
+    assert stats.pruned_edges == {
+        alg.PruneReason.COST_ACCUMULATOR: 1,
+        alg.PruneReason.MAX_COST: 1,
+    }
+    assert stats.elapsed > 0
+
+
+def path_graph(number_of_nodes):
+    g = nx.Graph()
+    nodes = list(range(number_of_nodes))
+    for src, dst in zip(nodes, nodes[1:]):
+        g.add_edge(src, dst, fee=1)
+    return g
+
+
+def test_search_budget_limits_expanded_nodes():
+    budget = alg.SearchBudget(max_expanded_nodes=5)
+    stats = alg.SearchStatistics()
+    with pytest.raises(alg.SearchBudgetExceeded):
+        alg.least_cost_path(
+            graph=path_graph(20),
+            starting_nodes={0},
+            target_nodes={19},
+            cost_accumulator=FeeCostAccumulatorCounter(),
+            stats=stats,
+            budget=budget,
+        )
+    assert budget.expanded_nodes == 6
+    assert stats.searches == 1
+
+
+def test_search_budget_not_exceeded():
+    cost, path = alg.least_cost_path(
+        graph=path_graph(20),
+        starting_nodes={0},
+        target_nodes={19},
+        cost_accumulator=FeeCostAccumulatorCounter(),
+        budget=alg.SearchBudget(max_expanded_nodes=19),
+    )
+    assert cost == 19
+
+
+def test_search_budget_deadline():
+    now = [0]
+    budget = alg.SearchBudget(max_duration=10, check_interval=1, timer=lambda: now[0])
+    budget.expand()
+    now[0] = 11
+    with pytest.raises(alg.SearchBudgetExceeded):
+        budget.expand()
+
+
+def test_search_budget_yields():
+    yields = []
+    budget = alg.SearchBudget(yield_interval=3, yield_fn=lambda: yields.append(1))
+    alg.least_cost_path(
+        graph=path_graph(20),
+        starting_nodes={0},
+        target_nodes={19},
+        cost_accumulator=FeeCostAccumulatorCounter(),
+        budget=budget,
+    )
+    assert len(yields) == 19 // 3
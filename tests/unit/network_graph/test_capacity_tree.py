@@ -0,0 +1,240 @@
+import random
+import time
+
+import pytest
+
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.ethindex_db.events_informations import EventsInformationFetcher
+from relay.network_graph import alg
+from relay.network_graph.graph import (
+    CapacityPath,
+    CurrencyNetworkGraphForTesting as CurrencyNetworkGraph,
+    SenderPaysCapacityAccumulator,
+)
+
+TIMESTAMP = 5000
+
+
+def random_trustlines(seed):
+    rng = random.Random(seed)
+    users = ["0x{:040x}".format(rng.getrandbits(160)) for _ in range(40)]
+    pairs = set()
+    while len(pairs) < 80:
+        a, b = sorted(rng.sample(users, 2))
+        pairs.add((a, b))
+    trustlines = []
+    for a, b in sorted(pairs):
+        creditline_given = rng.randint(0, 10000)
+        creditline_received = rng.randint(0, 10000)
+        trustlines.append(
+            Trustline(
+                a,
+                b,
+                creditline_given,
+                creditline_received,
+                rng.choice([0, 100]),
+                rng.choice([0, 200]),
+                rng.random() < 0.1,
+                1000,
+                rng.randint(-creditline_received, creditline_given),
+            )
+        )
+    return users, trustlines
+
+
+@pytest.fixture(params=[0, 100], ids=["no fees", "fees"])
+def random_community(request):
+    users, trustlines = random_trustlines(0)
+    community = CurrencyNetworkGraph(capacity_imbalance_fee_divisor=request.param)
+    community.gen_network(trustlines)
+    return community, users
+
+
+@pytest.mark.parametrize("max_hops", [None, 3])
+def test_paths_from_source_same_as_single_searches(random_community, max_hops):
+    community, users = random_community
+    for source in users[:5]:
+        capacity_paths = community.find_maximum_capacity_paths_from_source(
+            source, max_hops=max_hops, timestamp=TIMESTAMP
+        )
+        for target in users:
+            if target == source:
+                continue
+            assert capacity_paths.get(
+                target, CapacityPath(capacity=0, path=[])
+            ) == community.find_maximum_capacity_path(
+                source, target, max_hops=max_hops, timestamp=TIMESTAMP
+            )
+
+
+def test_paths_to_target(random_community):
+    community, users = random_community
+    has_fees = community.capacity_imbalance_fee_divisor != 0
+    for target in users[:5]:
+        capacity_paths = community.find_maximum_capacity_paths_to_target(
+            target, timestamp=TIMESTAMP
+        )
+        for source in users:
+            if source == target:
+                continue
+            capacity_path = community.find_maximum_capacity_path(
+                source, target, timestamp=TIMESTAMP
+            )
+            if has_fees:
+                # exact single searches are used with fees
+                assert (
+                    capacity_paths.get(source, CapacityPath(capacity=0, path=[]))
+                    == capacity_path
+                )
+            elif capacity_path.path == []:
+                assert source not in capacity_paths
+            else:
+                assert capacity_paths[source].path[0] == source
+                assert capacity_paths[source].path[-1] == target
+                assert capacity_paths[source].capacity == capacity_path.capacity
+
+
+def test_paths_for_given_users(random_community):
+    community, users = random_community
+    all_capacity_paths = community.find_maximum_capacity_paths_from_source(
+        users[0], timestamp=TIMESTAMP
+    )
+    selected_users = list(all_capacity_paths)[:3] + ["0x1"]
+
+    capacity_paths = community.find_maximum_capacity_paths_from_source(
+        users[0], timestamp=TIMESTAMP, users=selected_users
+    )
+    assert capacity_paths == {
+        user: all_capacity_paths[user] for user in selected_users[:3]
+    }
+
+    all_capacity_paths = community.find_maximum_capacity_paths_to_target(
+        users[0], timestamp=TIMESTAMP
+    )
+    capacity_paths = community.find_maximum_capacity_paths_to_target(
+        users[0], timestamp=TIMESTAMP, users=selected_users
+    )
+    assert capacity_paths == {
+        user: all_capacity_paths[user]
+        for user in selected_users
+        if user in all_capacity_paths
+    }
+
+
+@pytest.mark.parametrize("max_hops", [None, 3])
+def test_paths_to_target_with_fees_same_as_single_searches(max_hops):
+    users, trustlines = random_trustlines(1)
+    community = CurrencyNetworkGraph(capacity_imbalance_fee_divisor=100)
+    community.gen_network(trustlines)
+    target = users[0]
+    debtors = users[1:10] + ["0x1"]
+
+    capacity_paths = community.find_maximum_capacity_paths_to_target(
+        target, max_hops=max_hops, timestamp=TIMESTAMP, users=debtors
+    )
+
+    expected_capacity_paths = {}
+    for debtor in debtors:
+        capacity_path = community.find_maximum_capacity_path(
+            debtor, target, max_hops=max_hops, timestamp=TIMESTAMP
+        )
+        if capacity_path.path:
+            expected_capacity_paths[debtor] = capacity_path
+    assert len(expected_capacity_paths) > 1
+    assert capacity_paths == expected_capacity_paths
+
+
+def test_unknown_user(random_community):
+    community, _ = random_community
+    assert community.find_maximum_capacity_paths_from_source("0x1") == {}
+    assert community.find_maximum_capacity_paths_to_target("0x1") == {}
+
+
+@pytest.mark.parametrize("max_hops", [None, 3])
+def test_paths_to_targets_same_as_single_searches(random_community, max_hops):
+    community, users = random_community
+    source = users[0]
+    targets = users[1:10] + [source, "0x1"]
+    capacity_paths = community.find_maximum_capacity_paths(
+        source, targets, max_hops=max_hops, timestamp=TIMESTAMP
+    )
+    assert set(capacity_paths) == set(targets)
+    for target in users[1:10]:
+        assert capacity_paths[target] == community.find_maximum_capacity_path(
+            source, target, max_hops=max_hops, timestamp=TIMESTAMP
+        )
+    assert capacity_paths[source] == CapacityPath(capacity=0, path=[])
+    assert capacity_paths["0x1"] == CapacityPath(capacity=0, path=[])
+
+
+def test_tree_search_stops_when_targets_are_settled(random_community):
+    community, users = random_community
+    snapshot = community.snapshot
+    source_id = snapshot.ids[users[0]]
+    accumulator = SenderPaysCapacityAccumulator(
+        timestamp=TIMESTAMP,
+        capacity_imbalance_fee_divisor=community.capacity_imbalance_fee_divisor,
+        trustline_data=snapshot,
+    )
+    full_tree = alg.least_cost_tree(
+        graph=snapshot, starting_nodes={source_id}, cost_accumulator=accumulator
+    )
+    nearest = min(
+        (node for node in full_tree.least_costs if node != source_id),
+        key=full_tree.least_costs.__getitem__,
+    )
+
+    tree = alg.least_cost_tree(
+        graph=snapshot,
+        starting_nodes={source_id},
+        cost_accumulator=accumulator,
+        target_nodes={nearest},
+    )
+
+    assert tree.least_costs[nearest] == full_tree.least_costs[nearest]
+    assert tree.path_to(nearest) == full_tree.path_to(nearest)
+    assert len(tree.least_costs) < len(full_tree.least_costs)
+
+
+@pytest.mark.parametrize("user_index", range(5))
+def test_debt_lists_same_as_single_searches(random_community, monkeypatch, user_index):
+    monkeypatch.setattr(time, "time", lambda: TIMESTAMP)
+    community, users = random_community
+    user = users[user_index]
+    other_users = [other_user for other_user in users if other_user != user]
+    debts = {debtor: 500 for debtor in other_users[:20]}
+    debts.update({creditor: -500 for creditor in other_users[20:]})
+
+    [debts_list] = EventsInformationFetcher(
+        currency_network_db=None
+    ).add_path_information_to_debt_lists(user, {"0x1": community}, {"0x1": debts})
+
+    for debt in debts_list.debts_list:
+        if debt.value > 0:
+            capacity, path = community.find_maximum_capacity_path(
+                debt.debtor, user, timestamp=TIMESTAMP
+            )
+        else:
+            capacity, path = community.find_maximum_capacity_path(
+                user, debt.debtor, timestamp=TIMESTAMP
+            )
+        assert debt.claimable_value == min(capacity, abs(debt.value))
+        if community.capacity_imbalance_fee_divisor != 0:
+            assert getattr(debt, "claim_path", []) == path
+
+
+def test_paths_to_targets_with_budget(random_community):
+    community, users = random_community
+    stats = alg.SearchStatistics()
+    community.find_maximum_capacity_paths(
+        users[0], users[1:10], timestamp=TIMESTAMP, stats=stats
+    )
+    assert stats.popped_nodes > 1
+
+    with pytest.raises(alg.SearchBudgetExceeded):
+        community.find_maximum_capacity_paths(
+            users[0],
+            users[1:10],
+            timestamp=TIMESTAMP,
+            budget=alg.SearchBudget(max_expanded_nodes=1),
+        )
@@ -0,0 +1,140 @@
+import random
+
+import pytest
+from tests.unit.network_graph.conftest import A, B
+
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.network_graph.alg import PathfindingEngine
+from relay.network_graph.graph import (
+    CurrencyNetworkGraphForTesting as CurrencyNetworkGraph,
+)
+
+
+@pytest.fixture(scope="module")
+def random_community():
+    rng = random.Random(0)
+    users = ["0x{:040x}".format(rng.getrandbits(160)) for _ in range(60)]
+    pairs = set()
+    while len(pairs) < 120:
+        a, b = sorted(rng.sample(users, 2))
+        pairs.add((a, b))
+    trustlines = []
+    for a, b in sorted(pairs):
+        creditline_given = rng.randint(0, 1000)
+        creditline_received = rng.randint(0, 1000)
+        trustlines.append(
+            Trustline(
+                a,
+                b,
+                creditline_given,
+                creditline_received,
+                rng.choice([0, 100]),
+                rng.choice([0, 200]),
+                rng.random() < 0.1,
+                1000,
+                rng.randint(-creditline_received, creditline_given),
+            )
+        )
+    community = CurrencyNetworkGraph(capacity_imbalance_fee_divisor=100)
+    community.gen_network(trustlines)
+    rng.shuffle(users)
+    return community, list(zip(users, users[1:] + users[:1]))
+
+
+def test_sender_pays_same_cost(random_community):
+    community, pairs = random_community
+    for source, target in pairs:
+        fees, path = community.find_transfer_path_sender_pays_fees(
+            source, target, 100, timestamp=5000
+        )
+        alt_fees, alt_path = community.find_transfer_path_sender_pays_fees(
+            source, target, 100, timestamp=5000, engine=PathfindingEngine.ALT
+        )
+        assert (alt_fees, len(alt_path)) == (fees, len(path))
+
+
+def test_receiver_pays_same_cost(random_community):
+    community, pairs = random_community
+    for source, target in pairs:
+        fees, path = community.find_transfer_path_receiver_pays_fees(
+            source, target, 100, timestamp=5000
+        )
+        alt_fees, alt_path = community.find_transfer_path_receiver_pays_fees(
+            source, target, 100, timestamp=5000, engine=PathfindingEngine.ALT
+        )
+        assert (alt_fees, len(alt_path)) == (fees, len(path))
+
+
+def test_maximum_capacity_same_capacity(random_community):
+    community, pairs = random_community
+    for source, target in pairs:
+        capacity, path = community.find_maximum_capacity_path(
+            source, target, timestamp=5000
+        )
+        alt_capacity, alt_path = community.find_maximum_capacity_path(
+            source, target, timestamp=5000, engine=PathfindingEngine.ALT
+        )
+        assert (alt_capacity, len(alt_path)) == (capacity, len(path))
+
+
+@pytest.mark.parametrize("max_hops", [2, 3, 4])
+def test_max_hops(random_community, max_hops):
+    """Dijkstra keeps only the cheapest path to every node, even if it has too
+    many hops to continue to the target. The goal-directed search does not
+    keep these paths, so it may find a path where dijkstra does not."""
+    community, pairs = random_community
+    for source, target in pairs:
+        fees, path = community.find_transfer_path_sender_pays_fees(
+            source, target, 100, max_hops=max_hops, timestamp=5000
+        )
+        alt_fees, alt_path = community.find_transfer_path_sender_pays_fees(
+            source,
+            target,
+            100,
+            max_hops=max_hops,
+            timestamp=5000,
+            engine=PathfindingEngine.ALT,
+        )
+        assert len(alt_path) <= max_hops + 1
+        if path:
+            assert alt_path
+            assert alt_fees <= fees
+
+        capacity, path = community.find_maximum_capacity_path(
+            source, target, max_hops=max_hops, timestamp=5000
+        )
+        alt_capacity, alt_path = community.find_maximum_capacity_path(
+            source,
+            target,
+            max_hops=max_hops,
+            timestamp=5000,
+            engine=PathfindingEngine.ALT,
+        )
+        assert len(alt_path) <= max_hops + 1
+        assert alt_capacity >= capacity
+
+
+def test_close_trustline_same_cost(random_community):
+    community, _ = random_community
+    for source, target in community.get_trustlines_list():
+        payment_path = community.close_trustline_path_triangulation(
+            5000, source, target
+        )
+        alt_payment_path = community.close_trustline_path_triangulation(
+            5000, source, target, engine=PathfindingEngine.ALT
+        )
+        assert alt_payment_path.fee == payment_path.fee
+        assert len(alt_payment_path.path) == len(payment_path.path)
+
+
+def test_unknown_users(random_community):
+    community, _ = random_community
+    assert community.find_transfer_path_sender_pays_fees(
+        "0x1", "0x2", 1, engine=PathfindingEngine.ALT
+    ) == (0, [])
+
+
+def test_landmarks_survive_balance_update(community_with_trustlines):
+    landmarks = community_with_trustlines.snapshot.landmarks
+    community_with_trustlines.update_balance(A, B, 10)
+    assert community_with_trustlines.snapshot.landmarks is landmarks
@@ -1,13 +1,16 @@
+import random
 import time
 
 import pytest
 from tests.unit.network_graph.conftest import addresses
 
 from relay.blockchain.currency_network_proxy import Trustline
+from relay.network_graph.alg import SearchBudget
 from relay.network_graph.graph import (
+    AggregatedAccountSummary,
     CurrencyNetworkGraphForTesting as CurrencyNetworkGraph,
 )
-from relay.network_graph.payment_path import FeePayer, PaymentPath
+from relay.network_graph.payment_path import FeePayer, PathRequest, PaymentPath
 
 A, B, C, D, E, F, G, H = addresses
 
@@ -164,6 +167,149 @@ def test_frozen_aggregated_account_summary(community_with_trustlines):
     assert account.balance == 0
 
 
+def aggregated_account_summary_of_accounts(community, user, timestamp):
+    """computes the aggregated account summary from the single accounts"""
+    summary = AggregatedAccountSummary()
+    for counter_party in community.get_friends(user):
+        account = community.get_account_sum(user, counter_party, timestamp=timestamp)
+        if account.is_frozen:
+            summary.frozen_balance += account.balance
+        else:
+            summary.balance += account.balance
+        summary.creditline_given += account.creditline_given
+        summary.creditline_received += account.creditline_received
+    return summary
+
+
+def test_aggregated_account_summaries_updated_incrementally():
+    rng = random.Random(0)
+    users = addresses[:6]
+    community = CurrencyNetworkGraph(custom_interests=True)
+    community.gen_network(
+        [
+            Trustline(A, B, 100, 150, 100, 200, False, 1000, 20),
+            Trustline(A, C, 100, 150, 0, 0, False, 1000, -20),
+        ]
+    )
+    for i in range(300):
+        a, b = rng.sample(users, 2)
+        if rng.random() < 0.5:
+            community.update_balance(
+                a, b, rng.randint(-100, 100) * rng.randint(0, 1), timestamp=1000 + i
+            )
+        elif rng.random() < 0.8:
+            community.update_trustline(
+                a,
+                b,
+                rng.randint(0, 100),
+                rng.randint(0, 100),
+                rng.choice([0, 100]),
+                rng.choice([0, 300]),
+                rng.random() < 0.2,
+            )
+        elif community.graph.has_edge(a, b):
+            community.remove_trustline(a, b)
+
+        for user in users:
+            timestamp = 1000 + i + rng.randint(0, 10 ** 8)
+            assert vars(
+                community.get_aggregated_account_summary(user, timestamp)
+            ) == vars(
+                aggregated_account_summary_of_accounts(community, user, timestamp)
+            )
+
+
+def assert_account_summaries_match(community, account_summaries, trustlines):
+    assert len(account_summaries) == len(trustlines)
+    for i, (user, counter_party) in enumerate(trustlines):
+        account_summary = community.get_account_sum(
+            user, counter_party, timestamp=account_summaries.timestamp
+        )
+        assert account_summaries.user[i] == user
+        assert account_summaries.counter_party[i] == counter_party
+        assert account_summaries.balance[i] == account_summary.balance
+        assert account_summaries.creditline_given[i] == account_summary.creditline_given
+        assert (
+            account_summaries.creditline_received[i]
+            == account_summary.creditline_received
+        )
+        assert (
+            account_summaries.interest_rate_given[i]
+            == account_summary.interest_rate_given
+        )
+        assert (
+            account_summaries.interest_rate_received[i]
+            == account_summary.interest_rate_received
+        )
+        assert account_summaries.is_frozen[i] == account_summary.is_frozen
+
+
+def test_account_summaries_of_all_trustlines(community_with_trustlines):
+    community_with_trustlines.update_balance(A, B, 20)
+    community_with_trustlines.update_balance(D, C, -30)
+    community_with_trustlines.freeze_trustline(A, E)
+
+    account_summaries = community_with_trustlines.get_account_summaries(0)
+
+    assert_account_summaries_match(
+        community_with_trustlines,
+        account_summaries,
+        list(community_with_trustlines.get_trustlines_list()),
+    )
+
+
+def test_account_summaries_of_given_trustlines(community_with_trustlines):
+    community_with_trustlines.update_balance(A, B, 20)
+
+    account_summaries = community_with_trustlines.get_account_summaries(
+        0, [(B, A), (A, C), (B, C), (A, H)]
+    )
+
+    assert_account_summaries_match(
+        community_with_trustlines, account_summaries, [(B, A), (B, C)]
+    )
+
+
+def test_account_summaries_of_given_trustlines_do_not_build_snapshot(
+    community_with_trustlines,
+):
+    community_with_trustlines.update_balance(A, B, 20)
+
+    community_with_trustlines.get_account_summaries(0, [(B, A), (B, C)])
+
+    assert not community_with_trustlines._version_snapshot.is_built
+
+
+def test_account_summaries_of_given_trustlines_with_built_snapshot(
+    community_with_trustlines,
+):
+    community_with_trustlines.update_balance(A, B, 20)
+    community_with_trustlines.snapshot
+
+    account_summaries = community_with_trustlines.get_account_summaries(
+        0, [(B, A), (A, C), (B, C), (A, H)]
+    )
+
+    assert_account_summaries_match(
+        community_with_trustlines, account_summaries, [(B, A), (B, C)]
+    )
+
+
+def test_account_summaries_with_interests(community_with_trustlines):
+    community_with_trustlines.update_trustline(A, B, 10 ** 6, 10 ** 6, 1000, 2000)
+    community_with_trustlines.update_balance(A, B, -500_000, timestamp=0)
+    timestamp = 10 ** 8
+
+    account_summaries = community_with_trustlines.get_account_summaries(
+        timestamp, [(A, B), (B, A)]
+    )
+
+    assert account_summaries.balance[0] < -500_000
+    assert_account_summaries_match(
+        community_with_trustlines, account_summaries, [(A, B), (B, A)]
+    )
+
+
 def test_update_trustline(community_with_trustlines):
     community = community_with_trustlines
     assert community.get_account_sum(B, A).creditline_received == 100
@@ -1008,3 +1154,95 @@ def test_update_balance_to_closed_trustlines_remove_from_graph(
     assert complex_community_with_trustlines_and_fees.graph.has_edge(G, H) is False
     assert complex_community_with_trustlines_and_fees.graph.has_node(G)
     assert complex_community_with_trustlines_and_fees.graph.has_node(H) is False
+
+
+def test_find_payment_paths(complex_community_with_trustlines_and_fees):
+    community = complex_community_with_trustlines_and_fees
+    path_requests = [
+        PathRequest(A, H, 1000),
+        PathRequest(A, H, 1000, fee_payer=FeePayer.RECEIVER),
+        PathRequest(A, H, 1000, max_hops=3),
+        PathRequest(A, "0x1", 1000),
+        PathRequest(B, E, 100, max_fees=5),
+    ]
+
+    payment_paths = community.find_payment_paths(path_requests, timestamp=0)
+
+    assert len(payment_paths) == len(path_requests)
+    fee, path = community.find_transfer_path_sender_pays_fees(A, H, 1000)
+    assert payment_paths[0] == PaymentPath(fee, path, 1000, FeePayer.SENDER)
+    fee, path = community.find_transfer_path_receiver_pays_fees(A, H, 1000)
+    assert payment_paths[1] == PaymentPath(fee, path, 1000, FeePayer.RECEIVER)
+    assert payment_paths[2] == PaymentPath(0, [], 1000, FeePayer.SENDER)
+    assert payment_paths[3] == PaymentPath(0, [], 1000, FeePayer.SENDER)
+    fee, path = community.find_transfer_path_sender_pays_fees(B, E, 100, max_fees=5)
+    assert payment_paths[4] == PaymentPath(fee, path, 100, FeePayer.SENDER)
+
+
+def test_find_payment_paths_failure_gives_empty_path(community_with_trustlines):
+    community_with_trustlines.update_balance(A, B, 10, timestamp=1000)
+
+    payment_paths = community_with_trustlines.find_payment_paths(
+        [PathRequest(A, B, 10), PathRequest(C, D, 10)], timestamp=0
+    )
+
+    # the timestamp of the query is before the last update of A and B
+    assert payment_paths[0] == PaymentPath(0, [], 10, FeePayer.SENDER)
+    assert payment_paths[1] == PaymentPath(0, [C, D], 10, FeePayer.SENDER)
+
+
+def test_find_payment_paths_budget_per_item(complex_community_with_trustlines_and_fees):
+    community = complex_community_with_trustlines_and_fees
+    fee, path = community.find_transfer_path_sender_pays_fees(A, H, 1000)
+    budget = SearchBudget(max_expanded_nodes=len(community.users))
+
+    payment_paths = community.find_payment_paths(
+        [PathRequest(A, H, 1000)] * 3, timestamp=0, budget=budget
+    )
+
+    assert payment_paths == [PaymentPath(fee, path, 1000, FeePayer.SENDER)] * 3
+
+
+def test_network_statistics_updated_incrementally():
+    rng = random.Random(1)
+    users = addresses[:6]
+    community = CurrencyNetworkGraph()
+    community.gen_network([Trustline(A, B, 100, 150, balance=20)])
+    for i in range(300):
+        a, b = rng.sample(users, 2)
+        if rng.random() < 0.5:
+            community.update_balance(a, b, rng.randint(-100, 100) * rng.randint(0, 1))
+        elif rng.random() < 0.8:
+            community.update_trustline(a, b, rng.randint(0, 100), rng.randint(0, 100))
+        elif community.graph.has_edge(a, b):
+            community.remove_trustline(a, b)
+
+        edges = list(community.graph.edges(data=True))
+        assert community.number_of_trustlines == len(edges)
+        assert community.number_of_users == len(community.users)
+        assert community.money_created == sum(
+            abs(data["balance_ab"]) for _, _, data in edges
+        )
+        assert community.total_creditlines == sum(
+            data["creditline_ab"] + data["creditline_ba"] for _, _, data in edges
+        )
+
+
+def test_drawing_graph_does_not_change_trustlines(community_with_trustlines):
+    drawing_graph = community_with_trustlines._drawing_graph()
+
+    assert (
+        drawing_graph.number_of_edges()
+        == community_with_trustlines.graph.number_of_edges()
+    )
+    assert all(data["color"] == "blue" for _, _, data in drawing_graph.edges(data=True))
+    assert community_with_trustlines.get_account_sum(A, B).creditline_given == 100
+
+
+def test_draw(community_with_trustlines, tmp_path):
+    pytest.importorskip("pygraphviz")
+    filename = tmp_path / "graph.png"
+
+    community_with_trustlines.draw(str(filename))
+
+    assert filename.stat().st_size > 0
@@ -8,31 +8,27 @@ import networkx as nx
 import pytest
 
 from relay.network_graph import alg, graph
-from relay.network_graph.trustline_data import set_balance, set_creditline
+from relay.network_graph.trustline_data import (
+    TrustlineData,
+    set_balance,
+    set_creditline,
+)
 
 
 def zero_edge_data():
-    return dict(
-        creditline_ab=0,
-        creditline_ba=0,
-        interest_ab=0,
-        interest_ba=0,
-        m_time=0,
-        balance_ab=0,
-        is_frozen=False,
-    )
+    return TrustlineData()
 
 
 @pytest.fixture
 def simplegraph():
-    graph = nx.graph.Graph()
+    simplegraph = graph.TrustlineGraph()
 
     for i in range(1, 10):
         edge_data = zero_edge_data()
         set_creditline(edge_data, i, i + 1, 1000)  # creditline given from i to i+1
         set_creditline(edge_data, i + 1, i, 1000)  # creditline given from i+1 to i
-        graph.add_edge(i, i + 1, **edge_data)
-    return graph
+        simplegraph.add_edge(i, i + 1, **edge_data)
+    return simplegraph
 
 
 @pytest.fixture(
@@ -92,7 +88,7 @@ def test_max_fees(cost_accumulator_class, simplegraph):
 
 @pytest.fixture
 def capgraph():
-    capgraph = nx.graph.Graph()
+    capgraph = graph.TrustlineGraph()
     edge_data = zero_edge_data()
     set_balance(edge_data, 1, 2, 500)
     set_creditline(edge_data, 2, 1, 1000)  # creditline given from 2 to 1 is 1000
@@ -144,7 +140,7 @@ def build_graph(*, addresses: List, creditlines: List, balances: List):
     at each step.
     """
     assert len(creditlines) == len(addresses) - 1
-    gr = nx.graph.Graph()
+    gr = graph.TrustlineGraph()
     for a, b, creditline, balance in zip(
         addresses, addresses[1:], creditlines, balances
     ):
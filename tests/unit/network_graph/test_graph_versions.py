@@ -0,0 +1,149 @@
+import pytest
+from tests.unit.network_graph.conftest import addresses
+
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.ethindex_db.sync_updates import (
+    BalanceUpdateFeedUpdate,
+    NetworkFreezeFeedUpdate,
+    TrustlineUpdateFeedUpdate,
+)
+from relay.network_graph.graph import (
+    CurrencyNetworkGraphForTesting as CurrencyNetworkGraph,
+)
+
+A, B, C, D, E, F, G, H = addresses
+
+
+def account_sums(graph):
+    return {
+        (a, b): vars(graph.get_account_sum(a, b))
+        for a in graph.users
+        for b in graph.get_friends(a)
+    }
+
+
+def trustline_update(creditor, debtor, given, received):
+    return TrustlineUpdateFeedUpdate(
+        address="0x1",
+        timestamp=0,
+        args={
+            "_creditor": creditor,
+            "_debtor": debtor,
+            "_creditlineGiven": given,
+            "_creditlineReceived": received,
+            "_isFrozen": False,
+        },
+    )
+
+
+def balance_update(a, b, value):
+    return BalanceUpdateFeedUpdate(
+        address="0x1", timestamp=0, args={"_from": a, "_to": b, "_value": value}
+    )
+
+
+@pytest.fixture
+def community():
+    community = CurrencyNetworkGraph()
+    community.gen_network(
+        [
+            Trustline(A, B, 100, 150),
+            Trustline(B, C, 200, 250, balance=10),
+            Trustline(C, D, 300, 350),
+        ]
+    )
+    return community
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        lambda community: community.update_balance(A, B, 50),
+        lambda community: community.update_trustline(B, C, 1, 2),
+        lambda community: community.update_trustline(D, E, 1, 2),
+        lambda community: community.update_trustline(C, D, 0, 0),
+        lambda community: community.mediated_transfer(A, C, 10),
+        lambda community: community.freeze_trustline(A, B),
+        lambda community: community.gen_network([Trustline(A, B, 1, 1)]),
+    ],
+)
+def test_pinned_graph_not_changed_by_update(community, update):
+    pinned = community.pinned()
+    users = pinned.users
+    sums = account_sums(pinned)
+    snapshot = pinned.snapshot
+
+    update(community)
+
+    assert account_sums(community) != sums
+    assert pinned.users == users
+    assert account_sums(pinned) == sums
+    assert pinned.snapshot is snapshot
+
+
+def test_feed_updates_published_as_one_version(community):
+    version = community.version
+    community.apply_feed_updates(
+        [
+            trustline_update(D, E, 1, 2),
+            balance_update(D, E, 1),
+            balance_update(A, B, 5),
+            NetworkFreezeFeedUpdate(address="0x1", timestamp=0),
+        ]
+    )
+    assert community.version == version + 1
+    assert community.get_account_sum(D, E).balance == 1
+    assert community.get_account_sum(A, B).balance == 5
+    assert community.is_frozen
+
+
+def test_failed_feed_updates_not_published(community):
+    community.custom_interests = True
+    version = community.version
+    sums = account_sums(community)
+    with pytest.raises(RuntimeError):
+        community.apply_feed_updates(
+            [
+                balance_update(A, B, 5),
+                TrustlineUpdateFeedUpdate(
+                    address="0x1",
+                    timestamp=0,
+                    args={
+                        "_creditor": A,
+                        "_debtor": B,
+                        "_creditlineGiven": 1,
+                        "_creditlineReceived": 1,
+                        "_interestRateGiven": None,
+                        "_isFrozen": False,
+                    },
+                ),
+            ]
+        )
+    assert community.version == version
+    assert account_sums(community) == sums
+
+
+def test_snapshot_updated_with_published_version(community):
+    community.snapshot
+    community.apply_feed_updates([balance_update(A, B, -100), balance_update(B, C, 7)])
+    assert community.find_maximum_capacity_path(A, C).capacity == 50
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        lambda community: community.update_balance(A, B, 50),
+        lambda community: community.update_trustline(D, E, 1, 2),
+    ],
+)
+def test_pins_of_a_version_share_one_snapshot(community, update):
+    community.snapshot
+    update(community)
+
+    first_pin = community.pinned()
+    second_pin = community.pinned()
+
+    snapshot = first_pin.snapshot
+    assert second_pin.snapshot is snapshot
+    assert community.snapshot is snapshot
+    assert community.pinned().snapshot is snapshot
@@ -5,18 +5,11 @@ from tests.unit.network_graph.conftest import addresses
 
 from relay.blockchain.currency_network_proxy import Trustline
 from relay.network_graph.graph import Account, NetworkGraphConfig
-from relay.network_graph.graph_constants import (
-    balance_ab,
-    creditline_ab,
-    creditline_ba,
-    interest_ab,
-    interest_ba,
-    m_time,
-)
 from relay.network_graph.interests import (
     DELTA_TIME_MINIMAL_ALLOWED_VALUE,
     calculate_interests,
 )
+from relay.network_graph.trustline_data import TrustlineData
 
 A, B, C, D, E, F, G, H = addresses
 
@@ -31,16 +24,7 @@ def small_non_positive_delta_time(request):
 
 @pytest.fixture
 def basic_data():
-    data = {
-        creditline_ab: 0,
-        creditline_ba: 0,
-        interest_ab: 0,
-        interest_ba: 0,
-        m_time: 0,
-        balance_ab: 0,
-    }
-
-    return data
+    return TrustlineData()
 
 
 @pytest.fixture()
@@ -0,0 +1,261 @@
+import random
+
+import networkx as nx
+import pytest
+
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.network_graph import alg, kernels
+from relay.network_graph.graph import (
+    CurrencyNetworkGraph,
+    ReceiverPaysCostAccumulatorSnapshot,
+    SenderPaysCapacityAccumulator,
+    SenderPaysCostAccumulatorSnapshot,
+)
+
+TIMESTAMP = 1_000_000
+
+
+def random_snapshot(seed, has_interests):
+    rng = random.Random(seed)
+    users = ["0x{:040x}".format(rng.getrandbits(160)) for _ in range(30)]
+    pairs = set()
+    while len(pairs) < 70:
+        a, b = sorted(rng.sample(users, 2))
+        pairs.add((a, b))
+    trustlines = []
+    for a, b in sorted(pairs):
+        creditline_given = rng.randint(0, 10000)
+        creditline_received = rng.randint(0, 10000)
+        interest_rates = [0, 1000] if has_interests else [0]
+        trustlines.append(
+            Trustline(
+                a,
+                b,
+                creditline_given,
+                creditline_received,
+                rng.choice(interest_rates),
+                rng.choice(interest_rates),
+                rng.random() < 0.1,
+                rng.randint(0, TIMESTAMP),
+                rng.randint(-creditline_received, creditline_given),
+            )
+        )
+    graph = CurrencyNetworkGraph()
+    graph.gen_network(trustlines)
+    return graph.snapshot
+
+
+def generic_search(snapshot, cost_accumulator, source, target):
+    try:
+        return alg.least_cost_path(
+            graph=snapshot,
+            starting_nodes={source},
+            target_nodes={target},
+            cost_accumulator=cost_accumulator,
+        )
+    except nx.NetworkXNoPath:
+        return None
+
+
+def kernel_search(kernel, snapshot, source, target, **kwargs):
+    try:
+        return kernel(snapshot, source=source, target_nodes={target}, **kwargs)
+    except nx.NetworkXNoPath:
+        return None
+
+
+def node_pairs(snapshot):
+    rng = random.Random(1)
+    return [
+        (
+            rng.randrange(snapshot.number_of_nodes),
+            rng.randrange(snapshot.number_of_nodes),
+        )
+        for _ in range(60)
+    ]
+
+
+@pytest.fixture(params=[False, True], ids=["no interests", "interests"])
+def snapshot(request):
+    return random_snapshot(0, request.param)
+
+
+@pytest.mark.parametrize(
+    "kernel, cost_accumulator_class",
+    [
+        (kernels.sender_pays_least_cost_path, SenderPaysCostAccumulatorSnapshot),
+        (kernels.receiver_pays_least_cost_path, ReceiverPaysCostAccumulatorSnapshot),
+    ],
+)
+@pytest.mark.parametrize("capacity_imbalance_fee_divisor", [0, 100])
+@pytest.mark.parametrize("value", [1, 1000, 5000])
+@pytest.mark.parametrize("max_hops, max_fees", [(None, None), (3, None), (None, 5)])
+def test_transfer_path_kernels_same_as_cost_accumulators(
+    snapshot,
+    kernel,
+    cost_accumulator_class,
+    capacity_imbalance_fee_divisor,
+    value,
+    max_hops,
+    max_fees,
+):
+    cost_accumulator = cost_accumulator_class(
+        timestamp=TIMESTAMP,
+        value=value,
+        capacity_imbalance_fee_divisor=capacity_imbalance_fee_divisor,
+        max_hops=max_hops,
+        max_fees=max_fees,
+        trustline_data=snapshot,
+    )
+    for source, target in node_pairs(snapshot):
+        assert kernel_search(
+            kernel,
+            snapshot,
+            source,
+            target,
+            timestamp=TIMESTAMP,
+            value=value,
+            capacity_imbalance_fee_divisor=capacity_imbalance_fee_divisor,
+            max_hops=max_hops,
+            max_fees=max_fees,
+        ) == generic_search(snapshot, cost_accumulator, source, target)
+
+
+@pytest.mark.parametrize("capacity_imbalance_fee_divisor", [0, 100])
+@pytest.mark.parametrize("max_hops", [None, 2])
+def test_maximum_capacity_kernel_same_as_cost_accumulator(
+    snapshot, capacity_imbalance_fee_divisor, max_hops
+):
+    cost_accumulator = SenderPaysCapacityAccumulator(
+        timestamp=TIMESTAMP,
+        capacity_imbalance_fee_divisor=capacity_imbalance_fee_divisor,
+        max_hops=max_hops,
+        trustline_data=snapshot,
+    )
+    for source, target in node_pairs(snapshot):
+        assert kernel_search(
+            kernels.maximum_capacity_path,
+            snapshot,
+            source,
+            target,
+            timestamp=TIMESTAMP,
+            capacity_imbalance_fee_divisor=capacity_imbalance_fee_divisor,
+            max_hops=max_hops,
+        ) == generic_search(snapshot, cost_accumulator, source, target)
+
+
+def test_kernel_rejects_modification_time_in_future(snapshot):
+    with pytest.raises(ValueError):
+        kernels.maximum_capacity_path(
+            snapshot,
+            source=0,
+            target_nodes={-1},
+            timestamp=0,
+            capacity_imbalance_fee_divisor=0,
+        )
+
+
+def test_kernel_statistics_same_as_cost_accumulator(snapshot):
+    cost_accumulator = SenderPaysCostAccumulatorSnapshot(
+        timestamp=TIMESTAMP,
+        value=1000,
+        capacity_imbalance_fee_divisor=100,
+        max_hops=3,
+        max_fees=5,
+        trustline_data=snapshot,
+    )
+    for source, target in node_pairs(snapshot)[:10]:
+        kernel_stats = alg.SearchStatistics()
+        generic_stats = alg.SearchStatistics()
+        try:
+            kernels.sender_pays_least_cost_path(
+                snapshot,
+                source=source,
+                target_nodes={target},
+                timestamp=TIMESTAMP,
+                value=1000,
+                capacity_imbalance_fee_divisor=100,
+                max_hops=3,
+                max_fees=5,
+                stats=kernel_stats,
+            )
+        except nx.NetworkXNoPath:
+            pass
+        try:
+            alg.least_cost_path(
+                graph=snapshot,
+                starting_nodes={source},
+                target_nodes={target},
+                cost_accumulator=cost_accumulator,
+                stats=generic_stats,
+            )
+        except nx.NetworkXNoPath:
+            pass
+        assert kernel_stats.searches == generic_stats.searches == 1
+        assert kernel_stats.popped_nodes == generic_stats.popped_nodes
+        assert kernel_stats.relaxed_edges == generic_stats.relaxed_edges
+        assert sum(kernel_stats.pruned_edges.values()) == sum(
+            generic_stats.pruned_edges.values()
+        )
+
+
+def test_kernel_search_budget_exceeded(snapshot):
+    budget = alg.SearchBudget(max_expanded_nodes=0)
+    with pytest.raises(alg.SearchBudgetExceeded):
+        kernels.maximum_capacity_path(
+            snapshot,
+            source=0,
+            target_nodes={1},
+            timestamp=TIMESTAMP,
+            capacity_imbalance_fee_divisor=0,
+            budget=budget,
+        )
+
+
+def sparse_snapshot(seed):
+    rng = random.Random(seed)
+    users = ["0x{:040x}".format(rng.getrandbits(160)) for _ in range(30)]
+    pairs = set()
+    while len(pairs) < 25:
+        a, b = sorted(rng.sample(users, 2))
+        pairs.add((a, b))
+    graph = CurrencyNetworkGraph()
+    graph.gen_network(
+        [
+            Trustline(
+                a,
+                b,
+                rng.choice([0, 100]),
+                rng.choice([0, 100]),
+                is_frozen=rng.random() < 0.2,
+                m_time=0,
+                balance=rng.choice([-100, 0, 100]),
+            )
+            for a, b in sorted(pairs)
+        ]
+    )
+    return graph.snapshot
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_no_path_found_if_ruled_out_by_reachability(seed):
+    snapshot = sparse_snapshot(seed)
+    reachability = snapshot.reachability
+    ruled_out = 0
+    for source in snapshot.nodes:
+        for target in snapshot.nodes:
+            if reachability.may_have_path(source, target):
+                continue
+            ruled_out += 1
+            assert (
+                kernel_search(
+                    kernels.maximum_capacity_path,
+                    snapshot,
+                    source,
+                    target,
+                    timestamp=TIMESTAMP,
+                    capacity_imbalance_fee_divisor=0,
+                )
+                is None
+            )
+    assert ruled_out > 0
@@ -0,0 +1,65 @@
+from relay.network_graph.alg import PruneReason, SearchStatistics
+from relay.network_graph.metrics import Histogram, PathfindingMetrics
+
+
+def test_histogram_counts_cumulative():
+    histogram = Histogram([10, 1, 100])
+    for value in [0, 1, 5, 50, 500]:
+        histogram.observe(value)
+    assert histogram.to_dict() == {
+        "buckets": [
+            {"le": 1, "count": 2},
+            {"le": 10, "count": 3},
+            {"le": 100, "count": 4},
+        ],
+        "count": 5,
+        "sum": 556,
+    }
+
+
+def search_statistics(popped_nodes, pruned_edges):
+    stats = SearchStatistics()
+    stats.record(
+        popped_nodes=popped_nodes,
+        relaxed_edges=popped_nodes * 2,
+        pruned_edges=pruned_edges,
+        elapsed=0.001,
+    )
+    return stats
+
+
+def test_pathfinding_metrics_per_network_and_endpoint():
+    metrics = PathfindingMetrics()
+    metrics.record(
+        "network1", "path-info", search_statistics(5, {PruneReason.FROZEN: 1}), 0.002
+    )
+    metrics.record(
+        "network1",
+        "path-info",
+        search_statistics(50, {PruneReason.FROZEN: 2, PruneReason.HOPS: 3}),
+        0.02,
+    )
+    metrics.record("network1", "max-capacity-path-info", search_statistics(1, {}), 1)
+    metrics.record("network2", "path-info", search_statistics(1, {}), 1)
+
+    network_metrics = metrics.network_metrics("network1")
+    assert set(network_metrics) == {"path-info", "max-capacity-path-info"}
+    path_info_metrics = network_metrics["path-info"]
+    assert path_info_metrics["requests"] == 2
+    assert path_info_metrics["prunedEdges"] == {"frozen": 3, "hops": 3}
+    assert path_info_metrics["poppedNodes"]["sum"] == 55
+    assert path_info_metrics["relaxedEdges"]["sum"] == 110
+    assert path_info_metrics["duration"]["count"] == 2
+    assert metrics.network_metrics("unknown") == {}
+
+
+def test_pathfinding_metrics_count_exceeded_budgets():
+    metrics = PathfindingMetrics()
+    metrics.record("network1", "path-info", search_statistics(5, {}), 0.002)
+    metrics.record(
+        "network1", "path-info", search_statistics(50, {}), 2, budget_exceeded=True
+    )
+
+    path_info_metrics = metrics.network_metrics("network1")["path-info"]
+    assert path_info_metrics["requests"] == 2
+    assert path_info_metrics["budgetExceeded"] == 1
@@ -0,0 +1,87 @@
+import pytest
+from tests.unit.network_graph.conftest import A, B, C
+
+from relay.network_graph.path_cache import PathCache
+
+
+class Timer:
+    def __init__(self):
+        self.time = 0
+
+    def __call__(self):
+        return self.time
+
+
+@pytest.fixture
+def timer():
+    return Timer()
+
+
+@pytest.fixture
+def path_cache(community_with_trustlines, timer):
+    return PathCache(community_with_trustlines, maxsize=2, max_age=10, timer=timer)
+
+
+def find_path(community, source=A, target=C):
+    return community.find_transfer_path_sender_pays_fees(source, target, 10)
+
+
+def test_cached_result(path_cache, community_with_trustlines):
+    key = ("path", A, C)
+    result = path_cache.get_or_compute(
+        key, lambda: find_path(community_with_trustlines)
+    )
+    assert path_cache.get_or_compute(key, lambda: None) is result
+    assert (path_cache.hits, path_cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize(
+    "update",
+    [
+        lambda community: community.update_balance(A, B, 10),
+        lambda community: community.update_trustline(A, B, 10, 10),
+        lambda community: community.gen_network([]),
+    ],
+)
+def test_graph_update_invalidates(path_cache, community_with_trustlines, update):
+    version = community_with_trustlines.version
+    path_cache.get_or_compute("key", lambda: 1)
+    update(community_with_trustlines)
+    assert community_with_trustlines.version > version
+    assert path_cache.get_or_compute("key", lambda: 2) == 2
+    assert (path_cache.hits, path_cache.misses) == (0, 2)
+
+
+def test_max_age(path_cache, timer):
+    path_cache.get_or_compute("key", lambda: 1)
+    timer.time = 9
+    assert path_cache.get_or_compute("key", lambda: 2) == 1
+    timer.time = 11
+    assert path_cache.get_or_compute("key", lambda: 3) == 3
+
+
+def test_least_recently_used_evicted(path_cache):
+    path_cache.get_or_compute("a", lambda: 1)
+    path_cache.get_or_compute("b", lambda: 2)
+    path_cache.get_or_compute("a", lambda: None)
+    path_cache.get_or_compute("c", lambda: 3)
+    assert len(path_cache) == 2
+    assert path_cache.get_or_compute("a", lambda: None) == 1
+    assert path_cache.get_or_compute("b", lambda: 4) == 4
+
+
+def test_update_while_computing_not_cached(path_cache, community_with_trustlines):
+    def compute():
+        community_with_trustlines.update_balance(A, B, 10)
+        return 1
+
+    path_cache.get_or_compute("key", compute)
+    assert len(path_cache) == 0
+
+
+@pytest.mark.parametrize("maxsize, max_age", [(0, 10), (10, 0)])
+def test_disabled(community_with_trustlines, maxsize, max_age):
+    path_cache = PathCache(community_with_trustlines, maxsize=maxsize, max_age=max_age)
+    assert path_cache.get_or_compute("key", lambda: 1) == 1
+    assert path_cache.get_or_compute("key", lambda: 2) == 2
+    assert len(path_cache) == 0
@@ -0,0 +1,96 @@
+import pytest
+from tests.unit.network_graph.conftest import addresses
+
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.network_graph.alg import SearchBudget, SearchBudgetExceeded, SearchStatistics
+from relay.network_graph.graph import (
+    CurrencyNetworkGraphForTesting as CurrencyNetworkGraph,
+)
+from relay.network_graph.pathfinding_pool import PathfindingPool
+
+A, B, C, D, E, F, G, H = addresses
+
+NETWORK = "0x" + "1" * 40
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = PathfindingPool(processes=1, timeout=60)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def community():
+    community = CurrencyNetworkGraph(capacity_imbalance_fee_divisor=100)
+    community.gen_network(
+        [
+            Trustline(A, B, 1000, 1000),
+            Trustline(B, C, 1000, 1000, balance=100),
+            Trustline(C, D, 1000, 1000),
+            Trustline(A, D, 1000, 1000, balance=-50),
+        ]
+    )
+    return community
+
+
+@pytest.mark.parametrize(
+    "method_name, kwargs",
+    [
+        ("find_transfer_path_sender_pays_fees", dict(source=A, target=C, value=100)),
+        ("find_transfer_path_receiver_pays_fees", dict(source=A, target=C, value=100)),
+        ("find_maximum_capacity_path", dict(source=A, target=C)),
+        ("find_maximum_capacity_paths", dict(source=A, targets=[C, D])),
+        ("close_trustline_path_triangulation", dict(source=A, target=D)),
+    ],
+)
+def test_same_result_as_graph(pool, community, method_name, kwargs):
+    result = pool.run(NETWORK, community, method_name, timestamp=1000, **kwargs)
+    assert result == getattr(community, method_name)(timestamp=1000, **kwargs)
+
+
+def test_refreshed_snapshot(pool, community):
+    old_capacity_path = pool.run(
+        NETWORK, community, "find_maximum_capacity_path", source=A, target=C
+    )
+    community.update_balance(A, B, -900)
+    capacity_path = pool.run(
+        NETWORK, community, "find_maximum_capacity_path", source=A, target=C
+    )
+    assert capacity_path != old_capacity_path
+    assert capacity_path == community.find_maximum_capacity_path(source=A, target=C)
+
+
+def test_unknown_method(pool, community):
+    with pytest.raises(ValueError):
+        pool.run(NETWORK, community, "gen_network", trustlines=[])
+
+
+def test_search_statistics_from_worker(pool, community):
+    stats = SearchStatistics()
+    pool.run(
+        NETWORK,
+        community,
+        "find_maximum_capacity_path",
+        source=A,
+        target=C,
+        stats=stats,
+    )
+    expected_stats = SearchStatistics()
+    community.find_maximum_capacity_path(source=A, target=C, stats=expected_stats)
+    assert stats.searches == 1
+    assert stats.popped_nodes == expected_stats.popped_nodes > 0
+    assert stats.relaxed_edges == expected_stats.relaxed_edges
+
+
+def test_search_budget_exceeded_in_worker(pool, community):
+    budget = SearchBudget(max_expanded_nodes=1, yield_interval=1, yield_fn=print)
+    with pytest.raises(SearchBudgetExceeded):
+        pool.run(
+            NETWORK,
+            community,
+            "find_maximum_capacity_path",
+            source=A,
+            target=C,
+            budget=budget,
+        )
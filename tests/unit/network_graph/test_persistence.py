@@ -0,0 +1,96 @@
+import pytest
+from tests.unit.network_graph.conftest import addresses
+
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.network_graph.graph import (
+    CurrencyNetworkGraphForTesting as CurrencyNetworkGraph,
+)
+from relay.network_graph.persistence import (
+    InvalidGraphFile,
+    graph_file_path,
+    open_graph_file,
+    write_graph_file,
+)
+
+A, B, C, D, E, F, G, H = addresses
+
+
+@pytest.fixture
+def community():
+    community = CurrencyNetworkGraph()
+    community.gen_network(
+        [
+            Trustline(A, B, 100, 150, 1, 2, False, 10, 20),
+            Trustline(A, E, 500, 550, 3, 4, True, 30, -40),
+            Trustline(B, C, 200, 250),
+            Trustline(C, D, 300, 350, balance=50),
+        ]
+    )
+    return community
+
+
+@pytest.fixture
+def path(tmp_path):
+    return graph_file_path(str(tmp_path), "0x" + "1" * 40)
+
+
+def edges(graph):
+    return sorted(
+        (a, b, sorted(data.items())) for a, b, data in graph.graph.edges(data=True)
+    )
+
+
+def test_graph_file_round_trip(path, community):
+    write_graph_file(path, community.snapshot, 42)
+
+    loaded = CurrencyNetworkGraph()
+    with open_graph_file(path) as (snapshot, sync_id):
+        loaded.gen_network_from_snapshot(snapshot)
+
+    assert sync_id == 42
+    assert edges(loaded) == edges(community)
+    assert loaded.dump() == community.dump()
+
+
+def test_graph_file_overwritten(path, community):
+    write_graph_file(path, community.snapshot, 1)
+    community.update_balance(A, B, 1000)
+    write_graph_file(path, community.snapshot, 2)
+
+    loaded = CurrencyNetworkGraph()
+    with open_graph_file(path) as (snapshot, sync_id):
+        loaded.gen_network_from_snapshot(snapshot)
+
+    assert sync_id == 2
+    assert loaded.get_account_sum(A, B).balance == 1000
+
+
+def test_missing_graph_file(path):
+    with pytest.raises(FileNotFoundError):
+        with open_graph_file(path):
+            pass
+
+
+@pytest.mark.parametrize("offset", [0, 10, 100, -1])
+def test_corrupted_graph_file(path, community, offset):
+    write_graph_file(path, community.snapshot, 1)
+    with open(path, "r+b") as f:
+        data = bytearray(f.read())
+        data[offset] ^= 0xFF
+        f.seek(0)
+        f.write(data)
+
+    with pytest.raises(InvalidGraphFile):
+        with open_graph_file(path):
+            pass
+
+
+@pytest.mark.parametrize("size", [0, 10, 100])
+def test_truncated_graph_file(path, community, size):
+    write_graph_file(path, community.snapshot, 1)
+    with open(path, "r+b") as f:
+        f.truncate(size)
+
+    with pytest.raises(InvalidGraphFile):
+        with open_graph_file(path):
+            pass
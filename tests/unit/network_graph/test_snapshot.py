@@ -0,0 +1,288 @@
+import pytest
+from tests.unit.network_graph.conftest import addresses
+
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.network_graph import alg, trustline_data
+from relay.network_graph.graph import (
+    CurrencyNetworkGraphForTesting as CurrencyNetworkGraph,
+)
+from relay.network_graph.snapshot import GraphSnapshot
+
+A, B, C, D, E, F, G, H = addresses
+
+
+@pytest.fixture
+def community():
+    community = CurrencyNetworkGraph()
+    community.gen_network(
+        [
+            Trustline(A, B, 100, 150, 1, 2, False, 10, 20),
+            Trustline(A, E, 500, 550, 3, 4, True, 30, -40),
+            Trustline(B, C, 200, 250),
+            Trustline(C, D, 300, 350, balance=50),
+        ]
+    )
+    return community
+
+
+def test_updated_with_unknown_trustline(community):
+    snapshot = GraphSnapshot(community.graph)
+    with pytest.raises(KeyError):
+        snapshot.updated(community.graph, [(A, C)])
+
+
+def test_ids_keep_address_order(community):
+    snapshot = GraphSnapshot(community.graph)
+    assert snapshot.addresses == sorted(community.users)
+    for a in snapshot.addresses:
+        for b in snapshot.addresses:
+            assert (a < b) == (snapshot.ids[a] < snapshot.ids[b])
+
+
+def test_adjacency(community):
+    snapshot = GraphSnapshot(community.graph)
+    assert snapshot.number_of_nodes == 5
+    assert snapshot.number_of_edges == 4
+    for address in community.users:
+        neighbors = [
+            snapshot.addresses[dst]
+            for dst, _ in snapshot.neighbor_items(snapshot.ids[address])
+        ]
+        assert neighbors == list(community.get_friends(address))
+
+
+@pytest.mark.parametrize(
+    "accessor",
+    [
+        trustline_data.get_balance,
+        trustline_data.get_creditline,
+        trustline_data.get_interest_rate,
+    ],
+)
+def test_accessors_match_trustline_data(community, accessor):
+    snapshot = GraphSnapshot(community.graph)
+    for a, b, data in community.graph.edges(data=True):
+        edge = snapshot.get_edge_data(snapshot.ids[a], snapshot.ids[b])
+        for user, counter_party in [(a, b), (b, a)]:
+            assert getattr(snapshot, accessor.__name__)(
+                edge, snapshot.ids[user], snapshot.ids[counter_party]
+            ) == accessor(data, user, counter_party)
+        assert snapshot.get_mtime(edge) == trustline_data.get_mtime(data)
+        assert bool(snapshot.get_is_frozen(edge)) == trustline_data.get_is_frozen(data)
+
+
+def test_get_edge_data_no_edge(community):
+    snapshot = GraphSnapshot(community.graph)
+    assert snapshot.get_edge_data(snapshot.ids[A], snapshot.ids[C]) is None
+
+
+def test_snapshot_is_reused(community):
+    assert community.snapshot is community.snapshot
+
+
+def test_balance_update_does_not_change_old_snapshot(community):
+    snapshot = community.snapshot
+    community.update_balance(A, B, 99, timestamp=100)
+
+    new_snapshot = community.snapshot
+    assert new_snapshot is not snapshot
+    assert new_snapshot.neighbors is snapshot.neighbors
+
+    edge = snapshot.get_edge_data(snapshot.ids[A], snapshot.ids[B])
+    assert snapshot.get_balance(edge, snapshot.ids[A], snapshot.ids[B]) == 20
+    assert new_snapshot.get_balance(edge, snapshot.ids[A], snapshot.ids[B]) == 99
+    assert new_snapshot.get_mtime(edge) == 100
+
+
+def test_new_trustline_rebuilds_snapshot(community):
+    snapshot = community.snapshot
+    community.update_trustline(B, D, 100, 100)
+
+    new_snapshot = community.snapshot
+    assert new_snapshot.number_of_edges == snapshot.number_of_edges + 1
+
+
+def test_path_found_after_update(community):
+    assert community.find_transfer_path_sender_pays_fees(A, C, 300) == (0, [])
+    community.update_trustline(A, B, 500, 500)
+    assert community.find_transfer_path_sender_pays_fees(A, C, 200) == (0, [A, B, C])
+
+
+@pytest.fixture
+def community_with_interests():
+    community = CurrencyNetworkGraph()
+    community.gen_network(
+        [
+            Trustline(A, B, 10 ** 6, 10 ** 6, 1000, 2000, False, 0, 500_000),
+            Trustline(B, C, 10 ** 6, 10 ** 6, 1000, 2000, False, 100, -700_000),
+            Trustline(C, D, 10 ** 6, 10 ** 6, 0, 0, False, 100, 300_000),
+        ]
+    )
+    return community
+
+
+@pytest.mark.parametrize("timestamp", [100, 10 ** 6, 10 ** 8])
+def test_balance_with_interests_matches_trustline_data(
+    community_with_interests, timestamp
+):
+    snapshot = community_with_interests.snapshot
+    assert snapshot.has_interests
+    for a, b, data in community_with_interests.graph.edges(data=True):
+        edge = snapshot.get_edge_data(snapshot.ids[a], snapshot.ids[b])
+        for user, counter_party in [(a, b), (b, a)]:
+            expected = trustline_data.get_balance_with_interests(
+                data, user, counter_party, timestamp
+            )
+            # twice, to check the memoized value
+            for _ in range(2):
+                assert (
+                    snapshot.get_balance_with_interests(
+                        edge, snapshot.ids[user], snapshot.ids[counter_party], timestamp
+                    )
+                    == expected
+                )
+
+
+def test_balance_with_interests_after_update(community_with_interests):
+    timestamp = 10 ** 7
+    snapshot = community_with_interests.snapshot
+    edge = snapshot.get_edge_data(snapshot.ids[A], snapshot.ids[B])
+    old_balance = snapshot.get_balance_with_interests(
+        edge, snapshot.ids[A], snapshot.ids[B], timestamp
+    )
+    assert old_balance > 500_000
+
+    community_with_interests.update_balance(A, B, 100_000, timestamp=timestamp)
+
+    new_snapshot = community_with_interests.snapshot
+    assert (
+        new_snapshot.get_balance_with_interests(
+            edge, snapshot.ids[A], snapshot.ids[B], timestamp
+        )
+        == 100_000
+    )
+    assert (
+        snapshot.get_balance_with_interests(
+            edge, snapshot.ids[A], snapshot.ids[B], timestamp
+        )
+        == old_balance
+    )
+
+
+def test_balance_with_interests_without_interests(community):
+    snapshot = GraphSnapshot(community.graph)
+    assert snapshot.has_interests
+
+    community.update_trustline(A, B, 100, 150, 0, 0)
+    community.update_trustline(A, E, 500, 550, 0, 0)
+    snapshot = GraphSnapshot(community.graph)
+    assert not snapshot.has_interests
+    edge = snapshot.get_edge_data(snapshot.ids[A], snapshot.ids[B])
+    assert (
+        snapshot.get_balance_with_interests(edge, snapshot.ids[B], snapshot.ids[A], 50)
+        == -20
+    )
+    with pytest.raises(ValueError):
+        snapshot.get_balance_with_interests(
+            edge, snapshot.ids[A], snapshot.ids[B], -100
+        )
+
+
+def test_snapshot_from_buffer(community):
+    snapshot = community.snapshot
+    loaded_snapshot = GraphSnapshot.from_buffer(snapshot.to_bytes())
+
+    assert loaded_snapshot.addresses == snapshot.addresses
+    assert loaded_snapshot.ids == snapshot.ids
+    assert loaded_snapshot.has_interests == snapshot.has_interests
+    for name in [
+        "indptr",
+        "neighbors",
+        "edges",
+        "balance_ab",
+        "creditline_ab",
+        "creditline_ba",
+        "interest_ab",
+        "interest_ba",
+        "m_time",
+        "is_frozen",
+    ]:
+        assert list(getattr(loaded_snapshot, name)) == list(getattr(snapshot, name))
+    assert loaded_snapshot.to_bytes() == snapshot.to_bytes()
+
+
+def test_snapshot_from_buffer_big_balance(community):
+    community.update_balance(A, B, 2 ** 100)
+    loaded_snapshot = GraphSnapshot.from_buffer(community.snapshot.to_bytes())
+    edge = loaded_snapshot.get_edge_data(loaded_snapshot.ids[A], loaded_snapshot.ids[B])
+    assert loaded_snapshot.get_balance(edge, 0, 1) == 2 ** 100
+
+
+def test_snapshot_from_invalid_buffer():
+    with pytest.raises(ValueError):
+        GraphSnapshot.from_buffer(bytes(100))
+
+
+@pytest.fixture
+def community_with_components():
+    community = CurrencyNetworkGraph()
+    community.gen_network(
+        [
+            Trustline(A, B, 100, 0),
+            Trustline(B, C, 100, 100),
+            Trustline(D, E, 100, 100, is_frozen=True),
+            Trustline(F, G, 100, 100),
+        ]
+    )
+    return community
+
+
+def test_reachability(community_with_components):
+    snapshot = community_with_components.snapshot
+    reachability = snapshot.reachability
+    a, b, c, d, e, f, g = snapshot.to_ids([A, B, C, D, E, F, G])
+
+    assert reachability.components[a] == reachability.components[c]
+    assert reachability.components[a] != reachability.components[f]
+    assert reachability.components[d] == reachability.components[e]
+    # A gave a creditline to B, but did not receive one
+    assert reachability.may_have_path(b, a)
+    assert not reachability.may_have_path(a, b)
+    assert reachability.may_have_path(c, a)
+    assert not reachability.may_have_path(a, c)
+    assert not reachability.may_have_path(c, f)
+    # the only trustline is frozen
+    assert not reachability.may_have_path(d, e)
+    assert reachability.may_have_path(d, d)
+
+
+def test_reachability_updated_with_snapshot(community_with_components):
+    reachability = community_with_components.snapshot.reachability
+    community_with_components.update_balance(A, B, 50)
+
+    snapshot = community_with_components.snapshot
+    a, c = snapshot.to_ids([A, C])
+    assert snapshot.reachability.components is reachability.components
+    assert snapshot.reachability.may_have_path(a, c)
+    assert not reachability.may_have_path(a, c)
+    fresh_reachability = GraphSnapshot(community_with_components.graph).reachability
+    assert (
+        snapshot.reachability.has_outgoing_capacity
+        == fresh_reachability.has_outgoing_capacity
+    )
+    assert (
+        snapshot.reachability.has_incoming_capacity
+        == fresh_reachability.has_incoming_capacity
+    )
+
+
+def test_no_search_without_possible_path(community_with_components):
+    stats = alg.SearchStatistics()
+    assert community_with_components.find_transfer_path_sender_pays_fees(
+        A, C, 10, stats=stats
+    ) == (0, [])
+    assert community_with_components.find_maximum_capacity_path(C, F, stats=stats) == (
+        0,
+        [],
+    )
+    assert stats.searches == 0
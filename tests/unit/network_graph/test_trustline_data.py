@@ -1,6 +1,7 @@
 import pytest
 
 from relay.network_graph.trustline_data import (
+    TrustlineData,
     get,
     get_balance,
     get_creditline,
@@ -20,10 +21,11 @@ key = "test"
 
 @pytest.fixture()
 def data():
-    return {}
+    return TrustlineData()
 
 
-def test_set_get(data):
+def test_set_get():
+    data = {}
     set(data, a, b, {key: 1}, {key: -1})
     assert get(a, b, data[key], -data[key]) == 1
     assert get(b, a, data[key], -data[key]) == -1
@@ -52,3 +54,20 @@ def test_interests(data):
 def test_mtime(data):
     set_mtime(data, 12345)
     assert get_mtime(data) == 12345
+
+
+def test_trustline_data_as_edge_data():
+    data = TrustlineData(creditline_ab=100)
+    data.update({"balance_ab": 10}, is_frozen=True)
+    assert data["creditline_ab"] == 100
+    assert data.get("balance_ab") == 10
+    assert dict(data.items())["is_frozen"] is True
+    assert data.copy() == data
+    assert data.copy() is not data
+
+
+def test_trustline_data_unknown_key(data):
+    with pytest.raises(KeyError):
+        data["test"] = 1
+    with pytest.raises(KeyError):
+        data["test"]
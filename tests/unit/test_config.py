@@ -9,6 +9,7 @@ from relay.config.config import (
     load_config,
     validation_error_string,
 )
+from relay.config.schema import TrustlineIndexSchema
 
 
 class NestedSchema(Schema):
@@ -102,3 +103,9 @@ def test_validation_error_message():
     assert error_message == ", ".join(messages) or error_message == ", ".join(
         reversed(messages)
     )
+
+
+@pytest.mark.parametrize("concurrency", [0, -1])
+def test_invalid_network_bootstrap_concurrency(concurrency):
+    with pytest.raises(ValidationError):
+        TrustlineIndexSchema().load({"network_bootstrap_concurrency": concurrency})
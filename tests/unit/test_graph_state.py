@@ -0,0 +1,110 @@
+import pytest
+
+from relay.blockchain.currency_network_proxy import Trustline
+from relay.ethindex_db.graph_state import trustline_from_row
+
+A = "0x0A"
+B = "0x0B"
+
+
+def trustline_args(creditor, debtor, given, received, **kwargs):
+    return {
+        "_creditor": creditor,
+        "_debtor": debtor,
+        "_creditlineGiven": given,
+        "_creditlineReceived": received,
+        **kwargs,
+    }
+
+
+def balance_args(from_, to, value):
+    return {"_from": from_, "_to": to, "_value": value}
+
+
+@pytest.mark.parametrize(
+    "row",
+    [
+        {
+            "trustline_args": trustline_args(
+                A,
+                B,
+                100,
+                200,
+                _interestRateGiven=1,
+                _interestRateReceived=2,
+                _isFrozen=True,
+            ),
+            "balance_args": balance_args(A, B, 50),
+            "balance_timestamp": 1000,
+        },
+        {
+            "trustline_args": trustline_args(
+                B,
+                A,
+                200,
+                100,
+                _interestRateGiven=2,
+                _interestRateReceived=1,
+                _isFrozen=True,
+            ),
+            "balance_args": balance_args(B, A, -50),
+            "balance_timestamp": 1000,
+        },
+        {
+            "trustline_args": trustline_args(
+                B,
+                A,
+                200,
+                100,
+                _interestRateGiven=2,
+                _interestRateReceived=1,
+                _isFrozen=True,
+            ),
+            "balance_args": balance_args(A, B, 50),
+            "balance_timestamp": 1000,
+        },
+    ],
+)
+def test_trustline_from_row(row):
+    assert trustline_from_row(row) == Trustline(
+        user=A,
+        counter_party=B,
+        creditline_given=100,
+        creditline_received=200,
+        interest_rate_given=1,
+        interest_rate_received=2,
+        is_frozen=True,
+        m_time=1000,
+        balance=50,
+    )
+
+
+def test_trustline_from_row_without_balance_update():
+    row = {
+        "trustline_args": trustline_args(B, A, 200, 100),
+        "balance_args": None,
+        "balance_timestamp": None,
+    }
+    assert trustline_from_row(row) == Trustline(
+        user=A, counter_party=B, creditline_given=100, creditline_received=200
+    )
+
+
+def test_closed_trustline_from_row():
+    row = {
+        "trustline_args": trustline_args(A, B, 0, 0),
+        "balance_args": balance_args(A, B, 0),
+        "balance_timestamp": 1000,
+    }
+    assert trustline_from_row(row) is None
+
+
+def test_trustline_from_row_with_balance_only():
+    row = {
+        "trustline_args": trustline_args(A, B, 0, 0),
+        "balance_args": balance_args(B, A, 10),
+        "balance_timestamp": 1000,
+    }
+    assert trustline_from_row(row) == Trustline(
+        user=A, counter_party=B, m_time=1000, balance=-10
+    )
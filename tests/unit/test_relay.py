@@ -0,0 +1,326 @@
+import gevent
+import pytest
+from eth_utils import to_checksum_address
+
+from relay.ethindex_db.sync_updates import (
+    BalanceUpdateFeedUpdate,
+    NetworkFreezeFeedUpdate,
+    TrustlineUpdateFeedUpdate,
+)
+from relay.network_graph.alg import SearchBudgetExceeded
+from relay.network_graph.graph import CurrencyNetworkGraph
+from relay.network_graph.payment_path import FeePayer, PathRequest, PaymentPath
+from relay.relay import TrustlinesRelay
+
+NETWORK_1 = to_checksum_address("0x" + "1" * 40)
+NETWORK_2 = to_checksum_address("0x" + "2" * 40)
+NETWORK_3 = to_checksum_address("0x" + "3" * 40)
+A = to_checksum_address("0x" + "a" * 40)
+B = to_checksum_address("0x" + "b" * 40)
+C = to_checksum_address("0x" + "c" * 40)
+
+
+def trustline_update(network, creditor, debtor, given, received):
+    return TrustlineUpdateFeedUpdate(
+        address=network,
+        timestamp=0,
+        args={
+            "_creditor": creditor,
+            "_debtor": debtor,
+            "_creditlineGiven": given,
+            "_creditlineReceived": received,
+            "_isFrozen": False,
+        },
+    )
+
+
+def balance_update(network, a, b, value):
+    return BalanceUpdateFeedUpdate(
+        address=network, timestamp=0, args={"_from": a, "_to": b, "_value": value}
+    )
+
+
+@pytest.fixture
+def trustlines_relay():
+    trustlines_relay = TrustlinesRelay(config={})
+    trustlines_relay.currency_network_graphs = {
+        NETWORK_1: CurrencyNetworkGraph(),
+        NETWORK_2: CurrencyNetworkGraph(),
+    }
+    return trustlines_relay
+
+
+def test_networks_of_user_updated_from_feed(trustlines_relay):
+    trustlines_relay._apply_feed_update_on_graph(
+        [
+            trustline_update(NETWORK_1, A, B, 100, 100),
+            trustline_update(NETWORK_2, A, C, 100, 100),
+            NetworkFreezeFeedUpdate(address=NETWORK_2, timestamp=0),
+        ]
+    )
+    assert trustlines_relay.get_networks_of_user(A) == [NETWORK_1, NETWORK_2]
+    assert trustlines_relay.get_networks_of_user(B) == [NETWORK_1]
+    assert trustlines_relay.get_networks_of_user(C) == [NETWORK_2]
+
+    trustlines_relay._apply_feed_update_on_graph(
+        [
+            balance_update(NETWORK_1, A, B, 10),
+            trustline_update(NETWORK_1, A, B, 0, 0),
+            balance_update(NETWORK_1, A, B, 0),
+        ]
+    )
+    assert trustlines_relay.get_networks_of_user(A) == [NETWORK_2]
+    assert trustlines_relay.get_networks_of_user(B) == []
+    assert trustlines_relay.get_networks_of_user(C) == [NETWORK_2]
+
+
+def test_find_path_records_pathfinding_metrics(trustlines_relay):
+    trustlines_relay._apply_feed_update_on_graph(
+        [
+            trustline_update(NETWORK_1, A, B, 100, 100),
+            trustline_update(NETWORK_1, B, C, 100, 100),
+        ]
+    )
+    trustlines_relay.find_path(
+        NETWORK_1,
+        "find_transfer_path_sender_pays_fees",
+        endpoint="path-info",
+        source=A,
+        target=C,
+        value=10,
+    )
+    trustlines_relay.find_path(
+        NETWORK_1, "find_maximum_capacity_path", source=A, target=C
+    )
+
+    metrics = trustlines_relay.pathfinding_metrics.network_metrics(NETWORK_1)
+    assert set(metrics) == {"path-info", "find_maximum_capacity_path"}
+    assert metrics["path-info"]["requests"] == 1
+    assert metrics["path-info"]["poppedNodes"]["sum"] == 3
+    assert trustlines_relay.pathfinding_metrics.network_metrics(NETWORK_2) == {}
+
+
+def test_find_path_exceeding_search_budget(trustlines_relay):
+    trustlines_relay.config = {"trustline_index": {"max_search_nodes": 1}}
+    trustlines_relay._apply_feed_update_on_graph(
+        [
+            trustline_update(NETWORK_1, A, B, 100, 100),
+            trustline_update(NETWORK_1, B, C, 100, 100),
+        ]
+    )
+    with pytest.raises(SearchBudgetExceeded):
+        trustlines_relay.find_path(
+            NETWORK_1,
+            "find_transfer_path_sender_pays_fees",
+            endpoint="path-info",
+            source=A,
+            target=C,
+            value=10,
+        )
+
+    metrics = trustlines_relay.pathfinding_metrics.network_metrics(NETWORK_1)
+    assert metrics["path-info"]["budgetExceeded"] == 1
+
+
+def test_find_payment_paths_with_item_exceeding_search_budget(trustlines_relay):
+    trustlines_relay.config = {"trustline_index": {"max_search_nodes": 1}}
+    trustlines_relay._apply_feed_update_on_graph(
+        [
+            trustline_update(NETWORK_1, A, B, 100, 100),
+            trustline_update(NETWORK_1, B, C, 100, 100),
+        ]
+    )
+    payment_paths = trustlines_relay.find_path(
+        NETWORK_1,
+        "find_payment_paths",
+        endpoint="path-info-batch",
+        path_requests=[PathRequest(A, C, 10), PathRequest(B, C, 10)],
+        timestamp=0,
+    )
+
+    assert payment_paths == [
+        PaymentPath(0, [], 10, FeePayer.SENDER),
+        PaymentPath(0, [B, C], 10, FeePayer.SENDER),
+    ]
+
+
+class BootstrapRelay(TrustlinesRelay):
+    """Relay whose networks take the given number of seconds to be added, or
+    fail to be added for None, the graphs are synced from the chain"""
+
+    def __init__(self, bootstrap_durations, concurrency):
+        super().__init__(
+            config={"trustline_index": {"network_bootstrap_concurrency": concurrency}}
+        )
+        self.bootstrap_durations = bootstrap_durations
+        self.running = 0
+        self.max_running = 0
+
+    def new_network(self, address):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            feed_sync_id = self._graph_feed_sync_id
+            duration = self.bootstrap_durations[address]
+            if duration is None:
+                raise RuntimeError("Failed to add network")
+            gevent.sleep(duration)
+            self.currency_network_graphs[address] = CurrencyNetworkGraph()
+            self._feed_synced_graph(address, feed_sync_id)
+        finally:
+            self.running -= 1
+
+
+def test_bootstrap_networks_concurrently():
+    relay = BootstrapRelay({NETWORK_1: 0, NETWORK_2: 0.05, NETWORK_3: 0}, 2)
+    greenlet = gevent.spawn(
+        relay._bootstrap_networks, [NETWORK_1, NETWORK_2, NETWORK_3]
+    )
+    gevent.sleep(0.01)
+
+    assert not relay.is_currency_network_syncing(NETWORK_1)
+    assert relay.is_currency_network_syncing(NETWORK_2)
+    assert not relay.is_currency_network_syncing(NETWORK_3)
+
+    greenlet.join()
+    assert not relay.is_currency_network_syncing(NETWORK_2)
+    assert relay.max_running == 2
+
+
+def test_bootstrap_continues_after_failed_network():
+    relay = BootstrapRelay({NETWORK_1: None, NETWORK_2: 0}, 1)
+    relay._bootstrap_networks([NETWORK_1, NETWORK_2])
+
+    assert not relay.is_currency_network_syncing(NETWORK_1)
+    assert NETWORK_1 not in relay.currency_network_graphs
+    assert NETWORK_2 in relay.currency_network_graphs
+
+
+@pytest.fixture
+def graph_feed(monkeypatch):
+    """rows of a fake graph feed as list of (id, update)"""
+    rows = []
+
+    def get_graph_updates_feed_batches(conn, batch_size):
+        last_synced_graph_id = int(get_latest_graph_sync_id())
+        return [
+            ([update], row_id)
+            for row_id, update in rows
+            if row_id > last_synced_graph_id
+        ]
+
+    def get_graph_updates_feed_of_network(conn, address, after_id, until_id):
+        return [
+            update
+            for row_id, update in rows
+            if after_id < row_id <= until_id and update.address == address
+        ]
+
+    sync_id_file = {"sync_id": 0}
+
+    def write_graph_sync_id_file(sync_id):
+        sync_id_file["sync_id"] = sync_id
+
+    def get_latest_graph_sync_id():
+        return str(sync_id_file["sync_id"])
+
+    for function in [
+        get_graph_updates_feed_batches,
+        get_graph_updates_feed_of_network,
+        write_graph_sync_id_file,
+        get_latest_graph_sync_id,
+    ]:
+        monkeypatch.setattr(f"relay.relay.{function.__name__}", function)
+    return rows
+
+
+def test_graph_feed_applied_to_networks_once_synced(graph_feed):
+    relay = BootstrapRelay({NETWORK_1: 0, NETWORK_2: 0.05}, 2)
+    relay._graph_feed_sync_id = 0
+    graph_feed.extend(
+        [
+            (1, trustline_update(NETWORK_1, A, B, 100, 100)),
+            (2, trustline_update(NETWORK_2, A, B, 100, 100)),
+        ]
+    )
+    greenlet = gevent.spawn(relay._bootstrap_networks, [NETWORK_1, NETWORK_2])
+    gevent.sleep(0.01)
+
+    relay._sync_graph_feed(None, 10)
+
+    assert not relay.is_currency_network_syncing(NETWORK_1)
+    assert relay.currency_network_graphs[NETWORK_1].has_user(A)
+    assert relay.is_currency_network_syncing(NETWORK_2)
+
+    greenlet.join()
+    # the slow network is only synced once the graph feed is applied to it
+    assert relay.is_currency_network_syncing(NETWORK_2)
+    assert not relay.currency_network_graphs[NETWORK_2].has_user(A)
+
+    graph_feed.append((3, trustline_update(NETWORK_2, B, C, 100, 100)))
+    relay._sync_graph_feed(None, 10)
+
+    assert not relay.is_currency_network_syncing(NETWORK_2)
+    assert list(relay.currency_network_graphs[NETWORK_2].get_friends(B)) == [A, C]
+    assert relay._graph_feed_sync_id == 3
+
+
+def test_graph_feed_skips_to_graphs_loaded_later(graph_feed):
+    relay = BootstrapRelay({NETWORK_1: 0}, 1)
+    relay._graph_feed_sync_id = 0
+    relay._graph_feed_sync_ids[NETWORK_1] = 2
+    graph_feed.extend(
+        [
+            (1, trustline_update(NETWORK_1, A, B, 100, 100)),
+            (3, trustline_update(NETWORK_1, B, C, 100, 100)),
+        ]
+    )
+    relay._bootstrap_networks([NETWORK_1])
+
+    relay._sync_graph_feed(None, 10)
+
+    # the rows up to the id the graph was loaded at are not applied
+    assert not relay.is_currency_network_syncing(NETWORK_1)
+    assert not relay.currency_network_graphs[NETWORK_1].has_user(A)
+    assert relay.currency_network_graphs[NETWORK_1].has_user(C)
+
+
+class FakeCurrencyNetworkProxy:
+    capacity_imbalance_fee_divisor = 0
+    default_interest_rate = 0
+    custom_interests = False
+    prevent_mediator_interests = False
+
+    def __init__(self, web3, abi, address):
+        self.address = address
+
+
+def test_failed_new_network_removed_from_networks_of_users(
+    trustlines_relay, monkeypatch
+):
+    monkeypatch.setattr("relay.relay.CurrencyNetworkProxy", FakeCurrencyNetworkProxy)
+    trustlines_relay.config = {
+        "trustline_index": {"path_cache_size": 0, "path_cache_max_age": 0}
+    }
+    trustlines_relay.contracts = {"CurrencyNetwork": {"abi": []}}
+    trustlines_relay._apply_feed_update_on_graph(
+        [trustline_update(NETWORK_1, A, B, 100, 100)]
+    )
+
+    def sync_new_graph(address):
+        trustlines_relay._apply_feed_update_on_graph(
+            [
+                trustline_update(address, A, B, 100, 100),
+                trustline_update(address, B, C, 100, 100),
+            ]
+        )
+        raise RuntimeError("Failed to sync graph")
+
+    monkeypatch.setattr(trustlines_relay, "_sync_new_graph", sync_new_graph)
+    with pytest.raises(RuntimeError):
+        trustlines_relay.new_network(NETWORK_3)
+
+    assert NETWORK_3 not in trustlines_relay.currency_network_graphs
+    assert trustlines_relay.get_networks_of_user(A) == [NETWORK_1]
+    assert trustlines_relay.get_networks_of_user(B) == [NETWORK_1]
+    assert trustlines_relay.get_networks_of_user(C) == []
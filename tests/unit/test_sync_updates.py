@@ -0,0 +1,157 @@
+import random
+
+import psycopg2
+import pytest
+from tests.unit.network_graph.conftest import addresses
+
+from relay.ethindex_db.sync_updates import (
+    BalanceUpdateFeedUpdate,
+    GraphFeedListener,
+    NetworkFreezeFeedUpdate,
+    NetworkUnfreezeFeedUpdate,
+    TrustlineUpdateFeedUpdate,
+    coalesce_feed_updates,
+)
+from relay.network_graph.graph import (
+    CurrencyNetworkGraphForTesting as CurrencyNetworkGraph,
+)
+
+A, B, C, D, E, F, G, H = addresses
+
+NETWORK_1 = "0x1"
+NETWORK_2 = "0x2"
+
+
+def trustline_update(creditor, debtor, given, received, address=NETWORK_1):
+    return TrustlineUpdateFeedUpdate(
+        address=address,
+        timestamp=0,
+        args={
+            "_creditor": creditor,
+            "_debtor": debtor,
+            "_creditlineGiven": given,
+            "_creditlineReceived": received,
+            "_isFrozen": False,
+        },
+    )
+
+
+def balance_update(from_, to, value, timestamp=0, address=NETWORK_1):
+    return BalanceUpdateFeedUpdate(
+        address=address,
+        timestamp=timestamp,
+        args={"_from": from_, "_to": to, "_value": value},
+    )
+
+
+def test_coalesce_balance_updates():
+    updates = [
+        balance_update(A, B, 10, 1),
+        balance_update(B, A, 20, 2),
+        balance_update(A, B, 30, 3),
+    ]
+    assert coalesce_feed_updates(updates) == [balance_update(A, B, 30, 3)]
+
+
+def test_coalesce_keeps_order_of_kept_updates():
+    updates = [
+        trustline_update(A, B, 100, 100),
+        balance_update(A, B, 10),
+        balance_update(B, C, 10),
+        trustline_update(A, B, 200, 200),
+        balance_update(A, B, 20),
+    ]
+    assert coalesce_feed_updates(updates) == [
+        balance_update(B, C, 10),
+        trustline_update(A, B, 200, 200),
+        balance_update(A, B, 20),
+    ]
+
+
+def test_coalesce_per_network():
+    updates = [
+        balance_update(A, B, 10, address=NETWORK_1),
+        balance_update(A, B, 20, address=NETWORK_2),
+    ]
+    assert coalesce_feed_updates(updates) == updates
+
+
+def test_coalesce_not_across_closing_updates():
+    updates = [
+        trustline_update(A, B, 100, 100),
+        balance_update(A, B, 10),
+        trustline_update(A, B, 0, 0),
+        balance_update(A, B, 0),
+        balance_update(A, B, 20),
+        balance_update(A, B, 30),
+    ]
+    assert coalesce_feed_updates(updates) == [
+        balance_update(A, B, 10),
+        trustline_update(A, B, 0, 0),
+        balance_update(A, B, 0),
+        balance_update(A, B, 30),
+    ]
+
+
+def test_coalesce_network_freezes():
+    updates = [
+        NetworkFreezeFeedUpdate(address=NETWORK_1, timestamp=0),
+        NetworkFreezeFeedUpdate(address=NETWORK_2, timestamp=0),
+        NetworkUnfreezeFeedUpdate(address=NETWORK_1, timestamp=1),
+    ]
+    assert coalesce_feed_updates(updates) == updates[1:]
+
+
+def account_sums(graph):
+    return {
+        (a, b): vars(graph.get_account_sum(a, b))
+        for a in graph.users
+        for b in graph.get_friends(a)
+    }
+
+
+def random_feed_updates(rng, number_of_updates):
+    users = [A, B, C]
+    updates = []
+    for timestamp in range(number_of_updates):
+        a, b = rng.sample(users, 2)
+        if rng.random() < 0.5:
+            updates.append(
+                trustline_update(a, b, rng.choice([0, 100]), rng.choice([0, 100]))
+            )
+        else:
+            updates.append(balance_update(a, b, rng.choice([0, 0, 10, -10]), timestamp))
+    return updates
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_coalesced_updates_give_same_graph(seed):
+    updates = random_feed_updates(random.Random(seed), 50)
+
+    graph = CurrencyNetworkGraph()
+    graph.apply_feed_updates(updates)
+    coalesced_graph = CurrencyNetworkGraph()
+    coalesced_graph.apply_feed_updates(coalesce_feed_updates(updates))
+
+    assert len(coalesce_feed_updates(updates)) < len(updates)
+    assert account_sums(coalesced_graph) == account_sums(graph)
+
+
+def test_listen_retried_after_retry_interval(monkeypatch):
+    connects = []
+
+    def connect(dsn):
+        connects.append(dsn)
+        raise psycopg2.OperationalError("could not connect")
+
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    listener = GraphFeedListener(retry_interval=0.05)
+
+    assert listener.listen() is False
+    assert listener.wait(0) is False
+    assert listener.wait(0) is False
+    assert len(connects) == 1
+
+    listener.wait(0.06)
+    assert listener.wait(0) is False
+    assert len(connects) == 2